@@ -3,16 +3,101 @@
 Classes:
 --------
 - ProfilePlotter: Profile and plot given function execution time.
+- MeasureConfig: Settings controlling how each profile point is timed.
+- TimingStats: Summary statistics of the timed samples of one point.
+- ProfileSeries: x values and timing statistics produced by a profiler.
+- ProfileResult: Array backed results of a profiling run, with export.
+- LabelResult: Array backed results of a single profile label.
+- ParallelConfig: Settings for running profiles in a process pool.
+- ResultCache: On-disk store of measured points reused between runs.
+- ProfileJournal: Append-only checkpoint file making profiles resumable.
+- LatencyHistogram: Fixed memory histogram of call durations.
+- ComplexityFit: Best fitting complexity model of a runtime curve.
+- BaselineStore: Directory of named results to compare new runs against.
+- ComparisonReport: Point by point comparison of a run with a baseline.
 
 Functions:
 ----------
 - ret_time_decorator: Decorator to time function. returning time taken.
+- hist_time_decorator: Decorator recording call durations in a histogram.
+- set_hist_timing: Switch hist_time_decorator recording on or off.
+- hist_snapshots: Return HistogramSnapshots of all decorated functions.
+- fit_complexity: Fit complexity models to a runtime curve.
+- compare_results: Compare a result with a baseline, return a report.
+- render_results: Plot stored results to image files in worker processes.
+- profile_suite: Decorator registering a profile suite for the CLI.
+- main: Command line runner, python -m profplot --help.
 """
 
+import base64
+import bisect
+import contextlib
+import copy
+import csv
+import datetime
+import fnmatch
 import functools
+import gc
+import hashlib
+import importlib.util
+import inspect
+import itertools
+import json
+import keyword
+import math
+import multiprocessing
+import os
+import pickle
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import threading
+import time
 import timeit
+import traceback
+import tracemalloc
+import warnings
+import weakref
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from inspect import signature
-import matplotlib.pyplot as plt
+
+
+class _LazyModule:
+    """Stand-in for a module that is imported on first attribute access.
+
+    Keeps importing profplot cheap for users of the timing decorators,
+    who never touch numpy or matplotlib.
+    """
+
+    def __init__(self, name, before_import=None):
+        self._name = name
+        self._before_import = before_import
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            if self._before_import is not None:
+                self._before_import()
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+
+def _use_headless_backend():
+    """Select the Agg matplotlib backend when there is no display."""
+    if os.environ.get("MPLBACKEND"):
+        return
+    if (sys.platform not in ("darwin", "win32")
+            and not os.environ.get("DISPLAY")
+            and not os.environ.get("WAYLAND_DISPLAY")):
+        import matplotlib
+        matplotlib.use("Agg")
+
+
+plt = _LazyModule("matplotlib.pyplot", _use_headless_backend)
+np = _LazyModule("numpy")
 
 
 def ret_time_decorator(func):
@@ -22,22 +107,2393 @@ def ret_time_decorator(func):
         return timeit.timeit(lambda: func(*args, **kwargs), number=1)
     return wrapper
 
-def _dup_dict_without_keys(x, *args):
-    """Duplicate given dict, exclude all other given keys."""
-    return {k: v for k, v in x.items() if k not in args}
 
+# Histogram buckets are HDR style: durations below 2**(_SUB_BITS+1) ns get a
+# bucket each, above that every power of two range is split into
+# 2**_SUB_BITS equal buckets, a relative error of at most 1/2**_SUB_BITS.
+_SUB_BITS = 4
+_SUB_COUNT = 1 << _SUB_BITS
+_MAX_SHIFT = 40 - _SUB_BITS     # durations up to ~18 minutes
+_N_BUCKETS = (_MAX_SHIFT + 2) * _SUB_COUNT
+# index of the bucket counting the durations beyond the last one
+_OVERFLOW = _N_BUCKETS
+
+# upper overhead per recorded call of hist_time_decorator, checked by
+# tests/test_benchmarks.py. Disabled decorators cost one global lookup.
+HIST_OVERHEAD_BUDGET_NS = 2000
+
+_hist_enabled = True
+_histograms = {}
+_histograms_lock = threading.Lock()
+
+
+def _bucket_upper(ind):
+    """Return the largest duration in ns that falls in bucket ind."""
+    if ind < 2*_SUB_COUNT:
+        return ind
+    shift = ind // _SUB_COUNT - 1
+    return ((_SUB_COUNT + ind % _SUB_COUNT + 1) << shift) - 1
+
+
+def _add_counts(total, counts):
+    """Add the LatencyHistogram bucket list counts into total."""
+    for ind, val in enumerate(counts[:-1]):
+        total[ind] += val
+    total[-1] = max(total[-1], counts[-1])
+
+
+class _ThreadEnd:
+    """Object whose collection marks the end of the thread holding it."""
+
+
+HistogramSnapshot = namedtuple("HistogramSnapshot",
+                               ["count", "p50", "p99", "max"])
+
+
+class LatencyHistogram:
+    """Fixed memory, log bucketed histogram of durations in nanoseconds.
+
+    Every thread records into its own bucket list, so recording takes no
+    lock and never contends with other threads. Snapshots sum the lists of
+    all threads. When a thread ends its list is added into one kept for
+    ended threads and dropped, so memory is a fixed number of buckets per
+    live recording thread, however many threads a pool goes through.
+
+    Methods:
+    --------
+    - record: Add a duration to the histogram.
+    - percentile: Return the duration below which q percent of calls fall.
+    - snapshot: Return a HistogramSnapshot of count, p50, p99 and max.
+    - reset: Drop all recorded durations.
+    """
+
+    def __init__(self, name=""):
+        self.name = name
+        self._local = threading.local()
+        self._thread_counts = []
+        # counts of threads that ended
+        self._retired = [0]*(_N_BUCKETS + 2)
+        self._lock = threading.Lock()
+
+    def _counts(self):
+        """Return the bucket list of the calling thread. It holds the
+        _N_BUCKETS buckets, the _OVERFLOW bucket and last the longest
+        duration the thread recorded."""
+        try:
+            return self._local.counts
+        except AttributeError:
+            counts = [0]*(_N_BUCKETS + 2)
+            with self._lock:    # once per thread
+                self._thread_counts.append(counts)
+            self._local.counts = counts
+            # only the thread's local storage refers to the holder, it is
+            # freed, and the counts retired, when the thread ends
+            self._local.holder = _ThreadEnd()
+            weakref.finalize(self._local.holder, self._retire, counts)
+            return counts
+
+    def _retire(self, counts):
+        """Add the counts of an ended thread into _retired, drop them."""
+        with self._lock:
+            self._thread_counts = [c for c in self._thread_counts
+                                   if c is not counts]
+            _add_counts(self._retired, counts)
+
+    def record(self, ns):
+        """Add a duration of ns nanoseconds to the histogram."""
+        try:
+            counts = self._local.counts
+        except AttributeError:
+            counts = self._counts()
+        shift = ns.bit_length() - _SUB_BITS - 1
+        if shift <= 0:
+            ind = ns
+        elif shift > _MAX_SHIFT:
+            ind = _OVERFLOW
+        else:
+            ind = shift*_SUB_COUNT + (ns >> shift)
+        counts[ind] += 1
+        if ns > counts[-1]:
+            counts[-1] = ns
+
+    def _merged(self):
+        with self._lock:
+            thread_counts = list(self._thread_counts)
+            merged = list(self._retired)
+        for counts in thread_counts:
+            _add_counts(merged, counts)
+        return merged
+
+    def percentile(self, q, _merged=None):
+        """Return the duration in ns below which q percent of calls fall.
+
+        Durations are reported as the upper bound of their bucket, capped
+        at the longest recorded duration. Returns 0 with no calls recorded.
+        """
+        merged = self._merged() if _merged is None else _merged
+        total = sum(merged[:-1])
+        if total == 0:
+            return 0
+        rank = max(1, math.ceil(total * q / 100))
+        seen = 0
+        for ind, val in enumerate(merged[:-1]):
+            seen += val
+            if seen >= rank:
+                if ind == _OVERFLOW:    # no upper bound
+                    return merged[-1]
+                return min(_bucket_upper(ind), merged[-1])
+        return merged[-1]
+
+    def snapshot(self):
+        """Return a HistogramSnapshot of the durations recorded so far."""
+        merged = self._merged()
+        return HistogramSnapshot(sum(merged[:-1]),
+                                 self.percentile(50, merged),
+                                 self.percentile(99, merged), merged[-1])
+
+    def reset(self):
+        """Drop all recorded durations."""
+        with self._lock:
+            for counts in self._thread_counts + [self._retired]:
+                counts[:] = [0]*len(counts)
+
+
+def hist_time_decorator(func):
+    """Decorator recording call durations into a LatencyHistogram.
+
+    Unlike ret_time_decorator the return value is kept, so the decorator
+    can stay on production code. The histogram is available as the
+    wrapper's histogram attribute and through hist_snapshots.
+    """
+    name = f"{func.__module__}.{func.__qualname__}"
+    hist = LatencyHistogram(name)
+    with _histograms_lock:
+        _histograms[name] = hist
+    record = hist.record
+    perf_counter_ns = time.perf_counter_ns
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _hist_enabled:
+            return func(*args, **kwargs)
+        start = perf_counter_ns()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            record(perf_counter_ns() - start)
+    wrapper.histogram = hist
+    return wrapper
+
+
+def set_hist_timing(enabled):
+    """Switch recording of all hist_time_decorator functions on or off."""
+    global _hist_enabled
+    _hist_enabled = bool(enabled)
+
+
+def hist_snapshots():
+    """Return dict of decorated function name to its HistogramSnapshot."""
+    with _histograms_lock:
+        histograms = dict(_histograms)
+    return {name: hist.snapshot() for name, hist in histograms.items()}
+
+
+def _dup_dict_without_keys(x, *args):
+    """Duplicate given dict, exclude all other given keys."""
+    return {k: v for k, v in x.items() if k not in args}
+
+
+def _percentile(sorted_vals, q):
+    """Return the q-th percentile of sorted values, interpolating linearly."""
+    pos = (len(sorted_vals) - 1) * q / 100
+    low = math.floor(pos)
+    high = math.ceil(pos)
+    return sorted_vals[low] + (sorted_vals[high] - sorted_vals[low])*(pos - low)
+
+
+# loop timed by _BoundCall, timeit's own template with the function and
+# arguments passed in as locals, so each call costs no lookups or unpacking
+_TIMING_LOOP = """
+def inner(_it, _timer, _setup, _f{params}):
+    if _setup is not None:
+        _setup()
+    _t0 = _timer()
+    for _i in _it:
+        _f({args})
+    _t1 = _timer()
+    return _t1 - _t0
+"""
+
+
+@functools.lru_cache(maxsize=None)
+def _compile_timing_loop(shape):
+    """Return the timing loop function for calls of the given shape, the
+    number of positional arguments and tuple of keyword names, or None for
+    keywords passed as one ** dict."""
+    nargs, kwnames = shape
+    params = [f"_a{i}" for i in range(nargs)]
+    args = list(params)
+    if kwnames is None:
+        params.append("_kw")
+        args.append("**_kw")
+    else:
+        params += [f"_k{i}" for i in range(len(kwnames))]
+        args += [f"{name}=_k{i}" for i, name in enumerate(kwnames)]
+    namespace = {}
+    exec(_TIMING_LOOP.format(params="".join(f", {p}" for p in params),
+                             args=", ".join(args)), namespace)
+    return namespace["inner"]
+
+
+class _BoundCall:
+    """A function call with its arguments bound ahead of timing.
+
+    Calling it calls the function. MeasureConfig.measure times it with a
+    loop compiled for its shape, which calls the function directly with
+    the arguments held as local variables, rather than timeit calling a
+    lambda that unpacks a kwargs dict. That wrapper costs more than the
+    whole of a function running in a microsecond or two.
+    """
+
+    def __init__(self, func, args=(), kwargs=None):
+        kwargs = {} if kwargs is None else kwargs
+        try:
+            # pass as much positionally as the signature allows
+            bound = signature(func).bind(*args, **kwargs)
+            args, kwargs = bound.args, bound.kwargs
+        except (TypeError, ValueError):
+            pass    # no signature, e.g. some builtins, keep as given
+        self.func = func
+        self.args = tuple(args)
+        self.kwargs = dict(kwargs)
+        kwnames = tuple(self.kwargs)
+        # names that can't be written as name=value go through **_kw
+        if not all(name.isidentifier() and not keyword.iskeyword(name)
+                   for name in kwnames):
+            kwnames = None
+        self.shape = (len(self.args), kwnames)
+
+    def __call__(self):
+        return self.func(*self.args, **self.kwargs)
+
+    def timer(self, setup=None):
+        """Return a timeit.Timer timing the call, setup run before each
+        sample."""
+        timer = timeit.Timer()
+        locals_ = {f"_a{i}": arg for i, arg in enumerate(self.args)}
+        if self.shape[1] is None:
+            locals_["_kw"] = self.kwargs
+        else:
+            locals_.update((f"_k{i}", value)
+                           for i, value in enumerate(self.kwargs.values()))
+        timer.inner = functools.partial(_compile_timing_loop(self.shape),
+                                        _setup=setup, _f=self.func,
+                                        **locals_)
+        return timer
+
+
+def _noop_function(shape):
+    """Return a function doing nothing, called like shape, see
+    _compile_timing_loop."""
+    nargs, kwnames = shape
+    params = [f"_a{i}" for i in range(nargs)]
+    if kwnames is None:
+        params.append("**_kw")
+    elif kwnames:
+        params += ["*"] + list(kwnames)
+    namespace = {}
+    exec(f"def noop({', '.join(params)}):\n    pass", namespace)
+    return namespace["noop"]
+
+
+@functools.lru_cache(maxsize=None)
+def _empty_call_time(number, shape=None):
+    """Return the least seconds per call timeit measures for an empty
+    callable looped number times, the timer and loop overhead.
+
+    With shape, of a _BoundCall, the empty call is made through the same
+    compiled loop with as many arguments.
+    """
+    if shape is None:
+        timer = timeit.Timer(lambda: None)
+    else:
+        nargs, kwnames = shape
+        timer = _BoundCall(_noop_function(shape), [None]*nargs,
+                           {"x": None} if kwnames is None
+                           else dict.fromkeys(kwnames)).timer()
+    totals = timer.repeat(repeat=7, number=number)
+    return min(totals) / number
+
+
+def _callee_name(func):
+    """Return a short name of a pstats function key (file, line, name)."""
+    filename, line, name = func
+    if filename == "~":
+        return name     # builtins, e.g. <built-in method builtins.sorted>
+    return f"{os.path.basename(filename)}:{line}({name})"
+
+
+def _measure_callees(call, top=10):
+    """Run call once under cProfile, return dict of its callees' times.
+
+    Keys are "callee:<name>" with the seconds spent in that function
+    itself, excluding its callees, so the values add up to the runtime of
+    the call. The top functions by time are kept, the rest are summed
+    under "callee:other".
+    """
+    import cProfile     # only needed for this option
+    import pstats
+    profiler = cProfile.Profile()
+    profiler.runcall(call)
+    own = {}
+    for func, (_, _, tottime, _, _) in pstats.Stats(profiler).stats.items():
+        if func[0] == __file__ or "_lsprof.Profiler" in func[2]:
+            continue    # profplot's call wrappers and the profiler itself
+        name = _callee_name(func)
+        own[name] = own.get(name, 0) + tottime
+    ranked = sorted(own.items(), key=lambda item: item[1], reverse=True)
+    ret = {f"callee:{name}": secs for name, secs in ranked[:top]}
+    ret["callee:other"] = sum(secs for _, secs in ranked[top:])
+    return ret
+
+
+def _environment():
+    """Return a dict describing the machine and Python taking the
+    measurements, to tell which runs are comparable."""
+    timer = time.get_clock_info("perf_counter")
+    env = {"python_version": platform.python_version(),
+           "python_implementation": platform.python_implementation(),
+           "platform": platform.platform(),
+           "machine": platform.machine(),
+           "processor": platform.processor(),
+           "hostname": platform.node(),
+           "cpu_count": os.cpu_count(),
+           "timer_resolution": timer.resolution,
+           "gc_enabled": gc.isenabled()}
+    if hasattr(os, "sched_getaffinity"):
+        env["cpu_affinity"] = sorted(os.sched_getaffinity(0))
+    try:
+        with open("/sys/devices/system/cpu/cpu0/cpufreq/scaling_governor") \
+                as f:
+            env["cpu_governor"] = f.read().strip()
+    except OSError:
+        pass
+    return env
+
+
+# environment entries that must match for runs to be comparable
+_COMPARABLE_ENVIRONMENT = ("python_version", "python_implementation",
+                           "platform", "machine", "processor", "cpu_count")
+
+
+def _autorange(timer, min_time):
+    """Return a loop count for which one timer run takes >= min_time.
+
+    Mirrors timeit.Timer.autorange but with a configurable target time.
+    The first count reaching min_time is scaled up to reach it with 20%
+    to spare, as this first run is often slowed by cold caches and the
+    timed samples after it would otherwise fall short.
+    """
+    i = 1
+    while True:
+        for j in 1, 2, 5:
+            number = i * j
+            elapsed = timer.timeit(number)
+            if elapsed >= min_time:
+                return max(number,
+                           math.ceil(number * 1.2 * min_time / elapsed))
+        i *= 10
+
+
+class TimingStats(namedtuple("TimingStats", ["samples", "number", "min",
+                                             "median", "mean", "stdev",
+                                             "percentiles"])):
+    """Summary statistics of the timed samples taken for one x value.
+
+    Attributes:
+    -----------
+    - samples: tuple of per-call runtimes, one for each repeat.
+    - number: calls made per sample, the samples are already divided by it.
+    - min, median, mean, stdev: statistics of samples.
+    - percentiles: dict mapping each requested percentile to its value.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_samples(cls, samples, number=1, percentiles=()):
+        """Build stats from a non empty iterable of per-call runtimes."""
+        samples = tuple(samples)
+        if len(samples) == 0:
+            raise ValueError("Cannot summarise an empty list of samples.")
+        ordered = sorted(samples)
+        stdev = statistics.stdev(samples) if len(samples) > 1 else 0.0
+        return cls(samples, number, ordered[0], statistics.median(ordered),
+                   statistics.fmean(samples), stdev,
+                   {q: _percentile(ordered, q) for q in percentiles})
+
+
+class _PointFailure(namedtuple("_PointFailure", ["error"])):
+    """Stand-in for the point of an x value whose measurement raised, with
+    MeasureConfig(errors="record"). error is the exception as text."""
+    __slots__ = ()
+
+
+def _measure_memory(call, rss=False):
+    """Run call once under tracemalloc, return dict of its memory use.
+
+    Keys are peak_bytes, the most memory allocated at once during the call
+    above what was allocated before it, net_bytes, what the call left
+    allocated, net_block_delta, the change in sys.getallocatedblocks()
+    across the call, blocks it left allocated less blocks it freed, not a
+    count of its allocations, and with rss, rss_delta_bytes, the growth of
+    the process's peak resident set size.
+    """
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    if rss:
+        import resource     # unix only, only needed for this option
+        # ru_maxrss is in KiB on Linux and in bytes on macOS
+        rss_unit = 1 if sys.platform == "darwin" else 1024
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    try:
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        blocks_before = sys.getallocatedblocks()
+        call()
+        after, peak = tracemalloc.get_traced_memory()
+        blocks_after = sys.getallocatedblocks()
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+    ret = {"peak_bytes": peak - before, "net_bytes": after - before,
+           "net_block_delta": blocks_after - blocks_before}
+    if rss:
+        ret["rss_delta_bytes"] = rss_unit * (
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before)
+    return ret
+
+
+# hardware events of perf_event_open(2), PERF_TYPE_HARDWARE config values
+_PERF_EVENTS = {"cycles": 0, "instructions": 1, "cache_references": 2,
+                "cache_misses": 3, "branch_misses": 5}
+# syscall number of perf_event_open per machine
+_PERF_EVENT_OPEN = {"x86_64": 298, "aarch64": 241, "ppc64le": 319,
+                    "s390x": 331}
+
+
+def _open_perf_counters():
+    """Return dict of event name to file descriptor of the _PERF_EVENTS
+    counters of this process and the threads it starts, disabled.
+
+    Events the kernel doesn't support or allow, e.g. with no PMU exposed
+    to a virtual machine or a high perf_event_paranoid, are left out, on
+    other platforms than Linux all are.
+    """
+    number = _PERF_EVENT_OPEN.get(platform.machine())
+    if not sys.platform.startswith("linux") or number is None:
+        return {}
+    import ctypes
+    import struct
+    libc = ctypes.CDLL(None, use_errno=True)
+    # disabled, inherit, exclude_kernel and exclude_hv, so counting user
+    # space needs no more than the default perf_event_paranoid of 2
+    flags = 1 | 1 << 1 | 1 << 5 | 1 << 6
+    fds = {}
+    for name, config in _PERF_EVENTS.items():
+        # perf_event_attr up to config1, PERF_ATTR_SIZE_VER0
+        attr = ctypes.create_string_buffer(struct.pack(
+            "=IIQQQQQIIQ", 0, 64, config, 0, 0, 0, flags, 0, 0, 0))
+        # pid 0 and cpu -1, this process on any cpu, FD_CLOEXEC
+        fd = libc.syscall(number, attr, 0, -1, -1, 8)
+        if fd >= 0:
+            fds[name] = fd
+    return fds
+
+
+def _measure_counters(call):
+    """Run call once, return dict of the OS and hardware counters it moved.
+
+    Keys are user_time and system_time, CPU seconds, minor_faults and
+    major_faults, page faults served without and with disk I/O, and
+    voluntary_switches and involuntary_switches, context switches from
+    waiting and from preemption, all from getrusage of the process.
+    Where perf_event_open is allowed the user space counts of the
+    _PERF_EVENTS hardware events are added, e.g. cache_misses.
+    """
+    import fcntl        # unix only, only needed for this option
+    import resource
+    import struct
+    # perf_event ioctls, _IO('$', 0), _IO('$', 1) and _IO('$', 3)
+    enable, disable, reset = 0x2400, 0x2401, 0x2403
+    fds = _open_perf_counters()
+    try:
+        for fd in fds.values():
+            fcntl.ioctl(fd, reset, 0)
+        before = resource.getrusage(resource.RUSAGE_SELF)
+        for fd in fds.values():
+            fcntl.ioctl(fd, enable, 0)
+        call()
+        for fd in fds.values():
+            fcntl.ioctl(fd, disable, 0)
+        after = resource.getrusage(resource.RUSAGE_SELF)
+        ret = {name: struct.unpack("=Q", os.read(fd, 8))[0]
+               for name, fd in fds.items()}
+    finally:
+        for fd in fds.values():
+            os.close(fd)
+    for name, field in (("user_time", "ru_utime"),
+                        ("system_time", "ru_stime"),
+                        ("minor_faults", "ru_minflt"),
+                        ("major_faults", "ru_majflt"),
+                        ("voluntary_switches", "ru_nvcsw"),
+                        ("involuntary_switches", "ru_nivcsw")):
+        ret[name] = getattr(after, field) - getattr(before, field)
+    return ret
+
+
+class MeasureConfig:
+    """Settings controlling how each profile point is measured.
+
+    The default settings time a single call per x value.
+
+    Methods:
+    --------
+    - measure: Time the given callable, return TimingStats.
+    - measure_group: Time several callables in turns, return TimingStats.
+    - measure_extra: Take the optional measurements, return a dict.
+    - profiles_callees: Return whether a point is run under cProfile.
+    """
+
+    def __init__(self, repeat=1, warmup=0, number=1, min_time=0.2,
+                 percentiles=(5, 25, 75, 95), band=(25, 75), memory=False,
+                 rss=False, timeout=None, label_timeout=None, gc="off",
+                 cpus=None, shuffle=False, seed=None, calibrate=False,
+                 cprofile=None, cprofile_top=10, errors="raise",
+                 counters=False):
+        """MeasureConfig Init.
+
+        Kwargs:
+        -------
+        - repeat: int, number of timed samples taken per x value.
+        - warmup: int, untimed calls made before timing each x value.
+        - number: int or None, calls made per timed sample. None auto-ranges
+                  the count, like timeit.Timer.autorange, so that a sample
+                  lasts at least min_time. Use this for functions that run
+                  faster than the timer resolution.
+        - min_time: float, target seconds per sample when auto-ranging.
+        - percentiles: iterable of percentiles (0-100) kept per x value.
+        - band: pair of percentiles, both in percentiles, giving the spread
+                band drawn around the median by ProfilePlotter.plot.
+        - memory: bool, also record the peak allocated bytes, the bytes
+                  left allocated and the net change in allocated blocks
+                  of each point, using tracemalloc. This is done in one
+                  extra, untimed call so tracing doesn't slow the timed
+                  ones.
+        - rss: bool, with memory, also record the growth of the process's
+               peak resident set size during that call. Unix only.
+        - timeout: float, seconds one x value may take, all its samples
+                   included. A point running longer is killed and marked
+                   as timed out, and the larger x values after it are
+                   skipped. Points are then measured in a forked child
+                   process, see _call_with_timeout.
+        - label_timeout: float, seconds a whole profile may take. Once
+                         used up the running point is killed and the
+                         remaining x values are skipped.
+        - gc: str, garbage collection while timing. "off", as timeit does,
+              "on", or "collect": collect just before the timed samples
+              of each point and keep it off while timing.
+        - cpus: iterable of cpu ids the process is pinned to while timing,
+                so the scheduler can't migrate it. Ignored on platforms
+                without os.sched_setaffinity.
+        - shuffle: bool, measure the x values in a random order, spreading
+                   slow drift, e.g. thermal, across the points rather than
+                   into a trend. Results are still given sorted by x.
+        - seed: int, seed of the shuffle, for repeatable orders.
+        - calibrate: bool, subtract the cost of timing an empty call, the
+                     timer and loop overhead, from every sample.
+        - cprofile: True or an iterable of x values, run the function of
+                    every, or of these, x values once more under cProfile,
+                    separately from the timed runs, and record the time
+                    spent in each callee, see _measure_callees.
+        - cprofile_top: int, callees kept per point, the rest are summed
+                        as "callee:other".
+        - errors: str, "raise" an exception a point raises, ending the
+                  profile, or "record" it as a failed point, see
+                  ProfileSeries.failed, and carry on with the next.
+        - counters: bool, also record the CPU time, page faults and context
+                    switches of each point and, on Linux where permitted,
+                    hardware counters such as cache misses, see
+                    _measure_counters. Taken in one extra, untimed call.
+                    Unix only.
+
+        Raises:
+        -------
+        - TypeError: repeat, warmup or number are not integers
+        - ValueError: repeat or number < 1, warmup < 0, min_time <= 0,
+                      percentiles outside 0-100, band not in percentiles,
+                      timeout or label_timeout <= 0, unknown gc policy,
+                      cpus is empty, cprofile_top < 1, unknown errors
+                      policy, counters without the resource module
+        """
+        for name, val in (("repeat", repeat), ("warmup", warmup),
+                          ("number", 1 if number is None else number)):
+            if not isinstance(val, int) or isinstance(val, bool):
+                raise TypeError(f"{name} must be of type int. got type"
+                                f" {type(val)}")
+        if repeat < 1 or warmup < 0 or (number is not None and number < 1):
+            raise ValueError("repeat and number must be >= 1 and warmup"
+                             " >= 0.")
+        if min_time <= 0:
+            raise ValueError("min_time must be positive.")
+        percentiles = tuple(percentiles)
+        if any(q < 0 or q > 100 for q in percentiles):
+            raise ValueError("percentiles must be within 0 and 100.")
+        band = tuple(band)
+        if len(band) != 2 or any(q not in percentiles for q in band):
+            raise ValueError("band must be a pair of values in percentiles.")
+        if any(t is not None and t <= 0 for t in (timeout, label_timeout)):
+            raise ValueError("timeout and label_timeout must be positive.")
+        if gc not in ("off", "on", "collect"):
+            raise ValueError("gc must be one of 'off', 'on' or 'collect'.")
+        if cpus is not None:
+            cpus = tuple(sorted(cpus))
+            if len(cpus) == 0:
+                raise ValueError("cpus must not be empty.")
+        if cprofile_top < 1:
+            raise ValueError("cprofile_top must be >= 1.")
+        if errors not in ("raise", "record"):
+            raise ValueError("errors must be one of 'raise' or 'record'.")
+        if counters and importlib.util.find_spec("resource") is None:
+            raise ValueError("counters need the resource module, which is"
+                             " Unix only.")
+        self.repeat = repeat
+        self.warmup = warmup
+        self.number = number
+        self.min_time = min_time
+        self.percentiles = percentiles
+        self.band = band
+        self.memory = memory
+        self.rss = rss
+        self.timeout = timeout
+        self.label_timeout = label_timeout
+        self.gc = gc
+        self.cpus = cpus
+        self.shuffle = shuffle
+        self.seed = seed
+        self.calibrate = calibrate
+        self.cprofile = (cprofile if cprofile is None or cprofile is True
+                         else tuple(cprofile))
+        self.cprofile_top = cprofile_top
+        self.errors = errors
+        self.counters = counters
+
+    def profiles_callees(self, x):
+        """Return whether the point x is to be run under cProfile."""
+        return self.cprofile is True or (self.cprofile is not None
+                                         and x in self.cprofile)
+
+    def measure_extra(self, call, setup=None):
+        """Take the enabled untimed measurements of call, return a dict.
+
+        setup, if given, is called first, outside of the measurement.
+        """
+        extra = {}
+        if self.memory:
+            if setup is not None:
+                setup()
+            extra.update(_measure_memory(call, self.rss))
+        if self.counters:
+            if setup is not None:
+                setup()
+            extra.update(_measure_counters(call))
+        return extra
+
+    @contextlib.contextmanager
+    def _pinned(self):
+        """Pin the process to cpus, if set, for the duration."""
+        pinned = None
+        if self.cpus is not None and hasattr(os, "sched_setaffinity"):
+            pinned = os.sched_getaffinity(0)
+            os.sched_setaffinity(0, self.cpus)
+        try:
+            yield
+        finally:
+            if pinned is not None:
+                os.sched_setaffinity(0, pinned)
+
+    def _timer(self, call, setup=None):
+        """Return a timeit.Timer of call, setup and gc set as configured."""
+        timed_setup = setup
+        if self.gc == "on":
+            # timeit turns gc off before setup, switch it back on there
+            def timed_setup():
+                if setup is not None:
+                    setup()
+                gc.enable()
+        if isinstance(call, _BoundCall):
+            return call.timer(timed_setup)
+        return timeit.Timer(call, "pass" if timed_setup is None
+                            else timed_setup)
+
+    def _stats(self, totals, number, shape=None):
+        """Return the TimingStats of the sample totals of number calls of
+        the given _BoundCall shape."""
+        overhead = _empty_call_time(number, shape) if self.calibrate else 0
+        return TimingStats.from_samples(
+            (max(t/number - overhead, 0) for t in totals), number,
+            self.percentiles)
+
+    def measure(self, call, setup=None):
+        """Time the zero argument callable call, return TimingStats.
+
+        setup, if given, is a zero argument callable run untimed before
+        each warmup call and each timed sample, e.g. to reset state the
+        call changes. A sample of several calls shares one setup. A
+        _BoundCall is timed without any wrapper around the call.
+        """
+        with self._pinned():
+            for _ in range(self.warmup):
+                if setup is not None:
+                    setup()
+                call()
+            if self.gc == "collect":
+                gc.collect()
+            timer = self._timer(call, setup)
+            number = self.number
+            if number is None:
+                number = _autorange(timer, self.min_time)
+            totals = timer.repeat(repeat=self.repeat, number=number)
+        return self._stats(totals, number, getattr(call, "shape", None))
+
+    def measure_group(self, make_calls, single=()):
+        """Time several calls against each other, return their TimingStats.
+
+        make_calls is a list of zero argument functions, each returning the
+        callable to time in one sample, built untimed, e.g. a fresh copy
+        of a call's input. Samples are taken in turns, a sample of every
+        call per round with the first call rotating between rounds, so
+        drift during the point is spread evenly over the calls rather than
+        favouring whichever is timed first. The calls at the indices in
+        single are made once per sample whatever number is, so each call
+        gets a callable of its own, e.g. for calls changing their input.
+        """
+        with self._pinned():
+            numbers = []
+            shapes = []
+            for ind, make_call in enumerate(make_calls):
+                for _ in range(self.warmup):
+                    make_call()()
+                call = make_call()
+                number = 1 if ind in single else self.number
+                if number is None:
+                    number = _autorange(self._timer(call), self.min_time)
+                numbers.append(number)
+                shapes.append(getattr(call, "shape", None))
+            if self.gc == "collect":
+                gc.collect()
+            totals = [[] for _ in make_calls]
+            order = list(range(len(make_calls)))
+            for round_ in range(self.repeat):
+                first = round_ % len(order)
+                for i in order[first:] + order[:first]:
+                    totals[i].append(
+                        self._timer(make_calls[i]()).timeit(numbers[i]))
+        return [self._stats(*point) for point in zip(totals, numbers, shapes)]
+
+
+class ProfileSeries:
+    """x values and timing statistics produced by one profiler.
+
+    Iterating over a series gives the x values then the median runtimes,
+    so x, y = series and ax.plot(*series) work as with plain lists.
+    extras holds a dict per point of further measurements, e.g. memory.
+    timed_out and skipped list the x values left without a point because
+    they ran over MeasureConfig.timeout or came after a timeout. failed
+    lists [x, error] pairs of points that raised, with
+    MeasureConfig(errors="record").
+
+    Methods:
+    --------
+    - append: Add a point to the series.
+    - extend: Add the points of another series.
+    - band: Return lists of the given low and high percentiles.
+    - extra_columns: Return the extras as a dict of lists.
+    """
+
+    def __init__(self, x=None, stats=None, extras=None, timed_out=None,
+                 skipped=None, failed=None):
+        self.x = [] if x is None else list(x)
+        self.stats = [] if stats is None else list(stats)
+        self.extras = ([{} for _ in self.x] if extras is None
+                       else [dict(e) for e in extras])
+        if not len(self.x) == len(self.stats) == len(self.extras):
+            raise ValueError("x, stats and extras must be of equal length.")
+        self.timed_out = [] if timed_out is None else list(timed_out)
+        self.skipped = [] if skipped is None else list(skipped)
+        self.failed = [] if failed is None else list(failed)
+
+    @property
+    def y(self):
+        """Median runtime of each point."""
+        return [s.median for s in self.stats]
+
+    def append(self, x, stats, extra=None):
+        """Add the point x with its TimingStats and extra dict."""
+        self.x.append(x)
+        self.stats.append(stats)
+        self.extras.append({} if extra is None else extra)
+
+    def extend(self, other):
+        """Add the points of the ProfileSeries other."""
+        for point in zip(other.x, other.stats, other.extras):
+            self.append(*point)
+        self.timed_out.extend(other.timed_out)
+        self.skipped.extend(other.skipped)
+        self.failed.extend(other.failed)
+
+    def extra_columns(self):
+        """Return dict of extra name to per-point list, nan where missing."""
+        names = sorted({k for e in self.extras for k in e})
+        return {k: [e.get(k, math.nan) for e in self.extras] for k in names}
+
+    def band(self, low, high):
+        """Return lists of the low and high percentile of each point."""
+        return ([s.percentiles[low] for s in self.stats],
+                [s.percentiles[high] for s in self.stats])
+
+    def __len__(self):
+        return len(self.x)
+
+    def __iter__(self):
+        yield self.x
+        yield self.y
+
+
+# candidate models of fit_complexity, simplest first. Each maps x values
+# to the growth term f, fitted as runtime = a*f(x) + b.
+_COMPLEXITY_MODELS = {
+    "O(1)": lambda x: np.zeros_like(x),
+    "O(log n)": lambda x: np.log(np.maximum(x, 1)),
+    "O(n)": lambda x: x,
+    "O(n log n)": lambda x: x * np.log(np.maximum(x, 1)),
+    "O(n^2)": lambda x: x**2,
+}
+
+
+class ComplexityFit(namedtuple("ComplexityFit", ["name", "coeffs", "residual",
+                                                 "r_squared", "residuals",
+                                                 "model"])):
+    """Best fitting complexity model of a runtime curve.
+
+    Attributes:
+    -----------
+    - name: str, name of the model, e.g. "O(n log n)".
+    - coeffs: pair (a, b) of runtime = a*f(x) + b.
+    - residual: float, sum of squared residuals of the fit.
+    - r_squared: float, coefficient of determination of the fit.
+    - residuals: dict, model name to the residual of every model tried.
+    - model: function f of the model.
+
+    Methods:
+    --------
+    - predict: Return the predicted runtime at x.
+    """
+    __slots__ = ()
+
+    def predict(self, x):
+        """Return the predicted runtime at x, a number or array."""
+        a, b = self.coeffs
+        return a * self.model(np.asarray(x, dtype=float)) + b
+
+
+def fit_complexity(x, y, models=None, tolerance=0.05):
+    """Fit complexity models to a runtime curve, return the best fit.
+
+    Every model is fitted as y = a*f(x) + b by least squares, all at once
+    as arrays. Models fitting with a < 0, shrinking as x grows, are fitted
+    as constants instead. The simplest model whose residual is within
+    tolerance of the lowest one wins, so noise doesn't pick n^2 over n.
+
+    Input:
+    ------
+    - x: iterable of numbers, problem sizes.
+    - y: iterable of numbers, runtimes at x.
+
+    Kwargs:
+    -------
+    - models: dict of name to vectorized function f, ordered simplest
+              first. Defaults to O(1), O(log n), O(n), O(n log n), O(n^2).
+    - tolerance: float, relative residual margin preferring simpler models.
+
+    Return:
+    -------
+    - ComplexityFit
+
+    Raises:
+    -------
+    - ValueError: fewer than 2 points, x and y of different lengths
+    """
+    models = _COMPLEXITY_MODELS if models is None else models
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if x.shape != y.shape or x.ndim != 1 or len(x) < 2:
+        raise ValueError("x and y must be equal length sequences of at"
+                         " least 2 points.")
+    names = list(models)
+    f = np.stack([np.broadcast_to(models[k](x), x.shape) for k in names])
+    f_mean = f.mean(axis=1, keepdims=True)
+    f_var = ((f - f_mean)**2).sum(axis=1)
+    cov = ((f - f_mean) * (y - y.mean())).sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        a = np.where(f_var > 0, cov / f_var, 0.0)
+    a = np.maximum(a, 0.0)
+    b = y.mean() - a * f_mean[:, 0]
+    residuals = ((y - (a[:, None]*f + b[:, None]))**2).sum(axis=1)
+    floor = residuals.min() * (1 + tolerance) + 1e-12 * (y**2).sum()
+    best = int(np.argmax(residuals <= floor))
+    total = ((y - y.mean())**2).sum()
+    r_squared = 1 - residuals[best]/total if total > 0 else 1.0
+    return ComplexityFit(names[best], (float(a[best]), float(b[best])),
+                         float(residuals[best]), float(r_squared),
+                         dict(zip(names, residuals.tolist())),
+                         models[names[best]])
+
+
+def _decimate(y, max_points):
+    """Return the sorted indices of at most max_points points of the curve
+    y, in x order, to draw in its place.
+
+    The points are split into max_points // 2 buckets of consecutive
+    points and the least and largest y of each kept, so spikes and dips
+    survive however many points are dropped. nan points are only kept
+    where a bucket has nothing else.
+    """
+    y = np.asarray(y, dtype=float)
+    if max_points is None or len(y) <= max_points:
+        return np.arange(len(y))
+    low = np.where(np.isnan(y), np.inf, y)
+    high = np.where(np.isnan(y), -np.inf, y)
+    edges = np.linspace(0, len(y), max(max_points // 2, 1) + 1).astype(int)
+    keep = []
+    for start, end in zip(edges[:-1], edges[1:]):
+        keep += [start + np.argmin(low[start:end]),
+                 start + np.argmax(high[start:end])]
+    return np.unique(keep)
+
+
+# y axis labels of the LabelResult columns plot can draw
+_METRIC_LABELS = {
+    "min": "Minimum runtime (s)", "mean": "Mean runtime (s)",
+    "median": "Median runtime (s)", "stdev": "Runtime stdev (s)",
+    "peak_bytes": "Peak allocated memory (bytes)",
+    "net_bytes": "Memory left allocated (bytes)",
+    "net_block_delta": "Net change in allocated blocks",
+    "rss_delta_bytes": "Peak RSS growth (bytes)",
+    "user_time": "User CPU time (s)",
+    "system_time": "System CPU time (s)",
+    "minor_faults": "Minor page faults",
+    "major_faults": "Major page faults",
+    "voluntary_switches": "Voluntary context switches",
+    "involuntary_switches": "Involuntary context switches",
+    "cycles": "CPU cycles",
+    "instructions": "Instructions",
+    "cache_references": "Cache references",
+    "cache_misses": "Cache misses",
+    "branch_misses": "Branch misses",
+    "throughput": "Throughput (calls/s)",
+    "latency_p50": "Median call latency (s)",
+    "latency_p99": "99th percentile call latency (s)",
+    "workers": "Workers",
+    "speedup": "Speedup",
+    "efficiency": "Parallel efficiency"}
+
+
+def _stat_columns(samples, percentiles):
+    """Return dict of per-row statistics of a 2d, nan padded samples array."""
+    if samples.shape[0] == 0 or samples.shape[1] == 0:
+        empty = np.empty(samples.shape[0])
+        return {name: empty for name in ["min", "median", "mean", "stdev"]
+                + [f"p{q:g}" for q in percentiles]}
+    counts = np.sum(~np.isnan(samples), axis=1)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)    # single samples
+        stdev = np.nanstd(samples, axis=1, ddof=1)
+    # np.nanpercentile goes row by row in python, slow for long results.
+    # Sorted, the nans of a row come last, so the rows of each sample
+    # count take one vectorised percentile of their leading samples
+    ordered = np.sort(samples, axis=1)
+    quantiles = np.full((1 + len(percentiles), samples.shape[0]), np.nan)
+    for count in np.unique(counts[counts > 0]):
+        rows = counts == count
+        quantiles[:, rows] = np.percentile(ordered[rows, :count],
+                                           [50, *percentiles], axis=1)
+    cols = {"min": ordered[:, 0],
+            "median": quantiles[0],
+            "mean": np.nanmean(samples, axis=1),
+            "stdev": np.where(counts > 1, stdev, 0.0)}
+    for q, col in zip(percentiles, quantiles[1:]):
+        cols[f"p{q:g}"] = col
+    return cols
+
+
+class LabelResult:
+    """Array backed results of a single profile label.
+
+    Attributes:
+    -----------
+    - x: 1d array of x values.
+    - samples: 2d array of per-call runtimes, one row per x value. Rows
+               with fewer samples than the longest are padded with nan.
+    - number: 1d int array, calls made per sample of each x value.
+    - extra: dict of further per-point 1d arrays.
+    - metadata: dict, JSON serialisable information on the profile. The
+                "percentiles" and "band" entries decide the stat columns,
+                "timed_out", "skipped" and "failed" list x values without
+                a point, see ProfileSeries. Grid profiles add "grid_keys", the
+                varied keys, the first giving x and the others extra
+                columns.
+    - columns: dict of per-point 1d arrays, the sample statistics "min",
+               "median", "mean", "stdev" and "p<q>" for each percentile,
+               followed by the extra arrays.
+    """
+
+    def __init__(self, x, samples, number, extra=None, metadata=None):
+        self.x = np.asarray(x)
+        self.samples = np.asarray(samples, dtype=float)
+        if self.samples.ndim != 2:
+            self.samples = self.samples.reshape(
+                len(self.x), -1 if self.samples.size else 0)
+        self.number = np.asarray(number, dtype=np.int64).reshape(len(self.x))
+        self.extra = {k: np.asarray(v) for k, v in (extra or {}).items()}
+        self.metadata = dict(metadata or {})
+        self.metadata.setdefault("percentiles", [])
+        self.metadata.setdefault("band", None)
+        self.metadata.setdefault("timed_out", [])
+        self.metadata.setdefault("skipped", [])
+        self.metadata.setdefault("failed", [])
+        self.columns = _stat_columns(self.samples,
+                                     self.metadata["percentiles"])
+        self.columns.update(self.extra)
+
+    @classmethod
+    def from_series(cls, series, metadata=None):
+        """Build a LabelResult from a ProfileSeries."""
+        width = max((len(s.samples) for s in series.stats), default=0)
+        samples = np.full((len(series), width), np.nan)
+        for ind, stats in enumerate(series.stats):
+            samples[ind, :len(stats.samples)] = stats.samples
+        metadata = dict(metadata or {}, timed_out=list(series.timed_out),
+                        skipped=list(series.skipped),
+                        failed=list(series.failed))
+        return cls(series.x, samples, [s.number for s in series.stats],
+                   series.extra_columns(), metadata)
+
+    @property
+    def y(self):
+        """Median runtime of each point."""
+        return self.columns["median"]
+
+    def fit_complexity(self, models=None):
+        """Return the ComplexityFit of the median runtimes, see
+        fit_complexity."""
+        return fit_complexity(self.x, self.y, models)
+
+    def _grid_keys(self):
+        keys = self.metadata.get("grid_keys")
+        if keys is None or len(keys) != 2:
+            raise ValueError("Only results of profiles varying two keys are"
+                             " grids.")
+        return keys
+
+    def _metric(self, metric):
+        return self.y if metric == "time" else self.columns[metric]
+
+    def grid(self, metric="time"):
+        """Return a two key grid profile's metric as a 2d array.
+
+        Return:
+        -------
+        - xs, ys, values: the sorted values of the first and second grid
+          key, and the 2d array with values[j, i] the metric at
+          (xs[i], ys[j]), nan where not measured.
+
+        Raises:
+        -------
+        - ValueError: the result is not of a two key grid profile
+        """
+        keys = self._grid_keys()
+        second = self.columns[keys[1]]
+        xs = np.unique(self.x)
+        ys = np.unique(second)
+        values = np.full((len(ys), len(xs)), np.nan)
+        values[np.searchsorted(ys, second),
+               np.searchsorted(xs, self.x)] = self._metric(metric)
+        return xs, ys, values
+
+    def slices(self, metric="time", by=None):
+        """Return a two key grid profile as a family of lines.
+
+        Kwargs:
+        -------
+        - metric: str, "time" or a column name, the y values.
+        - by: str, the grid key held fixed along each line, the second
+              key by default. The other key gives the x values.
+
+        Return:
+        -------
+        - list of (value of by, x array, y array), one per line.
+
+        Raises:
+        -------
+        - ValueError: not a two key grid profile, by not one of its keys
+        """
+        keys = self._grid_keys()
+        by = keys[1] if by is None else by
+        if by not in keys:
+            raise ValueError(f"by must be one of the grid keys {keys}.")
+        fixed = self.x if by == keys[0] else self.columns[keys[1]]
+        along = self.columns[keys[1]] if by == keys[0] else self.x
+        y = self._metric(metric)
+        lines = []
+        for value in np.unique(fixed):
+            mask = fixed == value
+            order = np.argsort(along[mask])
+            lines.append((value, along[mask][order], y[mask][order]))
+        return lines
+
+    def callee_shares(self, top=5):
+        """Return the share of runtime of the top callees at each x value
+        profiled with MeasureConfig.cprofile.
+
+        Return:
+        -------
+        - x array of the profiled points and dict of callee name to array
+          of its share of the point's runtime. Callees are ranked by mean
+          share, highest first, and the rest summed as "other", so the
+          shares add up to 1 at each point.
+        """
+        names = [k for k in self.extra
+                 if k.startswith("callee:") and k != "callee:other"]
+        if not names:
+            return self.x[:0], {}
+        times = np.column_stack([self.extra[k] for k in names
+                                 + ["callee:other"]]).astype(float)
+        profiled = ~np.all(np.isnan(times), axis=1)
+        times = np.nan_to_num(times[profiled])
+        totals = times.sum(axis=1, keepdims=True)
+        shares = times / np.where(totals > 0, totals, 1)
+        ranked = np.argsort(-shares[:, :-1].mean(axis=0), kind="stable")
+        ret = {names[i][len("callee:"):]: shares[:, i] for i in ranked[:top]}
+        ret["other"] = shares.sum(axis=1) - sum(ret.values())
+        return self.x[profiled], ret
+
+    def band(self):
+        """Return the arrays of the low and high band percentiles or None."""
+        if self.metadata["band"] is None:
+            return None
+        low, high = self.metadata["band"]
+        return self.columns[f"p{low:g}"], self.columns[f"p{high:g}"]
+
+    def __len__(self):
+        return len(self.x)
+
+    def _to_dict(self):
+        return {"x": self.x.tolist(),
+                "samples": [[None if math.isnan(v) else v for v in row]
+                            for row in self.samples.tolist()],
+                "number": self.number.tolist(),
+                "extra": {k: v.tolist() for k, v in self.extra.items()},
+                "metadata": self.metadata}
+
+    @classmethod
+    def _from_dict(cls, data):
+        samples = [[np.nan if v is None else v for v in row]
+                   for row in data["samples"]]
+        return cls(data["x"], samples, data["number"], data["extra"],
+                   data["metadata"])
+
+
+class ProfileResult:
+    """Array backed results of a profiling run, one LabelResult per label.
+
+    Results can be saved and loaded as CSV, JSON or compressed .npz so runs
+    can be plotted, compared and archived without profiling again.
+
+    Methods:
+    --------
+    - from_series: Build from a dict of label to ProfileSeries.
+    - fit_complexity: Return the ComplexityFit of every label.
+    - save: Write to a file, the format chosen by its extension.
+    - load: Read a file written by save.
+    - to_csv, from_csv, to_json, from_json, to_npz, from_npz: the same for
+      a given format.
+    """
+
+    _FORMATS = {".csv": "csv", ".json": "json", ".npz": "npz"}
+
+    def __init__(self, labels=None, metadata=None):
+        """ProfileResult Init.
+
+        Kwargs:
+        -------
+        - labels: dict, label to LabelResult.
+        - metadata: dict, JSON serialisable information on the run.
+        """
+        self.labels = dict(labels or {})
+        self.metadata = dict(metadata or {})
+
+    @classmethod
+    def from_series(cls, series, label_metadata=None, metadata=None):
+        """Build a ProfileResult from a dict of label to ProfileSeries.
+
+        Kwargs:
+        -------
+        - label_metadata: dict, label to the metadata dict of that label.
+        - metadata: dict, metadata of the whole run.
+        """
+        label_metadata = label_metadata or {}
+        return cls({label: LabelResult.from_series(s, label_metadata.get(label))
+                    for label, s in series.items()}, metadata)
+
+    def __getitem__(self, label):
+        return self.labels[label]
+
+    def fit_complexity(self, models=None):
+        """Return dict of label to the ComplexityFit of its runtimes.
+
+        Labels with fewer than 2 points and grid profiles are left out.
+        """
+        return {label: res.fit_complexity(models) for label, res in self
+                if len(res) >= 2 and "grid_keys" not in res.metadata}
+
+    def __iter__(self):
+        """Give label and LabelResult for each label present."""
+        yield from self.labels.items()
+
+    def __len__(self):
+        return len(self.labels)
+
+    def save(self, path):
+        """Write the result to path as CSV, JSON or .npz by its extension.
+
+        Raises:
+        -------
+        - ValueError: unknown file extension
+        """
+        getattr(self, f"to_{self._format(path)}")(path)
+
+    @classmethod
+    def load(cls, path):
+        """Read a result written by save, the format given by extension."""
+        return getattr(cls, f"from_{cls._format(path)}")(path)
+
+    @classmethod
+    def _format(cls, path):
+        ext = os.path.splitext(str(path))[1].lower()
+        if ext not in cls._FORMATS:
+            raise ValueError(f"Unknown result file extension {ext!r}. Use"
+                             f" one of {sorted(cls._FORMATS)}.")
+        return cls._FORMATS[ext]
+
+    def _to_dict(self):
+        return {"metadata": self.metadata,
+                "labels": {k: v._to_dict() for k, v in self.labels.items()}}
+
+    @classmethod
+    def _from_dict(cls, data):
+        return cls({k: LabelResult._from_dict(v)
+                    for k, v in data["labels"].items()}, data["metadata"])
+
+    def to_json(self, path):
+        """Write the result to a JSON file."""
+        with open(path, "w") as f:
+            json.dump(self._to_dict(), f)
+
+    @classmethod
+    def from_json(cls, path):
+        """Read a result from a JSON file written by to_json."""
+        with open(path) as f:
+            return cls._from_dict(json.load(f))
+
+    def to_csv(self, path):
+        """Write the result to a CSV file, one row per sample.
+
+        Rows hold label, x, number, sample index and sample followed by
+        the extra columns of the point. Metadata is kept as JSON in a
+        leading comment line.
+        """
+        extra_names = sorted({k for _, res in self for k in res.extra})
+        meta = {"metadata": self.metadata,
+                "labels": {k: v.metadata for k, v in self.labels.items()}}
+        with open(path, "w", newline="") as f:
+            f.write(f"# {json.dumps(meta)}\n")
+            writer = csv.writer(f)
+            writer.writerow(["label", "x", "number", "sample_index",
+                             "sample"] + extra_names)
+            for label, res in self:
+                for ind in range(len(res)):
+                    extras = [res.extra[k][ind] if k in res.extra else ""
+                              for k in extra_names]
+                    for s_ind, sample in enumerate(res.samples[ind]):
+                        if not math.isnan(sample):
+                            writer.writerow([label, res.x[ind],
+                                             res.number[ind], s_ind,
+                                             repr(float(sample))] + extras)
+
+    @classmethod
+    def from_csv(cls, path):
+        """Read a result from a CSV file written by to_csv."""
+        with open(path, newline="") as f:
+            meta = json.loads(f.readline()[1:])
+            rows = list(csv.DictReader(f))
+        points = {label: {} for label in meta["labels"]}
+        for row in rows:
+            # the points of grid profiles share x, their other keys differ
+            grid_keys = meta["labels"][row["label"]].get("grid_keys", [])
+            point = points[row["label"]].setdefault(
+                (row["x"],) + tuple(row[k] for k in grid_keys[1:]),
+                {"x": row["x"], "number": int(row["number"]), "samples": {},
+                 "extra": row})
+            point["samples"][int(row["sample_index"])] = float(row["sample"])
+        labels = {}
+        for label, label_points in points.items():
+            width = max((max(p["samples"]) + 1
+                         for p in label_points.values()), default=0)
+            samples = np.full((len(label_points), width), np.nan)
+            for ind, p in enumerate(label_points.values()):
+                for s_ind, sample in p["samples"].items():
+                    samples[ind, s_ind] = sample
+            extra_names = [k for k in (rows[0] if rows else {})
+                           if k not in ("label", "x", "number",
+                                        "sample_index", "sample")]
+            extra = {k: [float(p["extra"][k]) for p in label_points.values()]
+                     for k in extra_names
+                     if all(p["extra"][k] != "" for p in label_points.values())}
+            labels[label] = LabelResult(
+                [float(p["x"]) for p in label_points.values()], samples,
+                [p["number"] for p in label_points.values()],
+                extra if label_points else {}, meta["labels"][label])
+        return cls(labels, meta["metadata"])
+
+    def to_npz(self, path):
+        """Write the result to a compressed numpy .npz file."""
+        arrays = {}
+        for ind, (label, res) in enumerate(self):
+            arrays[f"{ind}_x"] = res.x
+            arrays[f"{ind}_samples"] = res.samples
+            arrays[f"{ind}_number"] = res.number
+            for k, v in res.extra.items():
+                arrays[f"{ind}_extra_{k}"] = v
+        meta = {"metadata": self.metadata,
+                "labels": [[k, v.metadata, sorted(v.extra)]
+                           for k, v in self.labels.items()]}
+        np.savez_compressed(path, __meta__=np.array(json.dumps(meta)),
+                            **arrays)
+
+    @classmethod
+    def from_npz(cls, path):
+        """Read a result from a .npz file written by to_npz."""
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["__meta__"]))
+            labels = {}
+            for ind, (label, label_meta, extra_names) in enumerate(
+                    meta["labels"]):
+                labels[label] = LabelResult(
+                    data[f"{ind}_x"], data[f"{ind}_samples"],
+                    data[f"{ind}_number"],
+                    {k: data[f"{ind}_extra_{k}"] for k in extra_names},
+                    label_meta)
+        return cls(labels, meta["metadata"])
+
+
+class BaselineStore:
+    """Directory of named ProfileResults to compare new runs against.
+
+    Methods:
+    --------
+    - save: Store a result under a name.
+    - load: Return the result stored under a name.
+    - names: Return the names of the stored results.
+    """
+
+    def __init__(self, directory=".profplot_baselines"):
+        self.directory = str(directory)
+
+    def _path(self, name):
+        if not name or os.sep in name or (os.altsep and os.altsep in name):
+            raise ValueError(f"Invalid baseline name {name!r}.")
+        return os.path.join(self.directory, f"{name}.npz")
+
+    def save(self, name, result):
+        """Store the ProfileResult result under name, replacing any."""
+        os.makedirs(self.directory, exist_ok=True)
+        result.to_npz(self._path(name))
+
+    def load(self, name):
+        """Return the ProfileResult stored under name.
+
+        Raises:
+        -------
+        - KeyError: no baseline of that name
+        """
+        path = self._path(name)
+        if not os.path.exists(path):
+            raise KeyError(f"No baseline named {name!r} in {self.directory}.")
+        return ProfileResult.from_npz(path)
+
+    def names(self):
+        """Return sorted list of the stored baseline names."""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(f[:-len(".npz")] for f in os.listdir(self.directory)
+                      if f.endswith(".npz"))
+
+
+@functools.lru_cache(maxsize=None)
+def _u_counts(n1, n2):
+    """Return the number of orderings of n1 and n2 untied samples giving
+    each Mann-Whitney U value 0..n1*n2."""
+    if n1 == 0 or n2 == 0:
+        return (1,)
+    # U(n1, n2) = U(n1 - 1, n2) + n2 when the largest value is from the
+    # first sample, U(n1, n2 - 1) otherwise
+    counts = [0] * (n1*n2 + 1)
+    for u, c in enumerate(_u_counts(n1 - 1, n2)):
+        counts[u + n2] += c
+    for u, c in enumerate(_u_counts(n1, n2 - 1)):
+        counts[u] += c
+    return tuple(counts)
+
+
+def _mann_whitney_greater(a, b):
+    """Return the one-sided Mann-Whitney p-value of b tending above a.
+
+    Exact for small samples, rounding half counted ties down so ties never
+    make a difference look more significant. A normal approximation with
+    tie and continuity correction for larger samples.
+    """
+    n1, n2 = len(a), len(b)
+    pooled = sorted(list(a) + list(b))
+    u = sum((y > x) + 0.5*(y == x) for x in a for y in b)
+    if n1 + n2 <= 30:
+        counts = _u_counts(n1, n2)
+        return sum(counts[math.floor(u):]) / sum(counts)
+    mean = n1*n2/2
+    tie_term = sum(t**3 - t for t in
+                   (pooled.count(v) for v in set(pooled)))
+    var = n1*n2/12 * ((n1 + n2 + 1) - tie_term/((n1 + n2)*(n1 + n2 - 1)))
+    if var <= 0:
+        return 1.0
+    z = (u - mean - 0.5) / math.sqrt(var)
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+class ComparisonReport:
+    """Point by point comparison of a profiling run with a baseline.
+
+    Attributes:
+    -----------
+    - points: list of dicts, one per x value of each label, with the
+              label, x, baseline and current median, their ratio, the
+              p-value of the slowdown or speedup and a status of "ok",
+              "regression", "improvement", "new", "missing", or "failed"
+              or "timed_out" for points the current run lost so. Points of
+              grid profiles also hold the values of their other keys.
+    - passed: bool, no point regressed, failed or timed out.
+    - threshold, alpha: settings the report was made with.
+
+    Methods:
+    --------
+    - regressions: Return the points that regressed.
+    - to_dict, to_json: Machine readable report.
+    - plot: Overlay baseline and current curves per label.
+    """
+
+    def __init__(self, baseline, current, points, threshold, alpha):
+        self.baseline = baseline
+        self.current = current
+        self.points = points
+        self.threshold = threshold
+        self.alpha = alpha
+
+    @property
+    def passed(self):
+        return not any(p["status"] in ("regression", "failed", "timed_out")
+                       for p in self.points)
+
+    def regressions(self):
+        """Return the points with status "regression"."""
+        return [p for p in self.points if p["status"] == "regression"]
+
+    def to_dict(self):
+        """Return the report as a JSON serialisable dict."""
+        return {"passed": self.passed, "threshold": self.threshold,
+                "alpha": self.alpha, "points": self.points}
+
+    def to_json(self, path=None):
+        """Return the report as a JSON string, also written to path."""
+        text = json.dumps(self.to_dict(), indent=2)
+        if path is not None:
+            with open(path, "w") as f:
+                f.write(text)
+        return text
+
+    def plot(self):
+        """Plot baseline (dashed) and current curves of each label.
+
+        Regressed points are marked with a red x. Return fig, axes.
+        """
+        labels = list(dict.fromkeys(p["label"] for p in self.points))
+        fig, axes = plt.subplots(len(labels), 1, squeeze=False,
+                                 figsize=(19.2, 5.4*max(1, len(labels))))
+        axes = axes[:, 0]
+        for ax, label in zip(axes, labels):
+            for name, result, style in (("baseline", self.baseline, "--"),
+                                        ("current", self.current, "-")):
+                if label in result.labels:
+                    res = result[label]
+                    ax.plot(res.x, res.y, style, label=name)
+            bad = [p for p in self.regressions() if p["label"] == label]
+            if bad:
+                ax.plot([p["x"] for p in bad], [p["current"] for p in bad],
+                        "rx", markersize=10, label="regression")
+            ax.set_title(label)
+            ax.set_ylabel("Runtime (s)")
+            ax.legend(loc="upper left")
+        return fig, axes
+
+
+def _point_rows(res, grid_keys):
+    """Return dict of (x, *values of grid_keys) to row of the LabelResult
+    res, empty for None."""
+    if res is None:
+        return {}
+    columns = [res.x.tolist()] + [res.extra[k].tolist() for k in grid_keys]
+    return {point: i for i, point in enumerate(zip(*columns))}
+
+
+def _row_key(x):
+    """Return the _point_rows key of an x value of the timed_out or failed
+    metadata, a list of all key values for grid profiles."""
+    return tuple(x) if isinstance(x, list) else (x,)
+
+
+def compare_results(baseline, current, threshold=0.1, alpha=0.05):
+    """Compare a ProfileResult with a baseline one, point by point.
+
+    Points are matched by label and x value, and for grid profiles the
+    values of the other grid keys, which the points then also hold. A
+    point regresses when its median runtime grew by more than threshold
+    and a one-sided Mann-Whitney test of the repeated samples gives
+    p < alpha. Faster points are tested the same way the other side
+    round. Significance needs several samples per point (see
+    MeasureConfig.repeat), with one sample each no point can be flagged.
+
+    Input:
+    ------
+    - baseline: ProfileResult, e.g. from BaselineStore.load.
+    - current: ProfileResult of the run under test.
+
+    Kwargs:
+    -------
+    - threshold: float, relative slowdown tolerated, 0.1 is 10%.
+    - alpha: float, significance level of the test.
+
+    Return:
+    -------
+    - ComparisonReport
+
+    Warns:
+    ------
+    - RuntimeWarning: the runs' recorded environments differ in ways that
+                      make their timings incomparable, e.g. the machine or
+                      Python version.
+    """
+    base_env = baseline.metadata.get("environment") or {}
+    cur_env = current.metadata.get("environment") or {}
+    differing = [k for k in _COMPARABLE_ENVIRONMENT
+                 if k in base_env and k in cur_env
+                 and base_env[k] != cur_env[k]]
+    if differing:
+        warnings.warn("The baseline was measured in a different environment"
+                      f" ({', '.join(differing)} differ), timings may not be"
+                      " comparable.", RuntimeWarning)
+    points = []
+    for label in dict.fromkeys(list(baseline.labels) + list(current.labels)):
+        base = baseline.labels.get(label)
+        cur = current.labels.get(label)
+        grid_keys = (base or cur).metadata.get("grid_keys", [])[1:]
+        base_rows = _point_rows(base, grid_keys)
+        cur_rows = _point_rows(cur, grid_keys)
+        # points the current run lost, keyed like the rows
+        lost = {} if cur is None else {
+            "failed": {_row_key(x) for x, _ in cur.metadata["failed"]},
+            "timed_out": {_row_key(x) for x in cur.metadata["timed_out"]}}
+        for x in dict.fromkeys(list(base_rows) + list(cur_rows)):
+            point = {"label": label, "x": x[0], "baseline": None,
+                     "current": None, "ratio": None, "p_value": None}
+            point.update(zip(grid_keys, x[1:]))
+            if x not in cur_rows:
+                point["baseline"] = float(base.y[base_rows[x]])
+                point["status"] = ("failed" if x in lost.get("failed", ())
+                                   else "timed_out"
+                                   if x in lost.get("timed_out", ())
+                                   else "missing")
+            elif x not in base_rows:
+                point["current"] = float(cur.y[cur_rows[x]])
+                point["status"] = "new"
+            else:
+                b = base.samples[base_rows[x]]
+                c = cur.samples[cur_rows[x]]
+                b = b[~np.isnan(b)].tolist()
+                c = c[~np.isnan(c)].tolist()
+                point["baseline"] = statistics.median(b)
+                point["current"] = statistics.median(c)
+                ratio = (point["current"] / point["baseline"]
+                         if point["baseline"] > 0 else math.inf)
+                point["ratio"] = ratio
+                point["status"] = "ok"
+                if ratio > 1 + threshold:
+                    point["p_value"] = _mann_whitney_greater(b, c)
+                    if point["p_value"] < alpha:
+                        point["status"] = "regression"
+                elif ratio < 1 - threshold:
+                    point["p_value"] = _mann_whitney_greater(c, b)
+                    if point["p_value"] < alpha:
+                        point["status"] = "improvement"
+            points.append(point)
+    return ComparisonReport(baseline, current, points, threshold, alpha)
+
+
+class ParallelConfig:
+    """Settings for running profiles in a process pool.
+
+    Each label, or each x value of each label when per_point is set, is
+    profiled in a worker of a ProcessPoolExecutor. Workers are pinned to
+    one cpu each so they don't migrate onto each other's cores.
+    """
+
+    def __init__(self, workers=None, per_point=False, cpus=None, pin=True):
+        """ParallelConfig Init.
+
+        Kwargs:
+        -------
+        - workers: int, number of worker processes. Defaults to the number
+                   of cpus available.
+        - per_point: bool, send every x value out as its own task instead of
+                     a whole label. The variable iterable is read into a
+                     list to split it. Labels with a timeout or
+                     label_timeout are still sent whole.
+        - cpus: iterable of cpu ids the workers are pinned to, one each in
+                turn. Defaults to the cpus this process may run on.
+        - pin: bool, pin each worker to a cpu. Ignored where the platform
+               has no os.sched_setaffinity.
+
+        Raises:
+        -------
+        - TypeError: workers is not an integer
+        - ValueError: workers < 1, cpus is empty
+        """
+        if workers is not None:
+            if not isinstance(workers, int) or isinstance(workers, bool):
+                raise TypeError("workers must be of type int. got type"
+                                f" {type(workers)}")
+            if workers < 1:
+                raise ValueError("workers must be >= 1.")
+        if cpus is None:
+            cpus = (os.sched_getaffinity(0)
+                    if hasattr(os, "sched_getaffinity")
+                    else range(os.cpu_count() or 1))
+        cpus = sorted(cpus)
+        if len(cpus) == 0:
+            raise ValueError("cpus must not be empty.")
+        self.workers = len(cpus) if workers is None else workers
+        self.per_point = per_point
+        self.cpus = cpus
+        self.pin = pin and hasattr(os, "sched_setaffinity")
+
+
+def _hash_code(hasher, code):
+    """Feed a code object and the code objects nested in it to hasher."""
+    hasher.update(code.co_code)
+    hasher.update(repr(code.co_names).encode())
+    for const in code.co_consts:
+        if inspect.iscode(const):
+            _hash_code(hasher, const)
+        else:
+            hasher.update(repr(const).encode())
+
+
+def _code_fingerprint(obj):
+    """Return a hex digest of a function or class's name, source and code."""
+    hasher = hashlib.sha256()
+    hasher.update(f"{getattr(obj, '__module__', '')}."
+                  f"{getattr(obj, '__qualname__', repr(obj))}".encode())
+    try:
+        hasher.update(inspect.getsource(obj).encode())
+    except (OSError, TypeError):
+        pass    # builtins and interactively defined objects have no source
+    code = getattr(obj, "__code__", None)
+    if code is not None:
+        _hash_code(hasher, code)
+    return hasher.hexdigest()
+
+
+def _kwargs_fingerprint(kwargs):
+    """Return a hex digest of the given kwargs values."""
+    hasher = hashlib.sha256()
+    for k in sorted(kwargs):
+        hasher.update(k.encode())
+        try:
+            hasher.update(pickle.dumps(kwargs[k]))
+        except (pickle.PicklingError, AttributeError, TypeError):
+            hasher.update(repr(kwargs[k]).encode())
+    return hasher.hexdigest()
+
+
+def _point_key(label, fingerprint, x):
+    """Return the key a profile point is stored under."""
+    return hashlib.sha256(
+        f"{label}\0{fingerprint}\0{x!r}".encode()).hexdigest()
+
+
+class ResultCache:
+    """On-disk store of measured profile points, reused between runs.
+
+    Points are kept in an SQLite file under a key made from the profile
+    label, a fingerprint of the profiled code, the fixed kwargs and the
+    measurement settings, and the x value. Editing a function changes its
+    fingerprint so its old points are simply never looked up again and
+    age out through eviction.
+
+    Methods:
+    --------
+    - key: Return the cache key of a point.
+    - get: Return the cached point of a key or None.
+    - put: Store the point of a key.
+    - evict: Drop entries that are too old or beyond max_entries.
+    - clear: Drop all entries.
+    """
+
+    def __init__(self, path=".profplot_cache.sqlite", max_entries=100000,
+                 max_age=None):
+        """ResultCache Init.
+
+        Kwargs:
+        -------
+        - path: str, file the cache is stored in. Created if missing.
+        - max_entries: int, number of most recently used points kept.
+        - max_age: float, seconds after which a stored point is dropped.
+                   None keeps points regardless of age.
+
+        Raises:
+        -------
+        - ValueError: max_entries < 1, max_age <= 0
+        """
+        if max_entries < 1:
+            raise ValueError("max_entries must be >= 1.")
+        if max_age is not None and max_age <= 0:
+            raise ValueError("max_age must be positive.")
+        self.path = str(path)
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self._conn = None
+
+    def __getstate__(self):
+        # connections can't cross processes, pool workers open their own
+        state = dict(self.__dict__)
+        state["_conn"] = None
+        return state
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, timeout=60)
+            self._conn.execute("CREATE TABLE IF NOT EXISTS points ("
+                               "key TEXT PRIMARY KEY, label TEXT,"
+                               " created REAL, accessed REAL, value BLOB)")
+        return self._conn
+
+    def key(self, label, fingerprint, x):
+        """Return the key of point x of the profile label."""
+        return _point_key(label, fingerprint, x)
+
+    def get(self, key):
+        """Return the point stored under key, None if absent."""
+        conn = self._connection()
+        row = conn.execute("SELECT value, created FROM points WHERE key = ?",
+                           (key,)).fetchone()
+        now = time.time()
+        if row is None or (self.max_age is not None
+                           and now - row[1] > self.max_age):
+            return None
+        with conn:
+            conn.execute("UPDATE points SET accessed = ? WHERE key = ?",
+                         (now, key))
+        return pickle.loads(row[0])
+
+    def put(self, key, label, point):
+        """Store point, a picklable measurement, under key. Failed points
+        are not kept, they are measured again next time."""
+        if isinstance(point, _PointFailure):
+            return
+        now = time.time()
+        conn = self._connection()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO points VALUES (?, ?, ?, ?, ?)",
+                         (key, label, now, now, pickle.dumps(point)))
+
+    def evict(self):
+        """Drop entries older than max_age and beyond max_entries."""
+        conn = self._connection()
+        with conn:
+            if self.max_age is not None:
+                conn.execute("DELETE FROM points WHERE created < ?",
+                             (time.time() - self.max_age,))
+            conn.execute("DELETE FROM points WHERE key NOT IN (SELECT key"
+                         " FROM points ORDER BY accessed DESC LIMIT ?)",
+                         (self.max_entries,))
+
+    def clear(self):
+        """Drop all entries."""
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM points")
+
+    def __len__(self):
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM points").fetchone()[0]
+
+
+class ProfileJournal:
+    """Append-only checkpoint file of the points of long profiles.
+
+    Given to ProfilePlotter as its cache, every point is appended to the
+    journal as soon as it is measured, flushed and synced to disk, and
+    points already in the journal are read back instead of measured. A
+    sweep killed partway, e.g. by a restart or the OOM killer, picks up
+    where it stopped when run again, and the final result is built from
+    the journal. Use it with MeasureConfig(errors="record") so a point
+    that raises is journalled as failed rather than ending the sweep.
+    Failed points are measured again on the next run unless retry_failed
+    is off.
+
+    Each line of the file is one JSON record of the point's key, label,
+    whether it failed and the pickled point. Records start with a line
+    break, so one cut short by the process dying mid-write is ignored
+    when reading without taking the next record with it. Points are
+    keyed like ResultCache entries, so changing the profiled code or
+    settings starts the affected profiles afresh.
+
+    Methods:
+    --------
+    - key: Return the journal key of a point.
+    - get: Return the journalled point of a key or None.
+    - put: Append the point of a key.
+    - evict: Does nothing, the journal is never trimmed.
+    - clear: Delete the journal.
+    """
+
+    def __init__(self, path="profplot.journal", retry_failed=True):
+        """ProfileJournal Init.
+
+        Kwargs:
+        -------
+        - path: str, file the journal is kept in. Created if missing.
+        - retry_failed: bool, measure points journalled as failed again,
+                        e.g. ones killed for lack of memory, rather than
+                        reading the failure back.
+        """
+        self.path = str(path)
+        self.retry_failed = retry_failed
+        self._points = None
+
+    def __getstate__(self):
+        # pool workers read the journal themselves
+        state = dict(self.__dict__)
+        state["_points"] = None
+        return state
+
+    def _read(self):
+        if self._points is None:
+            self._points = {}
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    lines = f.readlines()
+            except FileNotFoundError:
+                lines = []
+            for line in lines:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                    point = pickle.loads(base64.b64decode(record["point"]))
+                except (ValueError, KeyError, pickle.UnpicklingError,
+                        EOFError):
+                    continue    # a record cut short by a crash
+                self._points[record["key"]] = point
+        return self._points
+
+    def key(self, label, fingerprint, x):
+        """Return the key of point x of the profile label."""
+        return _point_key(label, fingerprint, x)
+
+    def get(self, key):
+        """Return the point journalled under key, None if absent or, with
+        retry_failed, a failure."""
+        point = self._read().get(key)
+        if self.retry_failed and isinstance(point, _PointFailure):
+            return None
+        return point
+
+    def put(self, key, label, point):
+        """Append point, a picklable measurement, under key."""
+        record = {"key": key, "label": label,
+                  "failed": isinstance(point, _PointFailure),
+                  "created": time.time(),
+                  "point": base64.b64encode(pickle.dumps(point)).decode()}
+        # a line break first ends a record a crash cut short
+        line = ("\n" + json.dumps(record) + "\n").encode()
+        # one write to a file opened for appending, so records of pool
+        # workers sharing the journal don't interleave
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT,
+                     0o644)
+        try:
+            os.write(fd, line)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        self._read()[key] = point
+
+    def evict(self):
+        """Keep every record, the journal is append-only."""
+
+    def clear(self):
+        """Delete the journal file."""
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self.path)
+        self._points = None
+
+    def __len__(self):
+        return len(self._read())
+
+
+def _extend_series(series, other):
+    """Extend series, a ProfileSeries or dict of name to ProfileSeries, with
+    the points of other, of the same form."""
+    if isinstance(series, dict):
+        for name, part in other.items():
+            series[name].extend(part)
+    else:
+        series.extend(other)
+
+
+def _flatten_series(label, series):
+    """Yield the label and ProfileSeries of each series a profiler made.
+
+    Profilers making several series give a dict of name to ProfileSeries,
+    labelled "<label>.<name>".
+    """
+    if isinstance(series, dict):
+        for name, part in series.items():
+            yield f"{label}.{name}", part
+    else:
+        yield label, series
+
+
+def _guarded_call(func):
+    """Return (True, func()) or (False, the exception func raised)."""
+    try:
+        return True, func()
+    except BaseException as exc:
+        return False, exc
+
+
+def _send_result(func, conn):
+    """Send _guarded_call(func) through the connection conn."""
+    result = _guarded_call(func)
+    try:
+        conn.send(result)
+    except Exception:
+        # the exception or result doesn't pickle, send it as text instead
+        conn.send((False, RuntimeError(traceback.format_exc()
+                                       if result[0] else repr(result[1]))))
+    finally:
+        conn.close()
+
+
+def _call_with_timeout(func, timeout):
+    """Return func(), or None if it runs longer than timeout seconds.
+
+    With timeout set func runs in a forked child process, killed when
+    the time is up, and its result is pickled back. Exceptions raised by
+    func are raised again here. Without fork (Windows) func runs in a
+    daemon thread instead, which is abandoned, not killed, on timeout.
+    """
+    if timeout is None:
+        return func()
+    if "fork" not in multiprocessing.get_all_start_methods():
+        result = []
+        thread = threading.Thread(
+            target=lambda: result.append(_guarded_call(func)), daemon=True)
+        thread.start()
+        thread.join(timeout)
+        if not result:
+            return None
+        ok, value = result[0]
+    else:
+        context = multiprocessing.get_context("fork")
+        receiver, sender = context.Pipe(duplex=False)
+        # not daemonic, so the point can start processes of its own
+        proc = context.Process(target=_send_result, args=(func, sender))
+        proc.start()
+        sender.close()
+        try:
+            if not receiver.poll(timeout):
+                return None
+            ok, value = receiver.recv()
+        except EOFError:
+            # the pipe closes just before the process ends, wait for it
+            proc.join(timeout)
+            raise RuntimeError("The profile point process died with exit"
+                               f" code {proc.exitcode}.") from None
+        finally:
+            if proc.is_alive():
+                proc.kill()
+            proc.join()
+            receiver.close()
+    if not ok:
+        raise value
+    return value
+
+
+def _mark_series(series, kind, x_val, error=None):
+    """Add x_val to the timed_out, skipped or, with its error, failed list
+    of series, or of every series of a dict of them."""
+    for part in series.values() if isinstance(series, dict) else [series]:
+        getattr(part, kind).append(x_val if kind != "failed"
+                                   else [x_val, error])
+
+
+def _warm_worker():
+    """Keep an executor worker busy briefly so the next is started."""
+    time.sleep(0.01)
+
+
+def _init_worker(cpus, counter):
+    """Pin the calling pool worker to the next cpu in cpus."""
+    with counter.get_lock():
+        ind = counter.value
+        counter.value += 1
+    os.sched_setaffinity(0, {cpus[ind % len(cpus)]})
+
+
+def _run_profile(profiler, cache, label, force_rerun):
+    return profiler.profile(cache, label, force_rerun)
+
+
+def _profile_in_pool(profilers, parallel, cache=None, force_rerun=False):
+    """Profile the labelled profilers in a process pool.
+
+    Input:
+    ------
+    - profilers: iterable of (label, profiler) pairs
+    - parallel: ParallelConfig
+
+    Kwargs:
+    -------
+    - cache: ResultCache or ProfileJournal, passed on to each profile
+             call.
+    - force_rerun: bool, passed on to each profile call.
+
+    Return:
+    -------
+    - dict, label to ProfileSeries, in the order profilers were given.
+      Profiles that can't be pickled are run serially, with a warning,
+      after the pool is done so they don't compete with the workers.
+    """
+    tasks = []
+    serial = []
+    for label, profiler in profilers:
+        # a label budget spans the whole profile, and a timed out point
+        # skips the larger ones after it, so neither can be split
+        if (parallel.per_point and profiler._splittable
+                and profiler._measure.timeout is None
+                and profiler._measure.label_timeout is None):
+            # materialise so generators survive the serial fallback too
+            profiler = profiler._with_var_values(
+                list(profiler._unused_var_values()))
+            parts = [profiler._with_var_values([v])
+                     for v in profiler._var_values()]
+        else:
+            parts = [profiler]
+        try:
+            for part in parts:
+                pickle.dumps(part)
+        except (pickle.PicklingError, AttributeError, TypeError) as err:
+            warnings.warn(f"Profile {label!r} cannot be pickled ({err})."
+                          " Running it serially.", RuntimeWarning)
+            serial.append((label, profiler))
+            continue
+        tasks.extend((label, part) for part in parts)
+
+    results = {label: profiler._new_series() for label, profiler in profilers}
+    if tasks:
+        init, initargs = None, ()
+        if parallel.pin:
+            init = _init_worker
+            initargs = (parallel.cpus, multiprocessing.Value("i", 0))
+        with ProcessPoolExecutor(min(parallel.workers, len(tasks)),
+                                 initializer=init,
+                                 initargs=initargs) as pool:
+            futures = [(label, pool.submit(_run_profile, part, cache, label,
+                                           force_rerun))
+                       for label, part in tasks]
+            for label, future in futures:
+                _extend_series(results[label], future.result())
+    for label, profiler in serial:
+        results[label] = profiler.profile(cache, label, force_rerun)
+    return results
+
+
+class _AbstractProfiler:
+    # whether profile can be split into one task per x value
+    _splittable = True
+
+    def __init__(self):
+        raise NotImplementedError
+
+    def _get_profilefunc(self):
+        return self._func
+
+    # whether MeasureConfig.cprofile is supported, needs _point_kwargs
+    _supports_cprofile = False
+
+    @contextlib.contextmanager
+    def _point_call(self, kwargs):
+        """Give a zero argument callable running the profile function with
+        kwargs.
+
+        Coroutine functions are run to completion on an event loop made
+        for the point.
+        """
+        func = self._get_profilefunc()
+        if not inspect.iscoroutinefunction(func):
+            yield _BoundCall(func, kwargs=kwargs)
+            return
+        import asyncio
+        loop = asyncio.new_event_loop()
+        try:
+            yield lambda: loop.run_until_complete(func(**kwargs))
+        finally:
+            loop.close()
+
+    def _run_and_time(self, kwargs):
+        """Return TimingStats of the profile function run with kwargs and
+        a dict of the extra measurements enabled in the MeasureConfig."""
+        with self._point_call(kwargs) as call:
+            return (self._measure.measure(call),
+                    self._measure.measure_extra(call))
+
+    def _time_point(self, var_val):
+        return self._run_and_time(self._point_kwargs(var_val))
+
+    def _profile_callees(self, var_val):
+        """Return the callee times of one untimed run under cProfile."""
+        with self._point_call(self._point_kwargs(var_val)) as call:
+            return _measure_callees(call, self._measure.cprofile_top)
+
+    def _x_value(self, var_val):
+        return (var_val if self._var_conv_func is None
+                else self._var_conv_func(var_val))
+
+    def _new_series(self):
+        """Return the empty series profile fills, see _flatten_series."""
+        return ProfileSeries()
+
+    def _make_input(self, var_val):
+        """Return the varied argument for var_val, from the input factory
+        if one is set."""
+        return (var_val if self._input_factory is None
+                else self._input_factory(var_val))
+
+    def _fingerprint(self):
+        """Return a digest of everything but x that decides a point."""
+        return hashlib.sha256("".join(
+            self._fingerprint_parts() + [repr(vars(self._measure))]
+        ).encode()).hexdigest()
+
+    def profile(self, cache=None, label=None, force_rerun=False):
+        """Run the function with the given inputs, return a ProfileSeries.
+
+        Kwargs:
+        -------
+        - cache: ResultCache or ProfileJournal, points found in it under
+                 label are reused instead of measured, measured points
+                 are stored in it.
+        - label: str, label of the profile, part of the cache keys.
+        - force_rerun: bool, measure every point even if cached.
+
+        Return:
+        -------
+        - ProfileSeries, unpacks to lists of points [x1, x2...] [y1, y2...].
+          The x values are either the variable input to the function or the
+          results of applying the conversion function to them. y values are
+          median function runtimes, see ProfileSeries.stats for the rest.
+          Profilers measuring several things per point return a dict of
+          name to ProfileSeries instead.
+        """
+        return self._collect(self.iter_profile(cache, label, force_rerun))
+
+    def _in_x_order(self, events):
+        """Return the iter_profile events sorted by x if they were measured
+        shuffled."""
+        if self._measure.shuffle:
+            return sorted(events, key=lambda event: event[1])
+        return events
+
+    def _collect(self, events):
+        """Return the series made of the events of iter_profile."""
+        series = self._new_series()
+        for kind, x_val, point in self._in_x_order(events):
+            if kind != "point":
+                _mark_series(series, kind, x_val, point)
+            elif isinstance(series, dict):
+                for name, (stats, extra) in point.items():
+                    series[name].append(x_val, stats, extra)
+            else:
+                series.append(x_val, *point)
+        return series
 
-class _AbstractProfiler:
-    def __init__(self):
-        raise NotImplementedError
+    def _label_metadata(self):
+        """Return the LabelResult metadata of the profile's series."""
+        return {"percentiles": list(self._measure.percentiles),
+                "band": list(self._measure.band)}
 
-    def _get_profilefunc(self):
-        return self._func
+    def _point_count(self):
+        """Return the number of points profile makes, None if unknown."""
+        try:
+            return len(self._var_values())
+        except TypeError:
+            return None
 
-    def _run_and_time(self, kwargs):
-        """Return a number representing function runtime."""
-        return timeit.timeit(lambda: self._get_profilefunc()(**kwargs),
-                             number=1)
+    def _unused_var_values(self):
+        """Return _var_values, marking an iterator of them as used up.
+
+        Raises:
+        -------
+        - ValueError: the iterator was used up by an earlier run
+        """
+        var_values = self._var_values()
+        if iter(var_values) is var_values:
+            if self._consumed:
+                raise ValueError("The variable argument iterator was used up"
+                                 " by an earlier run. Give a re-iterable,"
+                                 " e.g. a range of sizes with an"
+                                 " input_factory, to profile again.")
+            self._consumed = True
+        return var_values
+
+    def iter_profile(self, cache=None, label=None, force_rerun=False):
+        """Profile like profile, yielding each point as it is measured.
+
+        Kwargs:
+        -------
+        - see profile
+
+        Yield:
+        ------
+        - (kind, x, point) tuples. kind is "point", with point the
+          TimingStats and extra dict of x, "failed", with point the error
+          text, or "timed_out" or "skipped", with point None, see
+          ProfileSeries. Profilers measuring several things per point give
+          a dict of name to such pairs as point.
+        """
+        var_values = self._unused_var_values()
+        if self._measure.shuffle:
+            var_values = list(var_values)
+            random.Random(self._measure.seed).shuffle(var_values)
+        fingerprint = None if cache is None else self._fingerprint()
+        deadline = self._deadline()
+        timed_out = []
+        for var_val in var_values:
+            x_val = self._x_value(var_val)
+            timeout = self._point_timeout(deadline)
+            if (any(self._beyond(x_val, x_out) for x_out in timed_out)
+                    or (timeout is not None and timeout <= 0)):
+                yield "skipped", x_val, None
+                continue
+            point = self._cached_point(x_val, lambda: var_val, cache, label,
+                                       fingerprint, force_rerun, timeout)
+            if point is None:
+                yield "timed_out", x_val, None
+                timed_out.append(x_val)
+            elif isinstance(point, _PointFailure):
+                yield "failed", x_val, point.error
+            else:
+                yield "point", x_val, point
+
+    def _beyond(self, x_val, x_out):
+        """Return whether x_val, coming after the timed out x_out, is to be
+        skipped."""
+        # larger inputs are assumed to take longer still, unshuffled the
+        # x values ascend
+        return not self._measure.shuffle or x_val >= x_out
+
+    def _deadline(self):
+        """Return the perf_counter time the profile's label_timeout ends."""
+        if self._measure.label_timeout is None:
+            return None
+        return time.perf_counter() + self._measure.label_timeout
+
+    def _point_timeout(self, deadline):
+        """Return the seconds the next point may take, None for no limit."""
+        remaining = (None if deadline is None
+                     else deadline - time.perf_counter())
+        if self._measure.timeout is None or remaining is None:
+            return self._measure.timeout if remaining is None else remaining
+        return min(self._measure.timeout, remaining)
+
+    def _cached_point(self, x_val, make_var_val, cache, label, fingerprint,
+                      force_rerun, timeout=None):
+        """Return TimingStats and extra dict of the point x_val, from cache
+        if present.
+
+        make_var_val is only called, to get the variable argument, when the
+        point has to be measured. With timeout set the measurement runs
+        under _call_with_timeout, None is returned if it timed out. With
+        MeasureConfig(errors="record") an exception raised measuring the
+        point gives a _PointFailure, passed to cache.put like a point.
+        """
+        point = None
+        if cache is not None:
+            key = cache.key(label, fingerprint, x_val)
+            if not force_rerun:
+                point = cache.get(key)
+        if point is None:
+            callees = self._measure.profiles_callees(x_val)
+            if callees and not self._supports_cprofile:
+                raise ValueError(f"{type(self).__name__} doesn't support"
+                                 " MeasureConfig.cprofile.")
+
+            def measure_point():
+                var_val = make_var_val()
+                point = self._time_point(var_val)
+                if callees:
+                    # a run of its own so cProfile doesn't slow the timed ones
+                    point[1].update(self._profile_callees(var_val))
+                return point
+            try:
+                point = _call_with_timeout(measure_point, timeout)
+            except Exception as exc:
+                if self._measure.errors == "raise":
+                    raise
+                point = _PointFailure(
+                    "".join(traceback.format_exception_only(type(exc), exc))
+                    .strip())
+            if cache is not None and point is not None:
+                cache.put(key, label, point)
+        return point
 
     def _check_var_kwargs_and_key(self, init_kwargs, var_key):
         if len(init_kwargs) == 0:
@@ -61,14 +2517,108 @@ class _AbstractProfiler:
         return [k for k in signature(method).parameters.keys() if k != "self"]
 
 
+class _LivePlot:
+    """Draws profile points onto a figure while the profiles run.
+
+    Points are appended to the data of one Line2D per label, and the
+    figure is redrawn at most once every refresh seconds, between points,
+    so drawing never overlaps a measurement and its cost stays a small
+    fraction of the run. The progress and ETA readout is based on the
+    points seen so far.
+    """
+
+    def __init__(self, fig, ax, total=None, refresh=0.5, stream=None):
+        self._fig = fig
+        self._ax = ax
+        self._total = total
+        self._refresh = refresh
+        self._stream = stream
+        self._lines = {}
+        self._done = 0
+        self._start = time.perf_counter()
+        self._last_draw = -math.inf
+        self._new_line = False
+
+    def watch(self, label, events):
+        """Pass through the iter_profile events of label, drawing them."""
+        for event in events:
+            self._add(label, *event)
+            yield event
+        self.draw()
+
+    def _add(self, label, kind, x_val, point):
+        self._done += 1
+        if kind == "point":
+            parts = (point.items() if isinstance(point, dict)
+                     else [(None, point)])
+            if isinstance(x_val, tuple):
+                # grid points, one line per value of the other keys
+                label = f"{label} {', '.join(map(str, x_val[1:]))}"
+                x_val = x_val[0]
+            for name, (stats, _) in parts:
+                self._append(label if name is None else f"{label}.{name}",
+                             x_val, stats.median)
+        if time.perf_counter() - self._last_draw >= self._refresh:
+            self.draw()
+
+    def _append(self, label, x_val, y_val):
+        if label not in self._lines:
+            line, = self._ax.plot([], [], "o-", label=label)
+            self._lines[label] = (line, [], [])
+            self._new_line = True
+        line, xs, ys = self._lines[label]
+        # shuffled and adaptive profiles measure out of x order
+        ind = bisect.bisect(xs, x_val)
+        xs.insert(ind, x_val)
+        ys.insert(ind, y_val)
+        line.set_data(xs, ys)
+
+    def progress(self):
+        """Return the progress readout, e.g. "12/40 points, 3s, ETA 9s"."""
+        elapsed = time.perf_counter() - self._start
+        text = f"{self._done}" + ("" if self._total is None
+                                  else f"/{self._total}")
+        text += f" points, {elapsed:.0f}s"
+        if self._total is not None and self._done:
+            remaining = max(self._total - self._done, 0)
+            text += f", ETA {elapsed / self._done * remaining:.0f}s"
+        return text
+
+    def draw(self):
+        """Rescale to the data, redraw the figure and show the progress."""
+        if self._new_line:
+            self._ax.legend(loc="upper left")
+            self._new_line = False
+        self._ax.relim()
+        self._ax.autoscale_view()
+        text = self.progress()
+        self._ax.set_title(text)
+        self._fig.canvas.draw_idle()
+        self._fig.canvas.flush_events()
+        if self._stream is not None:
+            self._stream.write(f"\r{text}")
+            self._stream.flush()
+        self._last_draw = time.perf_counter()
+
+
 class ProfilePlotter:
     """Profile and plot given functions by varying the designated variable.
 
     Methods:
     --------
     - set_func_profile: Add given profile under the label provided.
+    - set_adaptive_profile: Profile at adaptively chosen x values.
     - set_var_init_profile: Set a variable init profiler to the given label.
+    - set_instance_profile: Time construction and several methods apart.
+    - set_concurrency_profile: Profile a coroutine function against the
+                               number of concurrent calls.
+    - set_scaling_profile: Profile a workload against an executor's worker
+                           count.
+    - set_grid_profile: Profile over a grid of values of several arguments.
+    - run: Run all profilers and return a ProfileResult.
     - plot: Plot the results of all profilers and return fig, ax objs.
+    - plot_grid: Plot a grid profile as a heatmap, contours or lines.
+    - plot_callees: Plot a profile's runtime and its top callees' shares.
     """
 
     class _Profiler(_AbstractProfiler):
@@ -86,13 +2636,18 @@ class ProfilePlotter:
         var_conv_func = lambda x: len(x)
         prof = Profiler(mergesort, kwargs, var_key, var_conv_func)
         prof.profile()
+        # or build each input only when its point is measured
+        kwargs = {'array': range(50)}
+        factory = lambda n: [randomint() for j in range(n)]
+        prof = Profiler(mergesort, kwargs, 'array', input_factory=factory)
 
         Methods:
         -------
         profile:
         """
 
-        def __init__(self, func, kwargs, var_key, var_conv_func=None):
+        def __init__(self, func, kwargs, var_key, var_conv_func=None,
+                     measure=None, input_factory=None):
             """Initialise Profile object.
 
             Input:
@@ -109,144 +2664,961 @@ class ProfilePlotter:
 
             Kwargs:
             -------
-            var_conv_func -- function to apply to each input to the function
-                             under the variable parameter. The return of this
-                             function should be of the type and value required
-                             to plot an x vs runtime plot.
+            var_conv_func -- function to apply to each input to the function
+                             under the variable parameter. The return of this
+                             function should be of the type and value required
+                             to plot an x vs runtime plot.
+            measure -- MeasureConfig, how each point is timed. Defaults to
+                       a single call per point.
+            input_factory -- function building the argument passed to func
+                             from each value under var_key, e.g. sizes. It
+                             is called just before its point is measured,
+                             outside the timed region, and the input is
+                             dropped right after, so only one input is held
+                             in memory at a time. var_conv_func and x values
+                             then apply to the values under var_key.
+
+            Raises:
+            -------
+            -- ValueError: Function with no arguments given,
+                           kwargs keys and function argument names differ,
+                           var_key is not in kwargs
+            -- TypeError: Kwargs is not dict
+            """
+            self._check_var_kwargs_and_key(kwargs, var_key)
+            self._kwargs = self._validate_func_in(func, kwargs)
+            self._func = func
+            self._var_key = var_key
+            self._var_conv_func = var_conv_func
+            self._measure = MeasureConfig() if measure is None else measure
+            self._input_factory = input_factory
+            self._consumed = False
+
+        def _var_values(self):
+            return self._kwargs[self._var_key]
+
+        def _fingerprint_parts(self):
+            return [_code_fingerprint(self._func),
+                    _code_fingerprint(self._input_factory),
+                    _kwargs_fingerprint(_dup_dict_without_keys(
+                        self._kwargs, self._var_key))]
+
+        def _with_var_values(self, var_values):
+            """Return a copy of the profiler varying over var_values."""
+            clone = copy.copy(self)
+            clone._kwargs = dict(self._kwargs)
+            clone._kwargs[self._var_key] = var_values
+            return clone
+
+        _supports_cprofile = True
+
+        def _point_kwargs(self, var_val):
+            kwargs = dict(self._kwargs)
+            kwargs[self._var_key] = self._make_input(var_val)
+            return kwargs
+
+    class _AdaptiveProfiler(_Profiler):
+        """Profiler that picks its own x values within a numeric range.
+
+        Starts from a coarse, evenly spaced set of points and then keeps
+        measuring the midpoint of the interval where the runtime curve
+        bends the most or the samples are noisiest, until the point or
+        time budget is spent. This finds the knees of a curve with far
+        fewer runs than a dense sweep.
+
+        Usage Example:
+        --------------
+        kwargs = {'array': lambda n: [randint(0, 100) for _ in range(n)]}
+        prof = _AdaptiveProfiler(sorted_wrapper, kwargs, 'array', (1, 10**5),
+                                 max_points=25)
+        x_vals, runtimes = prof.profile()
+        """
+        _splittable = False
+
+        def __init__(self, func, kwargs, var_key, x_range, integer=True,
+                     log=False, initial_points=5, max_points=30,
+                     time_budget=None, measure=None):
+            """Initialise _AdaptiveProfiler.
+
+            Input:
+            ------
+            - func: function to profile
+            - kwargs: dict with keys matching the function's parameter
+                      names. The value under var_key is a factory, a
+                      function taking an x value and returning the argument
+                      to call func with at that x.
+            - var_key: the key/name of the parameter that is varied.
+            - x_range: pair of numbers, lowest and highest x to measure.
+
+            Kwargs:
+            -------
+            - integer: bool, only measure integer x values.
+            - log: bool, space the initial points and measure the curve's
+                   bends on a log x scale. x_range must then be positive.
+            - initial_points: int, evenly spaced points measured first.
+            - max_points: int, total number of points measured at most.
+            - time_budget: float, seconds after which no new point is
+                           started. None only limits the point count.
+            - measure: MeasureConfig, how each point is timed.
+
+            Raises:
+            -------
+            - ValueError: see _Profiler, bad x_range, initial_points < 2,
+                          max_points < initial_points, time_budget <= 0
+            - TypeError: see _Profiler, the var_key value is not callable
+            """
+            super().__init__(func, kwargs, var_key, measure=measure)
+            if not callable(kwargs[var_key]):
+                raise TypeError("The value under var_key must be a function"
+                                " of x returning the varied argument.")
+            low, high = x_range
+            if not low < high or (log and low <= 0):
+                raise ValueError("x_range must be an increasing pair, and"
+                                 " positive for log spacing.")
+            if initial_points < 2 or max_points < initial_points:
+                raise ValueError("initial_points must be >= 2 and max_points"
+                                 " >= initial_points.")
+            if time_budget is not None and time_budget <= 0:
+                raise ValueError("time_budget must be positive.")
+            self._x_range = (low, high)
+            self._integer = integer
+            self._log = log
+            self._initial_points = initial_points
+            self._max_points = max_points
+            self._time_budget = time_budget
+
+        def _fingerprint_parts(self):
+            return super()._fingerprint_parts() + [
+                _code_fingerprint(self._kwargs[self._var_key]),
+                repr((self._x_range, self._integer, self._log))]
+
+        def _scale(self, x):
+            low, high = self._x_range
+            if self._log:
+                return math.log(x/low) / math.log(high/low)
+            return (x - low) / (high - low)
+
+        def _initial_xs(self):
+            low, high = self._x_range
+            n = self._initial_points
+            if self._log:
+                xs = [low * (high/low)**(i/(n - 1)) for i in range(n)]
+            else:
+                xs = [low + (high - low)*i/(n - 1) for i in range(n)]
+            if self._integer:
+                xs = [round(x) for x in xs]
+            return sorted(set(xs))
+
+        def _midpoint(self, a, b):
+            mid = math.sqrt(a*b) if self._log else (a + b)/2
+            if self._integer:
+                mid = round(mid)
+                if mid <= a or mid >= b:
+                    return None
+            return mid
+
+        def _next_x(self, points):
+            """Return the midpoint of the interval most worth refining."""
+            xs = sorted(points)
+            scaled = [self._scale(x) for x in xs]
+            stats = [points[x][0] for x in xs]
+            top = max(s.median for s in stats) or 1
+            ys = [s.median/top for s in stats]
+            noise = [s.stdev/s.median if s.median else 0 for s in stats]
+            slopes = [(ys[i + 1] - ys[i]) / (scaled[i + 1] - scaled[i])
+                      for i in range(len(xs) - 1)]
+            best, best_score = None, -1
+            for i in range(len(xs) - 1):
+                mid = self._midpoint(xs[i], xs[i + 1])
+                if mid is None:
+                    continue
+                bend = sum(abs(slopes[i] - slopes[j]) for j in (i - 1, i + 1)
+                           if 0 <= j < len(slopes))
+                # the width factor shrinks the score of refined intervals,
+                # the constant term spreads leftover budget over big gaps
+                score = ((scaled[i + 1] - scaled[i])
+                         * (bend + noise[i] + noise[i + 1] + 0.1))
+                if score > best_score:
+                    best, best_score = mid, score
+            return best
+
+        def _point_count(self):
+            # an upper bound, the time budget can end profiling earlier
+            return self._max_points
+
+        def _collect(self, events):
+            """Return the ProfileSeries of the events sorted by x."""
+            series = super()._collect(events)
+            order = sorted(range(len(series)), key=series.x.__getitem__)
+            return ProfileSeries([series.x[i] for i in order],
+                                 [series.stats[i] for i in order],
+                                 [series.extras[i] for i in order],
+                                 series.timed_out, series.skipped,
+                                 series.failed)
+
+        def iter_profile(self, cache=None, label=None, force_rerun=False):
+            """Measure adaptively chosen points, yielding each in turn.
+
+            Kwargs:
+            -------
+            - see _AbstractProfiler.profile
+
+            Yield:
+            ------
+            - see _AbstractProfiler.iter_profile, profile gives the points
+              sorted by x.
+            """
+            start = time.perf_counter()
+            deadline = self._deadline()
+            factory = self._kwargs[self._var_key]
+            fingerprint = None if cache is None else self._fingerprint()
+            points = {}
+            failed = set()
+            pending = self._initial_xs()
+            while pending:
+                x_val = pending.pop(0)
+                timeout = self._point_timeout(deadline)
+                if timeout is not None and timeout <= 0:
+                    for x_skip in [x_val] + pending:
+                        yield "skipped", x_skip, None
+                    break
+                point = self._cached_point(
+                    x_val, lambda: factory(x_val), cache, label, fingerprint,
+                    force_rerun, timeout)
+                if point is None:
+                    # the initial x values ascend, drop the larger ones and
+                    # refine below the timed out one instead
+                    yield "timed_out", x_val, None
+                    for x_skip in pending:
+                        yield "skipped", x_skip, None
+                    pending = []
+                elif isinstance(point, _PointFailure):
+                    failed.add(x_val)
+                    yield "failed", x_val, point.error
+                else:
+                    points[x_val] = point
+                    yield "point", x_val, point
+                out_of_time = (self._time_budget is not None
+                               and time.perf_counter() - start
+                               >= self._time_budget)
+                if out_of_time or len(points) >= self._max_points:
+                    break
+                if not pending and len(points) >= 2:
+                    x_next = self._next_x(points)
+                    # a failed x would be picked again, end refining there
+                    if x_next is not None and x_next not in failed:
+                        pending.append(x_next)
+
+    class _VariableInitMethodProfiler(_AbstractProfiler):
+        def __init__(self, class_init, init_kwargs, var_key,
+                     method, method_kwargs, var_conv_func=None, measure=None,
+                     input_factory=None):
+            """Initialise _VariableInitMethodProfiler.
+
+            This profiler is for classes that are to have some init parameter
+            modified to affect the time taken for the given function call
+            to execute.
+
+            Usage Example:
+            --------------
+            class NoFuncParam:
+                def __init__(self, s_time):
+                    self._s_time = s_time
+                def func(self):
+                    time.sleep(self._s_time)
+            # give iterable for init param that will change function runtime
+            ikwarg = {"s_time": (i/100 for i in range(10))}
+            var_key = "s_time"  # name of argument (key) that is to vary
+            mkwarg = {} # arguments of method
+            conv_func = lamba x:100*x
+            profiler = _VariableInitMethodProfiler(NoFuncParam, ikwarg, var_key,
+                                                   NoFuncParam.func, mkwarg,
+                                                   conv_func)
+            x_vals, runtimes = profiler.profile()
+            x_vals
+            [1, 2, 3, 4, 5, 6, 7, 8, 9]
+            runtimes
+            [0.01, 0.02, 0.03, 0.04, 0.05, 0.06, 0.07, 0.08, 0.09]
+
+            Input:
+            ------
+            class_init -- class object such that running class_init(...) creates
+                          an instance of the class
+            init_kwargs -- dict, keys are class init arguments. This can include
+                           self, but the object stored in this key is discarded.
+                           The object under each key should be such that they
+                           will run the function with one of them being an
+                           iterable of objects that will allow the function to
+                           run. This argument is the variable argument that
+                           should change the runtime of the function.
+            var_key -- the argument that is to be varied in the class init to
+                       change function runtime.
+            method -- class method to profile
+            method_kwargs -- dict, keys are method arguments, values are objects
+                             that will run the method when passed to it.
+            var_conv_func -- this function is applied to each value in the
+                             variable argument.
+            measure -- MeasureConfig, how each point is timed. Defaults to
+                       a single call per point.
+            input_factory -- function building the init argument from each
+                             value under var_key. Called lazily per point,
+                             see _Profiler.
+            Raises:
+            -------
+            ValueError -- init_kwargs is empty,
+                          init_kwargs doesn't match class init arguments,
+                          method_kwargs doesn't match method arguments,
+                          var_key not in init_kwargs.
+            TypeError -- init_kwargs is not of type dict,
+                         method_kwargs is not of type dict,
+            """
+            self._check_var_kwargs_and_key(init_kwargs, var_key)
+            if not isinstance(method_kwargs, dict):
+                raise TypeError("methods kwargs must be of type dict.")
+            self._init_kwargs = self._validate_func_in(class_init, init_kwargs)
+            self._method_kwargs = self._validate_func_in(method, method_kwargs)
+            self._class_init = class_init
+            self._var_key = var_key
+            self._method = method
+            self._var_conv_func = var_conv_func
+            self._measure = MeasureConfig() if measure is None else measure
+            self._input_factory = input_factory
+            self._consumed = False
+
+        def _get_profilefunc(self):
+            return self._method
+
+        def _var_values(self):
+            return self._init_kwargs[self._var_key]
+
+        def _fingerprint_parts(self):
+            return [_code_fingerprint(self._class_init),
+                    _code_fingerprint(self._method),
+                    _code_fingerprint(self._input_factory),
+                    _kwargs_fingerprint(_dup_dict_without_keys(
+                        self._init_kwargs, self._var_key)),
+                    _kwargs_fingerprint(_dup_dict_without_keys(
+                        self._method_kwargs, "self"))]
+
+        def _with_var_values(self, var_values):
+            """Return a copy of the profiler varying over var_values."""
+            clone = copy.copy(self)
+            clone._init_kwargs = dict(self._init_kwargs)
+            clone._init_kwargs[self._var_key] = var_values
+            return clone
+
+        _supports_cprofile = True
+
+        def _point_kwargs(self, var_val):
+            init_kwargs = dict(self._init_kwargs)
+            init_kwargs[self._var_key] = self._make_input(var_val)
+            method_kwargs = dict(self._method_kwargs)
+            method_kwargs["self"] = self._class_init(**init_kwargs)
+            return method_kwargs
+
+    class _InstanceProfiler(_AbstractProfiler):
+        """Profile construction and several methods of one class per x.
+
+        For each value of the varied init argument the class is
+        constructed once and every method is timed against that same
+        instance, so an expensive __init__ is paid once for all methods.
+        The construction itself is timed as its own series. An optional
+        reset hook restores the instance before every timed sample,
+        outside the timed region.
+
+        Usage Example:
+        --------------
+        class Index:
+            def __init__(self, keys): ...
+            def lookup(self, key): ...
+            def scan(self): ...
+        profiler = _InstanceProfiler(
+            Index, {'keys': range(0, 10**6, 10**5)}, 'keys',
+            {'lookup': (Index.lookup, {'key': 5}), 'scan': Index.scan},
+            input_factory=lambda n: list(range(n)))
+        series = profiler.profile()
+        series['__init__'].y, series['lookup'].y, series['scan'].y
+        """
+
+        def __init__(self, class_init, init_kwargs, var_key, methods,
+                     var_conv_func=None, measure=None, input_factory=None,
+                     reset=None, time_init=True):
+            """Initialise _InstanceProfiler.
+
+            Input:
+            ------
+            class_init -- class object, class_init(...) creates an instance
+            init_kwargs -- dict, keys are class init arguments, the value
+                           under var_key an iterable of values to vary.
+            var_key -- the init argument that is varied.
+            methods -- dict, name to a method, or to a (method, kwargs)
+                       pair for methods taking arguments besides self.
+
+            Kwargs:
+            -------
+            var_conv_func -- function applied to each varied value to give
+                             the x values.
+            measure -- MeasureConfig, how each method and __init__ is timed.
+            input_factory -- function building the varied init argument
+                             from each value under var_key, see _Profiler.
+            reset -- function taking the instance, called before every
+                     timed sample of every method, untimed. A sample of
+                     several calls (MeasureConfig.number) shares one reset.
+            time_init -- bool, also time construction, as series
+                         "__init__". This constructs the class once more
+                         per sample taken.
+
+            Raises:
+            -------
+            ValueError -- init_kwargs is empty or doesn't match the class,
+                          var_key not in init_kwargs, methods is empty or
+                          a method's kwargs don't match it.
+            TypeError -- init_kwargs or a method's kwargs is not a dict,
+                         reset is not callable.
+            """
+            self._check_var_kwargs_and_key(init_kwargs, var_key)
+            if not methods:
+                raise ValueError("At least one method must be given.")
+            if reset is not None and not callable(reset):
+                raise TypeError("reset must be callable.")
+            self._init_kwargs = self._validate_func_in(class_init, init_kwargs)
+            self._methods = {}
+            for name, method in methods.items():
+                method, kwargs = (method if isinstance(method, tuple)
+                                  else (method, {}))
+                if not isinstance(kwargs, dict):
+                    raise TypeError("methods kwargs must be of type dict.")
+                self._methods[name] = (method,
+                                       self._validate_func_in(method, kwargs))
+            self._class_init = class_init
+            self._var_key = var_key
+            self._var_conv_func = var_conv_func
+            self._measure = MeasureConfig() if measure is None else measure
+            self._input_factory = input_factory
+            self._reset = reset
+            self._time_init = time_init
+            self._consumed = False
+
+        def _new_series(self):
+            names = (["__init__"] if self._time_init else []) \
+                + list(self._methods)
+            return {name: ProfileSeries() for name in names}
+
+        def _var_values(self):
+            return self._init_kwargs[self._var_key]
+
+        def _fingerprint_parts(self):
+            parts = [_code_fingerprint(self._class_init),
+                     _code_fingerprint(self._input_factory),
+                     _code_fingerprint(self._reset),
+                     repr(self._time_init),
+                     _kwargs_fingerprint(_dup_dict_without_keys(
+                         self._init_kwargs, self._var_key))]
+            for name, (method, kwargs) in self._methods.items():
+                parts += [name, _code_fingerprint(method),
+                          _kwargs_fingerprint(kwargs)]
+            return parts
+
+        def _with_var_values(self, var_values):
+            """Return a copy of the profiler varying over var_values."""
+            clone = copy.copy(self)
+            clone._init_kwargs = dict(self._init_kwargs)
+            clone._init_kwargs[self._var_key] = var_values
+            return clone
+
+        def _time_point(self, var_val):
+            init_kwargs = dict(self._init_kwargs)
+            init_kwargs[self._var_key] = self._make_input(var_val)
+            point = {}
+            if self._time_init:
+                construct = _BoundCall(self._class_init, kwargs=init_kwargs)
+                point["__init__"] = (self._measure.measure(construct),
+                                     self._measure.measure_extra(construct))
+            instance = self._class_init(**init_kwargs)
+            setup = None if self._reset is None \
+                else lambda: self._reset(instance)
+            loop = None
+            try:
+                for name, (method, kwargs) in self._methods.items():
+                    call = _BoundCall(method, (instance,), kwargs)
+                    if inspect.iscoroutinefunction(method):
+                        if loop is None:
+                            import asyncio
+                            loop = asyncio.new_event_loop()
+                        call = (lambda start=call:
+                                loop.run_until_complete(start()))
+                    point[name] = (self._measure.measure(call, setup),
+                                   self._measure.measure_extra(call, setup))
+            finally:
+                if loop is not None:
+                    loop.close()
+            return point
+
+    class _ComparisonProfiler(_AbstractProfiler):
+        """Profile several implementations of one function on shared input.
+
+        For each x value the input is built once and every function is
+        timed on it, so N implementations cost one input's generation time
+        and memory rather than N, and they are compared on identical data.
+        Samples of the functions are taken in turns, see
+        MeasureConfig.measure_group. Functions marked as mutating their
+        input are timed one call per sample, each given a deep copy of the
+        varied argument made outside the timed region, the rest share the
+        input.
+
+        Usage Example:
+        --------------
+        profiler = _ComparisonProfiler(
+            {'mergesort': mergesort, 'quicksort': quicksort},
+            {'array': range(0, 10**5, 10**4)}, 'array',
+            input_factory=lambda n: random.sample(range(n), n))
+        series = profiler.profile()
+        series['mergesort'].y, series['quicksort'].y
+        """
+
+        def __init__(self, funcs, kwargs, var_key, var_conv_func=None,
+                     measure=None, input_factory=None, mutating=()):
+            """Initialise _ComparisonProfiler.
+
+            Input:
+            ------
+            funcs -- dict, name to function, each taking the keys of kwargs
+            kwargs -- dict, arguments shared by all functions, an iterable
+                      of values to vary under var_key.
+            var_key -- the argument that is varied.
+
+            Kwargs:
+            -------
+            var_conv_func -- function applied to each varied value to give
+                             the x values.
+            measure -- MeasureConfig, how each function is timed.
+            input_factory -- function building the varied argument from
+                             each value under var_key, see _Profiler.
+            mutating -- iterable of names in funcs that change their input.
+                        These are timed one call per sample, whatever
+                        MeasureConfig.number is, so that every call gets
+                        a copy of its own.
+
+            Raises:
+            -------
+            ValueError -- funcs is empty, kwargs is empty or doesn't match
+                          a function, var_key not in kwargs, a name in
+                          mutating is not in funcs.
+            TypeError -- kwargs is not a dict.
+            """
+            self._check_var_kwargs_and_key(kwargs, var_key)
+            if not funcs:
+                raise ValueError("At least one function must be given.")
+            self._funcs = dict(funcs)
+            for func in self._funcs.values():
+                self._kwargs = self._validate_func_in(func, kwargs)
+            self._mutating = frozenset(mutating)
+            unknown = self._mutating.difference(self._funcs)
+            if unknown:
+                raise ValueError(f"mutating names {sorted(unknown)} are not"
+                                 " in funcs.")
+            self._var_key = var_key
+            self._var_conv_func = var_conv_func
+            self._measure = MeasureConfig() if measure is None else measure
+            self._input_factory = input_factory
+            self._consumed = False
+
+        def _new_series(self):
+            return {name: ProfileSeries() for name in self._funcs}
+
+        def _var_values(self):
+            return self._kwargs[self._var_key]
+
+        def _fingerprint_parts(self):
+            parts = [_code_fingerprint(self._input_factory),
+                     repr(sorted(self._mutating)),
+                     _kwargs_fingerprint(_dup_dict_without_keys(
+                         self._kwargs, self._var_key))]
+            for name, func in self._funcs.items():
+                parts += [name, _code_fingerprint(func)]
+            return parts
+
+        def _with_var_values(self, var_values):
+            """Return a copy of the profiler varying over var_values."""
+            clone = copy.copy(self)
+            clone._kwargs = dict(self._kwargs)
+            clone._kwargs[self._var_key] = var_values
+            return clone
+
+        def _call_factory(self, name, func, kwargs, loop):
+            """Return a function giving the call of func timed per sample."""
+            def bind(kwargs):
+                call = _BoundCall(func, kwargs=kwargs)
+                if inspect.iscoroutinefunction(func):
+                    return lambda: loop.run_until_complete(call())
+                return call
+            if name not in self._mutating:
+                call = bind(kwargs)
+                return lambda: call
+            return lambda: bind(dict(kwargs, **{
+                self._var_key: copy.deepcopy(kwargs[self._var_key])}))
+
+        def _time_point(self, var_val):
+            kwargs = dict(self._kwargs)
+            kwargs[self._var_key] = self._make_input(var_val)
+            loop = None
+            if any(inspect.iscoroutinefunction(func)
+                   for func in self._funcs.values()):
+                import asyncio
+                loop = asyncio.new_event_loop()
+            try:
+                make_calls = [self._call_factory(name, func, kwargs, loop)
+                              for name, func in self._funcs.items()]
+                stats = self._measure.measure_group(make_calls, [
+                    ind for ind, name in enumerate(self._funcs)
+                    if name in self._mutating])
+                return {name: (point_stats,
+                               self._measure.measure_extra(make_call()))
+                        for name, point_stats, make_call
+                        in zip(self._funcs, stats, make_calls)}
+            finally:
+                if loop is not None:
+                    loop.close()
+
+    class _ConcurrencyProfiler(_AbstractProfiler):
+        """Profile a coroutine function against the number of concurrent
+        calls.
+
+        Each x value N is timed as asyncio.gather of N calls on an event
+        loop made for the point, so y is the time the whole batch takes.
+        The extras add the throughput, N calls over the median batch time,
+        and the median and 99th percentile latency of the single calls,
+        taken from one extra, untimed batch.
+
+        Usage Example:
+        --------------
+        async def handle(request):
+            ...
+        profiler = _ConcurrencyProfiler(handle, {'request': req},
+                                        [1, 10, 100, 1000])
+        series = profiler.profile()
+        series.extra_columns()["throughput"]
+        """
+
+        def __init__(self, func, kwargs, concurrency, measure=None):
+            """Initialise _ConcurrencyProfiler.
+
+            Input:
+            ------
+            func -- coroutine function to profile
+            kwargs -- dict, arguments every call is made with
+            concurrency -- iterable of ints >= 1, the numbers of
+                           concurrent calls, the x values
+
+            Kwargs:
+            -------
+            measure -- MeasureConfig, how each batch is timed
+
+            Raises:
+            -------
+            TypeError -- func is not a coroutine function, kwargs is not a
+                         dict
+            ValueError -- kwargs don't match func, concurrency holds values
+                          < 1
+            """
+            if not inspect.iscoroutinefunction(func):
+                raise TypeError("func must be a coroutine function.")
+            if not isinstance(kwargs, dict):
+                raise TypeError("Kwargs must be of type dict.")
+            if iter(concurrency) is not concurrency and any(
+                    n < 1 for n in concurrency):
+                raise ValueError("concurrency values must be >= 1.")
+            self._kwargs = self._validate_func_in(func, kwargs)
+            self._func = func
+            self._concurrency = concurrency
+            self._var_conv_func = None
+            self._measure = MeasureConfig() if measure is None else measure
+            self._input_factory = None
+            self._consumed = False
+
+        def _var_values(self):
+            return self._concurrency
+
+        def _fingerprint_parts(self):
+            return [_code_fingerprint(self._func),
+                    _kwargs_fingerprint(self._kwargs)]
+
+        def _with_var_values(self, var_values):
+            """Return a copy of the profiler varying over var_values."""
+            clone = copy.copy(self)
+            clone._concurrency = var_values
+            return clone
+
+        async def _latencies(self, n):
+            """Run n concurrent calls, return the duration of each."""
+            import asyncio
+
+            async def timed():
+                start = time.perf_counter()
+                await self._func(**self._kwargs)
+                return time.perf_counter() - start
+            return await asyncio.gather(*(timed() for _ in range(n)))
+
+        async def _batch(self, n):
+            """Run n concurrent calls."""
+            import asyncio
+            await asyncio.gather(*(self._func(**self._kwargs)
+                                   for _ in range(n)))
+
+        def _time_point(self, n):
+            import asyncio
+            loop = asyncio.new_event_loop()
+            try:
+                call = lambda: loop.run_until_complete(self._batch(n))
+                stats = self._measure.measure(call)
+                extra = self._measure.measure_extra(call)
+                latencies = sorted(
+                    loop.run_until_complete(self._latencies(n)))
+            finally:
+                loop.close()
+            extra["throughput"] = (n / stats.median if stats.median
+                                   else math.inf)
+            extra["latency_p50"] = _percentile(latencies, 50)
+            extra["latency_p99"] = _percentile(latencies, 99)
+            return stats, extra
+
+    class _ScalingProfiler(_AbstractProfiler):
+        """Profile a workload against the worker count of an executor.
+
+        The varied parameter is the number of workers: each x value N
+        times ops calls of func submitted to an executor of N workers. The
+        executor is started, and each worker warmed, outside the timed
+        region. Besides the batch time the extras record the throughput
+        in calls per second, and the speedup and parallel efficiency
+        relative to the smallest worker count measured.
+
+        Usage Example:
+        --------------
+        profiler = _ScalingProfiler(compress, {'block': data}, [1, 2, 4, 8],
+                                    ops=64, executor=ProcessPoolExecutor)
+        columns = profiler.profile().extra_columns()
+        columns["speedup"], columns["efficiency"]
+        """
+        # points depend on each other and on having the machine to themselves
+        _splittable = False
+
+        def __init__(self, func, kwargs, workers, ops,
+                     executor=ThreadPoolExecutor, var_conv_func=None,
+                     measure=None):
+            """Initialise _ScalingProfiler.
+
+            Input:
+            ------
+            func -- function making one operation of the workload. With a
+                    ProcessPoolExecutor it and kwargs must pickle.
+            kwargs -- dict, arguments of every call of func
+            workers -- iterable of ints >= 1, the worker counts, ascending
+            ops -- int, calls of func made per timed batch
+
+            Kwargs:
+            -------
+            executor -- concurrent.futures executor class, called with
+                        max_workers, e.g. ProcessPoolExecutor
+            var_conv_func -- function converting worker counts to x values
+            measure -- MeasureConfig, how each batch is timed
 
             Raises:
             -------
-            -- ValueError: Function with no arguments given,
-                           kwargs keys and function argument names differ,
-                           var_key is not in kwargs
-            -- TypeError: Kwargs is not dict
+            TypeError -- kwargs is not a dict, ops is not an int
+            ValueError -- kwargs don't match func, ops < 1, workers holds
+                          values < 1
             """
-            self._check_var_kwargs_and_key(kwargs, var_key)
+            if not isinstance(kwargs, dict):
+                raise TypeError("Kwargs must be of type dict.")
+            if not isinstance(ops, int) or isinstance(ops, bool):
+                raise TypeError(f"ops must be of type int. got type"
+                                f" {type(ops)}")
+            if ops < 1:
+                raise ValueError("ops must be >= 1.")
+            if iter(workers) is not workers and any(
+                    n < 1 for n in workers):
+                raise ValueError("workers values must be >= 1.")
             self._kwargs = self._validate_func_in(func, kwargs)
             self._func = func
-            self._var_key = var_key
+            self._workers = workers
+            self._ops = ops
+            self._executor = executor
             self._var_conv_func = var_conv_func
+            self._measure = MeasureConfig() if measure is None else measure
+            self._input_factory = None
+            self._consumed = False
 
-        def profile(self):
-            """Run the function with the given inputs, return lists of points.
+        def _var_values(self):
+            return self._workers
 
-            Return:
-            -------
-            - lists of points [x1, x2...] [y1, y2...]. The x values are either
-              the variable input to the function or the results of applying the
-              conversion function to them. y values are function runtimes.
-            """
-            x = []
-            runtimes = []
-            var_values = self._kwargs[self._var_key]
-            for var_val in var_values:
-                # make var one value for call
-                self._kwargs[self._var_key] = var_val
-                runtime = self._run_and_time(self._kwargs)
-                x_val = (var_val if self._var_conv_func is None
-                         else self._var_conv_func(var_val))
-                x.append(x_val)
-                runtimes.append(runtime)
-            self._kwargs[self._var_key] = var_values     # restore kwargs
-            return x, runtimes
+        def _fingerprint_parts(self):
+            return [_code_fingerprint(self._func),
+                    _code_fingerprint(self._executor),
+                    _kwargs_fingerprint(self._kwargs), repr(self._ops)]
 
-    class _VariableInitMethodProfiler(_AbstractProfiler):
-        def __init__(self, class_init, init_kwargs, var_key,
-                     method, method_kwargs, var_conv_func=None):
-            """Initialise _VariableInitMethodProfiler.
+        def _label_metadata(self):
+            return dict(super()._label_metadata(), scaling=True)
 
-            This profiler is for classes that are to have some init parameter
-            modified to affect the time taken for the given function call
-            to execute.
+        def _time_point(self, n):
+            call = _BoundCall(self._func, kwargs=self._kwargs)
+            with self._executor(max_workers=n) as executor:
+                for future in [executor.submit(_warm_worker)
+                               for _ in range(n)]:
+                    future.result()
 
-            Usage Example:
-            --------------
-            class NoFuncParam:
-                def __init__(self, s_time):
-                    self._s_time = s_time
-                def func(self):
-                    time.sleep(self._s_time)
-            # give iterable for init param that will change function runtime
-            ikwarg = {"s_time": (i/100 for i in range(10))}
-            var_key = "s_time"  # name of argument (key) that is to vary
-            mkwarg = {} # arguments of method
-            conv_func = lamba x:100*x
-            profiler = _VariableInitMethodProfiler(NoFuncParam, ikwarg, var_key,
-                                                   NoFuncParam.func, mkwarg,
-                                                   conv_func)
-            x_vals, runtimes = profiler.profile()
-            x_vals
-            [1, 2, 3, 4, 5, 6, 7, 8, 9]
-            runtimes
-            [0.01, 0.02, 0.03, 0.04, 0.05, 0.06, 0.07, 0.08, 0.09]
+                def batch():
+                    for future in [executor.submit(call)
+                                   for _ in range(self._ops)]:
+                        future.result()
+                stats = self._measure.measure(batch)
+                extra = self._measure.measure_extra(batch)
+            extra["workers"] = n
+            extra["throughput"] = (self._ops / stats.median if stats.median
+                                   else math.inf)
+            return stats, extra
+
+        def _collect(self, events):
+            """Return the ProfileSeries with speedup and efficiency added."""
+            series = super()._collect(events)
+            if series.extras:
+                base = min(series.extras, key=lambda e: e["workers"])
+                for extra in series.extras:
+                    extra["speedup"] = (extra["throughput"]
+                                        / base["throughput"])
+                    extra["efficiency"] = (extra["speedup"] * base["workers"]
+                                           / extra["workers"])
+            return series
+
+    class _GridProfiler(_AbstractProfiler):
+        """Profile a function over a grid of values of several arguments.
+
+        Each key in var_keys is varied over its values in kwargs and every
+        combination, the Cartesian product, is measured, or just the
+        combinations of a given grid. The x values are tuples of the
+        values, one per key, so each grid point is cached on its own and a
+        grid can be filled in over several runs. profile gives the first
+        key's values as x and the other keys' values as extras.
+
+        Usage Example:
+        --------------
+        kwargs = {'rows': [10, 100, 1000], 'cols': [10, 100]}
+        factories = {'rows': lambda n: ..., 'cols': lambda n: ...}
+        profiler = _GridProfiler(func, kwargs, ['rows', 'cols'],
+                                 input_factories=factories)
+        series = profiler.profile()
+        series.x, series.extra_columns()['cols'], series.y
+        """
+
+        def __init__(self, func, kwargs, var_keys, var_conv_funcs=None,
+                     measure=None, input_factories=None, grid=None):
+            """Initialise _GridProfiler.
 
             Input:
             ------
-            class_init -- class object such that running class_init(...) creates
-                          an instance of the class
-            init_kwargs -- dict, keys are class init arguments. This can include
-                           self, but the object stored in this key is discarded.
-                           The object under each key should be such that they
-                           will run the function with one of them being an
-                           iterable of objects that will allow the function to
-                           run. This argument is the variable argument that
-                           should change the runtime of the function.
-            var_key -- the argument that is to be varied in the class init to
-                       change function runtime.
-            method -- class method to profile
-            method_kwargs -- dict, keys are method arguments, values are objects
-                             that will run the method when passed to it.
-            var_conv_func -- this function is applied to each value in the
-                             variable argument.
+            func -- function to profile
+            kwargs -- dict, function arguments, an iterable of values
+                      under each of var_keys
+            var_keys -- sequence of two or more of the keys of kwargs
+
+            Kwargs:
+            -------
+            var_conv_funcs -- dict, var key to a function converting its
+                              values to x values
+            measure -- MeasureConfig, how each point is timed
+            input_factories -- dict, var key to a function building the
+                               argument from each of its values, see
+                               _Profiler
+            grid -- iterable of tuples, one value per var key, measured
+                    instead of the Cartesian product. The values under
+                    var_keys in kwargs are then unused.
+
             Raises:
             -------
-            ValueError -- init_kwargs is empty,
-                          init_kwargs doesn't match class init arguments,
-                          method_kwargs doesn't match method arguments,
-                          var_key not in init_kwargs.
-            TypeError -- init_kwargs is not of type dict,
-                         method_kwargs is not of type dict,
+            ValueError -- fewer than two or repeated var_keys, a var key not
+                          in kwargs, kwargs don't match func, a grid tuple
+                          doesn't have one value per key
+            TypeError -- kwargs is not a dict
             """
-            self._check_var_kwargs_and_key(init_kwargs, var_key)
-            if not isinstance(method_kwargs, dict):
-                raise TypeError("methods kwargs must be of type dict.")
-            self._init_kwargs = self._validate_func_in(class_init, init_kwargs)
-            self._method_kwargs = self._validate_func_in(method, method_kwargs)
-            self._class_init = class_init
-            self._var_key = var_key
-            self._method = method
-            self._var_conv_func = var_conv_func
+            var_keys = list(var_keys)
+            if len(var_keys) < 2 or len(set(var_keys)) != len(var_keys):
+                raise ValueError("var_keys must hold two or more distinct"
+                                 " keys, use set_func_profile for one.")
+            for var_key in var_keys:
+                self._check_var_kwargs_and_key(kwargs, var_key)
+            if grid is not None:
+                grid = [tuple(point) for point in grid]
+                if any(len(point) != len(var_keys) for point in grid):
+                    raise ValueError("grid points must have one value per"
+                                     " var key.")
+            self._kwargs = self._validate_func_in(func, kwargs)
+            self._func = func
+            self._var_keys = var_keys
+            self._var_conv_funcs = dict(var_conv_funcs or {})
+            self._measure = MeasureConfig() if measure is None else measure
+            self._input_factories = dict(input_factories or {})
+            self._grid = grid
+            self._consumed = False
 
-        def _get_profilefunc(self):
-            return self._method
+        def _var_values(self):
+            if self._grid is not None:
+                return self._grid
+            return list(itertools.product(
+                *(self._kwargs[k] for k in self._var_keys)))
 
-        def profile(self):
-            """Run the function with the given inputs, return lists of points.
+        def _x_value(self, var_val):
+            return tuple(
+                v if k not in self._var_conv_funcs
+                else self._var_conv_funcs[k](v)
+                for k, v in zip(self._var_keys, var_val))
 
-            Return:
-            -------
-            - lists of points [x1, x2...] [y1, y2...]. The x values are either
-              the variable input to the function or the results of applying the
-              conversion function to them. y values are function runtimes.
-            """
-            x = []
-            runtimes = []
-            var_values = self._init_kwargs[self._var_key]
-            for var_val in var_values:
-                self._init_kwargs[self._var_key] = var_val
-                self._method_kwargs["self"] = self._class_init(**self._init_kwargs)
-                runtime = self._run_and_time(self._method_kwargs)
-                x_val = (var_val if self._var_conv_func is None
-                         else self._var_conv_func(var_val))
-                x.append(x_val)
-                runtimes.append(runtime)
-            self._init_kwargs[self._var_key] = var_values     # restore kwargs
-            return x, runtimes
+        def _beyond(self, x_val, x_out):
+            # only points at least as large in every key are skipped
+            return all(a >= b for a, b in zip(x_val, x_out))
+
+        def _fingerprint_parts(self):
+            return [_code_fingerprint(self._func),
+                    _kwargs_fingerprint(_dup_dict_without_keys(
+                        self._kwargs, *self._var_keys))] + [
+                _code_fingerprint(self._input_factories.get(k))
+                for k in self._var_keys]
+
+        def _label_metadata(self):
+            return dict(super()._label_metadata(),
+                        grid_keys=list(self._var_keys))
+
+        def _with_var_values(self, var_values):
+            """Return a copy of the profiler measuring the grid var_values."""
+            clone = copy.copy(self)
+            clone._grid = list(var_values)
+            return clone
+
+        _supports_cprofile = True
+
+        def _point_kwargs(self, var_val):
+            kwargs = dict(self._kwargs)
+            for k, v in zip(self._var_keys, var_val):
+                factory = self._input_factories.get(k)
+                kwargs[k] = v if factory is None else factory(v)
+            return kwargs
+
+        def _collect(self, events):
+            """Return the ProfileSeries with x the first key's values and the
+            other keys' values as extras."""
+            series = ProfileSeries()
+            for kind, x_val, point in self._in_x_order(events):
+                if kind != "point":
+                    _mark_series(series, kind, list(x_val), point)
+                    continue
+                stats, extra = point
+                series.append(x_val[0], stats, dict(
+                    extra, **dict(zip(self._var_keys[1:], x_val[1:]))))
+            return series
 
     class _ProfileContainer:
         """Store profilers and associated information."""
-        def __init__(self):
+        def __init__(self, cache=None):
             self.profilers = {}
+            self.cache = cache
 
         def get_profiler(self, label):
             """Return profiler stored under given label."""
@@ -264,7 +3636,7 @@ class ProfilePlotter:
                 yield k, v
 
     # ProfilePlotter
-    def __init__(self, x_axis_label, y_axis_label):
+    def __init__(self, x_axis_label, y_axis_label, cache=None):
         """ProfilePlotter Init.
 
         Input:
@@ -272,6 +3644,12 @@ class ProfilePlotter:
         - x_axis_label: str, label for plot x axis
         - y_axis_label: str, label for plot y axis
 
+        Kwargs:
+        -------
+        - cache: ResultCache, reuse points measured by earlier runs, or
+                 ProfileJournal, checkpoint every point so an interrupted
+                 run resumes where it stopped.
+
         Raises:
         -------
         - TypeError: if x_axis_label or y_axis_label are not strings
@@ -279,15 +3657,18 @@ class ProfilePlotter:
         if (not isinstance(x_axis_label, str)
                 or not isinstance(y_axis_label, str)):
             raise TypeError("axis label parameters must be strings")
-        self.profilers = self._ProfileContainer()
+        self.profilers = self._ProfileContainer(cache)
         self.x_label = x_axis_label
         self.y_label = y_axis_label
 
-    def set_func_profile(self, label, func, kwargs, var_key, var_conv_func=None):
+    def set_func_profile(self, label, func, kwargs, var_key, var_conv_func=None,
+                         measure=None, input_factory=None):
         """Profile given function. Label the resutls with label in the plot.
 
         This funtion is suitable for functions or class methods that don't
-        require any change to instance/class variables.
+        require any change to instance/class variables. Coroutine functions
+        (async def) are run to completion on an event loop of their own,
+        each timed call awaiting one coroutine.
 
         Input:
         -----
@@ -299,16 +3680,219 @@ class ProfilePlotter:
         Keyword Arguments:
         var_conv_func -- function to convert variable argument obejects to x
                          axis values
+        measure -- MeasureConfig, repeats, warmup and loop count used to time
+                   each point. Defaults to a single call per point.
+        input_factory -- function building the varied argument from each
+                         value under var_key (e.g. a size), called lazily so
+                         only one input is in memory at a time.
         """
         if not isinstance(label, str):
             raise TypeError("argument label must be of type string. got type"
                             f" {type(label)}")
         profiler = self._Profiler(func, kwargs, var_key,
-                                  var_conv_func=var_conv_func)
+                                  var_conv_func=var_conv_func, measure=measure,
+                                  input_factory=input_factory)
+        self.profilers.add_profile(label, profiler)
+
+    def set_comparison_profile(self, label, funcs, kwargs, var_key,
+                               var_conv_func=None, measure=None,
+                               input_factory=None, mutating=()):
+        """Profile competing implementations of a function on shared input.
+
+        Each input is generated once per x value and every function is
+        timed on it, their samples taken in turns. Unlike one
+        set_func_profile per function, a generator under var_key is
+        consumed once and inputs aren't held once per function. The results
+        are one series per function, labelled "<label>.<name>".
+
+        Input:
+        ------
+        label -- str, name prefix of the datasets for the plot
+        funcs -- dict, name to function, all taking the keys of kwargs
+        kwargs -- dict, arguments shared by all functions
+        var_key -- the name of the variable argument key
+
+        Keyword Arguments:
+        var_conv_func -- function to convert variable argument objects to x
+                         axis values
+        measure -- MeasureConfig, how each point is timed
+        input_factory -- function building the varied argument lazily
+        mutating -- iterable of names in funcs that change their input,
+                    timed one call per sample, each on a deep copy made
+                    untimed
+        """
+        if not isinstance(label, str):
+            raise TypeError("argument label must be of type string. got type"
+                            f" {type(label)}")
+        profiler = self._ComparisonProfiler(
+            funcs, kwargs, var_key, var_conv_func, measure, input_factory,
+            mutating)
+        self.profilers.add_profile(label, profiler)
+
+    def set_adaptive_profile(self, label, func, kwargs, var_key, x_range,
+                             integer=True, log=False, initial_points=5,
+                             max_points=30, time_budget=None, measure=None):
+        """Profile func at x values chosen adaptively within x_range.
+
+        Instead of an iterable of inputs, kwargs holds a factory under
+        var_key: a function taking an x value and returning the argument to
+        call func with. Points start evenly spaced and are then added where
+        the runtime curve bends or is noisy, until max_points points are
+        measured or time_budget seconds have passed.
+
+        Input:
+        -----
+        label -- str, name of the dataset for the plot
+        func -- function pointer, funtion to be tested.
+        kwargs -- dict, function arguments, a factory under var_key
+        var_key -- the name of the variable argument key
+        x_range -- pair of numbers, lowest and highest x value
+
+        Keyword Arguments:
+        integer -- bool, only measure integer x values
+        log -- bool, work on a log x scale, for ranges spanning magnitudes
+        initial_points -- int, evenly spaced points measured first
+        max_points -- int, most points measured
+        time_budget -- float, seconds after which no new point is started
+        measure -- MeasureConfig, how each point is timed
+        """
+        if not isinstance(label, str):
+            raise TypeError("argument label must be of type string. got type"
+                            f" {type(label)}")
+        profiler = self._AdaptiveProfiler(
+            func, kwargs, var_key, x_range, integer, log, initial_points,
+            max_points, time_budget, measure)
+        self.profilers.add_profile(label, profiler)
+
+    def set_concurrency_profile(self, label, func, kwargs, concurrency,
+                                measure=None):
+        """Profile a coroutine function against its number of concurrent
+        calls.
+
+        x is the number N of calls run together with asyncio.gather, y the
+        time the batch takes. Plot metric="throughput" for calls per second
+        or "latency_p50" and "latency_p99" for the latency of single calls.
+        Coroutine functions given to set_func_profile are instead timed
+        one call at a time.
+
+        Input:
+        -----
+        label -- str, name of the dataset for the plot
+        func -- coroutine function to be tested
+        kwargs -- dict, the arguments of every call
+        concurrency -- iterable of ints, the numbers of concurrent calls
+
+        Keyword Arguments:
+        measure -- MeasureConfig, how each batch is timed
+        """
+        if not isinstance(label, str):
+            raise TypeError("argument label must be of type string. got type"
+                            f" {type(label)}")
+        profiler = self._ConcurrencyProfiler(func, kwargs, concurrency,
+                                             measure)
+        self.profilers.add_profile(label, profiler)
+
+    def set_grid_profile(self, label, func, kwargs, var_keys,
+                         var_conv_funcs=None, measure=None,
+                         input_factories=None, grid=None):
+        """Profile func over every combination of values of several keys.
+
+        The results hold x as the first key's values and the other keys'
+        values as columns. Draw them with plot_grid, or with plot as a line
+        per value of the second key. With a ResultCache every grid point is
+        cached on its own, so a grid can be extended and filled in over
+        several runs.
+
+        Input:
+        -----
+        label -- str, name of the dataset for the plot
+        func -- function pointer, funtion to be tested.
+        kwargs -- dict, function arguments, an iterable under each var key
+        var_keys -- list of the names of the varied arguments, two or more
+
+        Keyword Arguments:
+        var_conv_funcs -- dict, var key to a function converting its values
+                          to axis values
+        measure -- MeasureConfig, how each point is timed
+        input_factories -- dict, var key to a function building its argument
+                           lazily from each value
+        grid -- iterable of tuples of values, one per var key, measured
+                instead of every combination
+        """
+        if not isinstance(label, str):
+            raise TypeError("argument label must be of type string. got type"
+                            f" {type(label)}")
+        profiler = self._GridProfiler(func, kwargs, var_keys, var_conv_funcs,
+                                      measure, input_factories, grid)
+        self.profilers.add_profile(label, profiler)
+
+    def set_scaling_profile(self, label, func, kwargs, workers, ops,
+                            executor=ThreadPoolExecutor, var_conv_func=None,
+                            measure=None):
+        """Profile a workload against the worker count of an executor.
+
+        x is the number of workers, y the time ops calls of func take on an
+        executor of that many workers. Plot metric="throughput", "speedup"
+        or "efficiency" to draw them against ideal linear scaling.
+
+        Input:
+        -----
+        label -- str, name of the dataset for the plot
+        func -- function making one operation of the workload
+        kwargs -- dict, the arguments of every call
+        workers -- iterable of ints, the worker counts, ascending
+        ops -- int, calls made per timed batch
+
+        Keyword Arguments:
+        executor -- executor class, ThreadPoolExecutor or
+                    ProcessPoolExecutor
+        var_conv_func -- function converting worker counts to x values
+        measure -- MeasureConfig, how each batch is timed
+        """
+        if not isinstance(label, str):
+            raise TypeError("argument label must be of type string. got type"
+                            f" {type(label)}")
+        profiler = self._ScalingProfiler(func, kwargs, workers, ops, executor,
+                                         var_conv_func, measure)
+        self.profilers.add_profile(label, profiler)
+
+    def set_instance_profile(self, label, class_init, init_kwargs, var_key,
+                             methods, var_conv_func=None, measure=None,
+                             input_factory=None, reset=None, time_init=True):
+        """Profile construction and several methods of a class separately.
+
+        Per value of the varied init argument the class is built once and
+        every method is timed on that instance. The results are one series
+        per method, labelled "<label>.<method name>", and, with time_init,
+        "<label>.__init__" for the construction time.
+
+        Input:
+        ------
+        label -- str, name prefix of the datasets for the plot
+        class_init -- obj, class constructor
+        init_kwargs -- dict, constructor arguments, an iterable under var_key
+        var_key -- str, the key in the init_kwargs that is to be varied
+        methods -- dict, name to method or (method, method_kwargs) pair
+
+        Keyword Arguments:
+        var_conv_func -- function, converts varied values to x values
+        measure -- MeasureConfig, how each point is timed
+        input_factory -- function building the varied init argument lazily
+        reset -- function taking the instance, run before every timed
+                 sample outside the timed region
+        time_init -- bool, also time construction
+        """
+        if not isinstance(label, str):
+            raise TypeError("argument label must be of type string. got type"
+                            f" {type(label)}")
+        profiler = self._InstanceProfiler(
+            class_init, init_kwargs, var_key, methods, var_conv_func, measure,
+            input_factory, reset, time_init)
         self.profilers.add_profile(label, profiler)
 
     def set_var_init_profile(self, label, class_init, init_kwargs, var_key,
-                             method, method_kwargs, var_conv_func=None):
+                             method, method_kwargs, var_conv_func=None,
+                             measure=None, input_factory=None):
         """Set a variable init profiler to the given label.
 
         This profiler will measure the runtime of a method that is dependant
@@ -327,23 +3911,643 @@ class ProfilePlotter:
         method_kwargs -- dict, parameters and values to run the method.
         var_conv_func -- function, function to apply to each element in the
                          variable parameter iterable (see var_key).
+        measure -- MeasureConfig, repeats, warmup and loop count used to time
+                   each point. Defaults to a single call per point.
+        input_factory -- function building the varied init argument from
+                         each value under var_key, called lazily per point.
         """
         if not isinstance(label, str):
             raise TypeError("argument label must be of type string. got type"
                             f" {type(label)}")
         profiler = self._VariableInitMethodProfiler(
             class_init, init_kwargs, var_key,
-            method, method_kwargs, var_conv_func)
+            method, method_kwargs, var_conv_func, measure, input_factory)
         self.profilers.add_profile(label, profiler)
 
-    def plot(self):
-        """Plot the results of all profilers and return fig, ax objs."""
+    def _profile_all(self, parallel=None, force_rerun=False, live=None):
+        """Run every profiler, return dict of label to ProfileSeries, or to
+        a dict of them for profilers making several series.
+
+        With a _LivePlot live the profilers run one after another, their
+        points drawn as they come.
+        """
+        cache = self.profilers.cache
+        if live is not None:
+            results = {label: profiler._collect(live.watch(
+                           label, profiler.iter_profile(cache, label,
+                                                        force_rerun)))
+                       for label, profiler in self.profilers}
+        elif parallel is None:
+            results = {label: profiler.profile(cache, label, force_rerun)
+                       for label, profiler in self.profilers}
+        else:
+            results = _profile_in_pool(list(self.profilers), parallel, cache,
+                                       force_rerun)
+        if cache is not None:
+            cache.evict()
+        return results
+
+    def run(self, parallel=None, force_rerun=False):
+        """Run all profilers and return their results as a ProfileResult.
+
+        Kwargs:
+        -------
+        - parallel: ParallelConfig, run the profiles in a process pool
+                    instead of one after another.
+        - force_rerun: bool, measure every point even if the plotter's
+                       ResultCache holds it.
+
+        Raises:
+        -------
+        - ValueError: no profiles have been set
+        """
         if (len(self.profilers) == 0):
-            raise ValueError("No function profiles to be plotted.")
-        fig, ax = plt.subplots(figsize=(19.2, 10.8))
+            raise ValueError("No function profiles to be run.")
+        return self._to_result(self._profile_all(parallel, force_rerun))
+
+    def _to_result(self, results):
+        """Return the ProfileResult of the _profile_all results."""
+        series = {}
+        label_metadata = {}
         for label, profiler in self.profilers:
-            ax.plot(*profiler.profile(), label=label)
+            for full_label, part in _flatten_series(label, results[label]):
+                series[full_label] = part
+                label_metadata[full_label] = profiler._label_metadata()
+        return ProfileResult.from_series(series, label_metadata, {
+            "x_label": self.x_label, "y_label": self.y_label,
+            "created": datetime.datetime.now().isoformat(),
+            "environment": _environment()})
+
+    def plot(self, parallel=None, force_rerun=False, result=None,
+             metric="time", twin=None, fit=False, extrapolate=None,
+             live=False, refresh=0.5, progress=None, max_points=2000,
+             xscale=None, yscale=None, rasterize=None):
+        """Plot the results of all profilers and return fig, ax objs.
+
+        Each profile is drawn as its median runtime, with a shaded band
+        between the MeasureConfig.band percentiles when the repeated
+        samples have any spread. Other measurements, e.g. memory, can be
+        drawn instead or on a second y axis. Points that ran over
+        MeasureConfig.timeout are marked with an x along the top. The
+        throughput, speedup and efficiency of scaling profiles are drawn
+        with their ideal linear scaling, dotted.
+
+        Kwargs:
+        -------
+        - parallel: ParallelConfig, run the profiles in a process pool
+                    instead of one after another.
+        - force_rerun: bool, measure every point even if the plotter's
+                       ResultCache holds it.
+        - result: ProfileResult, plot these results instead of running the
+                  profilers, e.g. one returned by run or ProfileResult.load.
+        - metric: str, "time" or the name of a LabelResult column to plot,
+                  e.g. "peak_bytes" of profiles measured with
+                  MeasureConfig(memory=True).
+        - twin: str, a metric drawn dashed against a second y axis on the
+                right, found as fig.axes[1], e.g. runtime with memory.
+        - fit: bool, overlay the best fitting complexity model of each
+               label's runtimes, see fit_complexity, named in the legend.
+               Only with metric "time".
+        - extrapolate: number, with fit, extend the fitted curves to this x
+                       and mark the predicted runtime there.
+        - live: bool, draw each point as soon as it is measured, then the
+                full plot once all are done, on the same figure. Profiles
+                run one after another.
+        - refresh: float, with live, least seconds between redraws.
+        - progress: text stream, with live, e.g. sys.stderr, also write the
+                    progress and ETA shown in the title to it.
+        - max_points: int, most points drawn per label. Longer series are
+                      decimated keeping the extremes of every stretch of
+                      points, see _decimate, so drawing time and file size
+                      don't grow with the number of x values. None draws
+                      every point.
+        - xscale, yscale: str, axis scales, e.g. "log" or "symlog".
+        - rasterize: int, labels of more x values than this are drawn as
+                     an image within vector output, svg or pdf, keeping
+                     the files small. The axes and text stay vector.
+
+        Raises:
+        -------
+        - ValueError: no profiles have been set, live with parallel, or
+                      fit with a metric other than "time"
+        """
+        if fit and metric != "time":
+            raise ValueError("fit models runtimes, it can only be used with"
+                             " metric 'time'.")
+        fig = None
+        if result is None:
+            if (len(self.profilers) == 0):
+                raise ValueError("No function profiles to be plotted.")
+            if live:
+                if parallel is not None:
+                    raise ValueError("live plotting profiles serially, it"
+                                     " can't be combined with parallel.")
+                fig, ax = plt.subplots(figsize=(19.2, 10.8))
+                ax.set_xlabel(self.x_label)
+                ax.set_ylabel(self.y_label)
+                counts = [p._point_count() for _, p in self.profilers]
+                total = None if None in counts else sum(counts)
+                plt.show(block=False)
+                result = self._to_result(self._profile_all(
+                    force_rerun=force_rerun,
+                    live=_LivePlot(fig, ax, total, refresh, progress)))
+                if progress is not None:
+                    progress.write("\n")
+                # the final plot adds bands, fits and the rest
+                ax.cla()
+            else:
+                result = self.run(parallel, force_rerun)
+        if fig is None:
+            fig, ax = plt.subplots(figsize=(19.2, 10.8))
+        draw = {"max_points": max_points, "rasterize": rasterize}
+        colors = self._draw_metric(ax, result, metric, **draw)
+        self._draw_ideal(ax, result, metric, colors)
+        if fit:
+            self._draw_fits(ax, result, colors, extrapolate)
+        if xscale is not None:
+            ax.set_xscale(xscale)
+        if yscale is not None:
+            ax.set_yscale(yscale)
         ax.set_xlabel(self.x_label)
-        ax.set_ylabel(self.y_label)
+        ax.set_ylabel(self.y_label if metric == "time"
+                      else _METRIC_LABELS.get(metric, metric))
         ax.legend(loc="upper left")
+        if twin is not None:
+            twin_ax = ax.twinx()
+            self._draw_metric(twin_ax, result, twin, colors, "--", **draw)
+            self._draw_ideal(twin_ax, result, twin, colors)
+            if yscale is not None:
+                twin_ax.set_yscale(yscale)
+            twin_ax.set_ylabel(_METRIC_LABELS.get(twin, twin))
+        return fig, ax
+
+    def plot_callees(self, label=None, result=None, top=5, parallel=None,
+                     force_rerun=False):
+        """Plot a profile's runtime above the share of it spent in its top
+        callees, return fig and the two axes.
+
+        The shares are a stacked area chart over the x values profiled
+        with MeasureConfig.cprofile, see LabelResult.callee_shares.
+
+        Kwargs:
+        -------
+        - label: str, the profile to plot, needed when several have
+                 callee data.
+        - result: ProfileResult, plot these results instead of running the
+                  profilers.
+        - top: int, callees drawn, the rest are drawn as "other".
+        - parallel, force_rerun: see run.
+
+        Raises:
+        -------
+        - ValueError: no or several profiles with callee data and no label,
+                      label has no callee data
+        """
+        if result is None:
+            result = self.run(parallel, force_rerun)
+        if label is None:
+            profiled = [lab for lab, res in result
+                        if "callee:other" in res.extra]
+            if len(profiled) != 1:
+                raise ValueError(f"Give the label to plot, found"
+                                 f" {len(profiled)} profiles with callee"
+                                 " data.")
+            label = profiled[0]
+        res = result[label]
+        xs, shares = res.callee_shares(top)
+        if not shares:
+            raise ValueError(f"Profile {label!r} has no callee data, set"
+                             " MeasureConfig.cprofile.")
+        fig, (time_ax, share_ax) = plt.subplots(2, 1, sharex=True,
+                                                figsize=(19.2, 10.8))
+        time_ax.plot(res.x, res.y, label=label)
+        time_ax.set_ylabel(self.y_label)
+        time_ax.legend(loc="upper left")
+        share_ax.stackplot(xs, *shares.values(), labels=list(shares))
+        share_ax.set_ylim(0, 1)
+        share_ax.set_xlabel(self.x_label)
+        share_ax.set_ylabel("Share of runtime")
+        share_ax.legend(loc="upper left", fontsize="small")
+        return fig, (time_ax, share_ax)
+
+    def plot_grid(self, label=None, result=None, metric="time",
+                  kind="heatmap", by=None, parallel=None, force_rerun=False):
+        """Plot a two key grid profile and return fig, ax objs.
+
+        Kwargs:
+        -------
+        - label: str, the grid profile to plot, needed when there are
+                 several.
+        - result: ProfileResult, plot these results instead of running the
+                  profilers.
+        - metric: str, "time" or the name of a LabelResult column.
+        - kind: str, "heatmap", "contour" (filled) or "lines", a line per
+                value of the grid key by.
+        - by: str, with "lines", the key held fixed along each line,
+              the second key by default.
+        - parallel, force_rerun: see run.
+
+        Raises:
+        -------
+        - ValueError: unknown kind, no or several grid profiles and no
+                      label, label is not a two key grid profile
+        """
+        if kind not in ("heatmap", "contour", "lines"):
+            raise ValueError("kind must be one of 'heatmap', 'contour' or"
+                             " 'lines'.")
+        if result is None:
+            result = self.run(parallel, force_rerun)
+        if label is None:
+            grids = [lab for lab, res in result
+                     if "grid_keys" in res.metadata]
+            if len(grids) != 1:
+                raise ValueError(f"Give the label of the grid to plot, found"
+                                 f" {len(grids)} grid profiles.")
+            label = grids[0]
+        res = result[label]
+        keys = res._grid_keys()
+        metric_label = (self.y_label if metric == "time"
+                        else _METRIC_LABELS.get(metric, metric))
+        fig, ax = plt.subplots(figsize=(19.2, 10.8))
+        if kind == "lines":
+            by = keys[1] if by is None else by
+            for value, xs, ys in res.slices(metric, by):
+                ax.plot(xs, ys, "o-", label=f"{by}={value:g}")
+            ax.set_xlabel(keys[0] if by == keys[1] else keys[1])
+            ax.set_ylabel(metric_label)
+            ax.legend(loc="upper left")
+        else:
+            xs, ys, values = res.grid(metric)
+            if kind == "heatmap":
+                mesh = ax.pcolormesh(xs, ys, values, shading="nearest")
+            else:
+                mesh = ax.contourf(xs, ys, values)
+            fig.colorbar(mesh, ax=ax, label=metric_label)
+            ax.set_xlabel(keys[0])
+            ax.set_ylabel(keys[1])
+        ax.set_title(label)
         return fig, ax
+
+    @staticmethod
+    def _draw_ideal(ax, result, metric, colors):
+        """Draw ideal linear scaling of the scaling profiles on ax, for the
+        "throughput", "speedup" and "efficiency" metrics."""
+        if metric not in ("throughput", "speedup", "efficiency"):
+            return
+        for label, res in result:
+            if not res.metadata.get("scaling") or len(res) == 0:
+                continue
+            workers = res.columns["workers"]
+            base = np.argmin(workers)
+            scale = workers / workers[base]
+            ideal = {"throughput": res.columns["throughput"][base] * scale,
+                     "speedup": scale,
+                     "efficiency": np.ones_like(scale)}[metric]
+            ax.plot(res.x, ideal, ":", color=colors.get(label),
+                    label=f"{label} ideal")
+
+    @staticmethod
+    def _draw_fits(ax, result, colors, extrapolate=None):
+        """Draw the complexity fit of each label's runtimes on ax."""
+        for label, fit in result.fit_complexity().items():
+            res = result[label]
+            high = res.x.max() if extrapolate is None \
+                else max(res.x.max(), extrapolate)
+            xs = np.linspace(res.x.min(), high, 200)
+            color = colors.get(label)
+            ax.plot(xs, fit.predict(xs), ":", color=color,
+                    label=f"{label} ~ {fit.name}")
+            if extrapolate is not None:
+                pred = float(fit.predict(extrapolate))
+                ax.plot([extrapolate], [pred], "o", color=color)
+                ax.annotate(f"{pred:.3g}", (extrapolate, pred),
+                            textcoords="offset points", xytext=(5, 5))
+
+    @staticmethod
+    def _draw_metric(ax, result, metric, colors=None, linestyle="-",
+                     max_points=None, rasterize=None):
+        """Draw metric of each label of result on ax.
+
+        "time" draws the median runtime with its percentile band, any other
+        metric the LabelResult column of that name. Labels without the
+        column are left out. x values that timed out are marked with an x
+        along the top of the axes, those that failed with a !. Two key
+        grid profiles are drawn as a line per value of their second key,
+        grids of more keys are left out. Each label is decimated to
+        max_points and rasterized beyond rasterize x values, see plot.
+        Return dict of label to line colour.
+        """
+        drawn = {}
+        for label, res in result:
+            if metric != "time" and metric not in res.columns:
+                continue
+            if len(res.metadata.get("grid_keys", ())) == 2:
+                by = res.metadata["grid_keys"][1]
+                for value, xs, ys in res.slices(metric):
+                    line, = ax.plot(xs, ys, linestyle,
+                                    label=f"{label} {by}={value:g}")
+                    drawn.setdefault(label, line.get_color())
+                continue
+            if "grid_keys" in res.metadata:
+                continue
+            y = res.y if metric == "time" else res.columns[metric]
+            kwargs = {} if colors is None or label not in colors \
+                else {"color": colors[label]}
+            dense = rasterize is not None and len(res) > rasterize
+            keep = _decimate(y, max_points)
+            line, = ax.plot(res.x[keep], np.asarray(y)[keep], linestyle,
+                            label=label, rasterized=dense, **kwargs)
+            drawn[label] = line.get_color()
+            band = res.band() if metric == "time" else None
+            if band is not None and not np.array_equal(*band):
+                ax.fill_between(res.x[keep], band[0][keep], band[1][keep],
+                                color=line.get_color(), alpha=0.25,
+                                linewidth=0, rasterized=dense)
+            timed_out = res.metadata["timed_out"]
+            if timed_out:
+                ax.plot(timed_out, [1]*len(timed_out), "x",
+                        color=line.get_color(), markersize=10, clip_on=False,
+                        transform=ax.get_xaxis_transform(),
+                        label=f"{label} (timed out)")
+            failed = [x_val for x_val, _ in res.metadata["failed"]]
+            if failed:
+                ax.plot(failed, [1]*len(failed), linestyle="",
+                        marker="$!$", color=line.get_color(),
+                        markersize=10, clip_on=False,
+                        transform=ax.get_xaxis_transform(),
+                        label=f"{label} (failed)")
+        return drawn
+
+
+def _init_render_worker():
+    """Select the Agg backend in a render_results worker process.
+
+    A forked worker inherits the backend matplotlib already chose in the
+    parent, so setting MPLBACKEND there would come too late to keep the
+    workers from opening windows.
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+
+
+def _render_result(path, output_dir, formats, plot_kwargs):
+    """Plot the stored result at path, return the files written."""
+    result = ProfileResult.load(path)
+    plotter = ProfilePlotter(result.metadata.get("x_label", "x"),
+                             result.metadata.get("y_label", "Runtime (s)"))
+    fig, _ = plotter.plot(result=result, **plot_kwargs)
+    name = os.path.splitext(os.path.basename(path))[0]
+    base = os.path.join(os.path.dirname(path) if output_dir is None
+                        else output_dir, name)
+    written = []
+    for fmt in formats:
+        fig.savefig(f"{base}.{fmt}")
+        written.append(f"{base}.{fmt}")
+    plt.close(fig)
+    return written
+
+
+def render_results(paths, output_dir=None, formats=("png",), workers=None,
+                   **plot_kwargs):
+    """Plot results saved by ProfileResult.save, without profiling again.
+
+    Each result is loaded and drawn by ProfilePlotter.plot in a pool of
+    worker processes, one figure per result, written as <name>.<format>.
+
+    Input:
+    ------
+    - paths: iterable of result files, .npz, .json or .csv.
+
+    Kwargs:
+    -------
+    - output_dir: str, directory the figures are written to. Defaults to
+                  the directory of each result.
+    - formats: iterable of figure formats, e.g. "png", "svg" or "pdf".
+    - workers: int, worker processes, None for one per CPU.
+    - plot_kwargs: passed on to ProfilePlotter.plot, e.g. metric,
+                   max_points, yscale or rasterize.
+
+    Return:
+    -------
+    - list of the files written, in the order of paths.
+
+    Raises:
+    -------
+    - ValueError: workers < 1
+    """
+    if workers is not None and workers < 1:
+        raise ValueError("workers must be >= 1.")
+    paths = [str(path) for path in paths]
+    formats = tuple(formats)
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+    with ProcessPoolExecutor(workers,
+                             initializer=_init_render_worker) as executor:
+        futures = [executor.submit(_render_result, path, output_dir,
+                                   formats, plot_kwargs) for path in paths]
+        return [name for future in futures for name in future.result()]
+
+
+_suites = {}
+
+
+def profile_suite(x_axis_label="x", y_axis_label="Runtime (s)", name=None):
+    """Decorator registering a profile suite for the command line runner.
+
+    The decorated function takes a ProfilePlotter and adds profiles to it
+    with set_func_profile and friends. Suites are run by python -m profplot
+    on the modules defining them.
+
+    Usage Example:
+    --------------
+    @profplot.profile_suite("Array Length", name="sorting")
+    def sorting(plotter):
+        plotter.set_func_profile("sorted", func, kwargs, 'iterable', len)
+
+    Kwargs:
+    -------
+    - x_axis_label, y_axis_label: str, axis labels of the suite's plot.
+    - name: str, name of the suite and its output files. Defaults to the
+            function name.
+    """
+    def decorator(func):
+        _suites[func.__name__ if name is None else name] = (
+            func, x_axis_label, y_axis_label)
+        return func
+    return decorator
+
+
+def _import_suite_module(spec):
+    """Import a module given as a dotted name or a path to a .py file."""
+    if spec.endswith(".py") or os.sep in spec:
+        mod_name = os.path.splitext(os.path.basename(spec))[0]
+        mod_spec = importlib.util.spec_from_file_location(mod_name, spec)
+        if mod_spec is None:
+            raise ImportError(f"Cannot import {spec}.")
+        module = importlib.util.module_from_spec(mod_spec)
+        # registered so pool workers can unpickle the suite's functions
+        sys.modules[mod_name] = module
+        mod_spec.loader.exec_module(module)
+        return module
+    if "" not in sys.path:
+        sys.path.insert(0, "")
+    return importlib.import_module(spec)
+
+
+def _parse_args(argv):
+    import argparse     # only needed by the command line runner
+    parser = argparse.ArgumentParser(
+        prog="python -m profplot",
+        description="Run the profile suites (functions decorated with"
+                    " profplot.profile_suite) defined in the given modules"
+                    " and write their plots and results.")
+    parser.add_argument("modules", nargs="+",
+                        help="module names or .py files defining suites")
+    parser.add_argument("-s", "--suite", action="append", default=[],
+                        help="only run suites matching this glob, repeatable")
+    parser.add_argument("-k", "--label", action="append", default=[],
+                        help="only run labels matching this glob, repeatable")
+    parser.add_argument("-r", "--repeat", type=int,
+                        help="override the samples taken per point")
+    parser.add_argument("-j", "--workers", type=int,
+                        help="run labels in a pool of this many processes")
+    parser.add_argument("--per-point", action="store_true",
+                        help="with --workers, spread the x values too")
+    parser.add_argument("-o", "--output-dir", default="profplot_output",
+                        help="directory written to (default: %(default)s)")
+    parser.add_argument("-f", "--format", action="append",
+                        choices=["png", "svg", "pdf"],
+                        help="figure format, repeatable (default: png)")
+    parser.add_argument("-d", "--data-format", default="npz",
+                        choices=["npz", "json", "csv"],
+                        help="result data format (default: %(default)s)")
+    parser.add_argument("--baseline",
+                        help="compare each suite with this stored baseline,"
+                             " failing on regressions")
+    parser.add_argument("--save-baseline",
+                        help="store each suite's result as this baseline")
+    parser.add_argument("--baseline-dir", default=".profplot_baselines",
+                        help="baseline directory (default: %(default)s)")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="slowdown tolerated by --baseline"
+                             " (default: %(default)s)")
+    parser.add_argument("--resume", action="store_true",
+                        help="journal every point to <output-dir>/<suite>"
+                             ".journal, resuming from it if present, and"
+                             " record failing points instead of stopping")
+    parser.add_argument("--list", action="store_true",
+                        help="list the suites and labels found and exit")
+    args = parser.parse_args(argv)
+    if args.repeat is not None and args.repeat < 1:
+        parser.error("--repeat must be >= 1")
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be >= 1")
+    return args
+
+
+def _build_suite(name, args):
+    """Return a ProfilePlotter of suite name with the CLI filters applied."""
+    func, x_label, y_label = _suites[name]
+    plotter = ProfilePlotter(x_label, y_label)
+    func(plotter)
+    if args.resume:
+        plotter.profilers.cache = ProfileJournal(
+            os.path.join(args.output_dir, f"{name}.journal"))
+    profilers = plotter.profilers.profilers
+    for label in list(profilers):
+        if args.label and not any(fnmatch.fnmatchcase(label, pat)
+                                  for pat in args.label):
+            del profilers[label]
+        elif args.repeat is not None or args.resume:
+            profiler = copy.copy(profilers[label])
+            profiler._measure = copy.copy(profiler._measure)
+            if args.repeat is not None:
+                profiler._measure.repeat = args.repeat
+            if args.resume:
+                profiler._measure.errors = "record"
+            profilers[label] = profiler
+    return plotter
+
+
+def _run_suite(name, plotter, args):
+    """Run, plot and save one suite. Return True if it passed."""
+    parallel = None if args.workers is None else \
+        ParallelConfig(args.workers, per_point=args.per_point)
+    result = plotter.run(parallel)
+    result.metadata["suite"] = name
+    base = os.path.join(args.output_dir, name)
+    result.save(f"{base}.{args.data_format}")
+    fig, _ = plotter.plot(result=result)
+    for fmt in args.format or ["png"]:
+        fig.savefig(f"{base}.{fmt}")
+    plt.close(fig)
+    print(f"{name}: {len(result)} labels written to {base}.*")
+    passed = True
+    for label, res in result:
+        for x_val, error in res.metadata["failed"]:
+            print(f"{name}: {label!r} failed at x={x_val}: {error}")
+            passed = False
+    if args.baseline is not None:
+        store = BaselineStore(args.baseline_dir)
+        report = compare_results(store.load(args.baseline), result,
+                                 args.threshold)
+        report.to_json(f"{base}.comparison.json")
+        fig, _ = report.plot()
+        fig.savefig(f"{base}.comparison.{(args.format or ['png'])[0]}")
+        plt.close(fig)
+        for point in report.regressions():
+            print(f"{name}: regression in {point['label']!r} at x="
+                  f"{point['x']}: {point['ratio']:.2f}x slower"
+                  f" (p={point['p_value']:.3g})")
+        passed = report.passed and passed
+    if args.save_baseline is not None:
+        BaselineStore(args.baseline_dir).save(args.save_baseline, result)
+    return passed
+
+
+def main(argv=None):
+    """Run profile suites from the command line, return the exit status.
+
+    Exits 0 when every suite ran, with no failed points, and passed its
+    baseline comparison, 1 otherwise. See python -m profplot --help.
+    """
+    args = _parse_args(argv)
+    os.environ.setdefault("MPLBACKEND", "Agg")     # never open windows
+    try:
+        for module in args.modules:
+            _import_suite_module(module)
+    except Exception:
+        traceback.print_exc()
+        return 1
+    names = [n for n in _suites
+             if not args.suite or any(fnmatch.fnmatchcase(n, pat)
+                                      for pat in args.suite)]
+    if not names:
+        print("No profile suites found.", file=sys.stderr)
+        return 1
+    ok = True
+    if not args.list:
+        os.makedirs(args.output_dir, exist_ok=True)
+    for name in names:
+        try:
+            plotter = _build_suite(name, args)
+            if args.list:
+                print(name + "".join(f"\n  {label}"
+                                     for label, _ in plotter.profilers))
+                continue
+            if len(plotter.profilers) == 0:
+                print(f"{name}: no labels match, skipped")
+                continue
+            ok = _run_suite(name, plotter, args) and ok
+        except Exception:
+            print(f"{name}: failed", file=sys.stderr)
+            traceback.print_exc()
+            ok = False
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    # run the importable module, not this __main__ copy, so suites
+    # registered by `import profplot` in user modules are seen
+    import profplot
+    sys.exit(profplot.main())
@@ -0,0 +1,148 @@
+"""Benchmarks guarding the cost of profplot itself."""
+
+import io
+import os
+import subprocess
+import sys
+import timeit
+import time
+import unittest
+import numpy as np
+import profplot
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# cumulative microseconds `import profplot` may take. matplotlib alone costs
+# several hundred milliseconds so this trips if it is imported eagerly again.
+IMPORT_TIME_BUDGET_US = 200000
+
+
+def _import_times(module):
+    """Return dict of module name to cumulative import time in us."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_DIR, capture_output=True, text=True, check=True,
+        env=dict(os.environ, PYTHONPATH=REPO_DIR))
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+class TestStartup(unittest.TestCase):
+    def test_import_is_lazy(self):
+        times = _import_times("profplot")
+        self.assertNotIn("matplotlib", times)
+        self.assertNotIn("numpy", times)
+
+    def test_import_time_budget(self):
+        # best of a few runs, the first can pay for a cold file cache
+        best = min(_import_times("profplot")["profplot"] for _ in range(3))
+        self.assertLess(best, IMPORT_TIME_BUDGET_US)
+
+
+class TestHistTimeDecoratorOverhead(unittest.TestCase):
+    CALLS = 200000
+
+    def per_call_ns(self, func):
+        return min(timeit.repeat(func, number=self.CALLS, repeat=5)) \
+            / self.CALLS * 1e9
+
+    def test_overhead_budget(self):
+        def bare():
+            pass
+        wrapped = profplot.hist_time_decorator(bare)
+        base = self.per_call_ns(bare)
+        enabled = self.per_call_ns(wrapped) - base
+        profplot.set_hist_timing(False)
+        try:
+            disabled = self.per_call_ns(wrapped) - base
+        finally:
+            profplot.set_hist_timing(True)
+        print(f"\nhist_time_decorator overhead per call: enabled"
+              f" {enabled:.0f} ns, disabled {disabled:.0f} ns"
+              f" (budget {profplot.HIST_OVERHEAD_BUDGET_NS} ns)")
+        self.assertLess(enabled, profplot.HIST_OVERHEAD_BUDGET_NS)
+        self.assertLess(disabled, enabled)
+
+
+def _two_args(a, b):
+    pass
+
+
+class TestHarnessOverhead(unittest.TestCase):
+    """Cost per call the timing harness adds on top of the timed function.
+
+    The before figure is timeit calling a lambda that unpacks a kwargs
+    dict, as _run_and_time used to, the after figure the compiled loop of
+    _BoundCall. Both time an empty function of two arguments.
+    """
+    CALLS = 200000
+
+    def per_call_ns(self, timer):
+        return min(timer.repeat(repeat=5, number=self.CALLS)) \
+            / self.CALLS * 1e9
+
+    def test_bound_call_overhead(self):
+        kwargs = {'a': 1, 'b': 2}
+        before = self.per_call_ns(timeit.Timer(lambda: _two_args(**kwargs)))
+        bound = profplot._BoundCall(_two_args, kwargs=kwargs)
+        after = self.per_call_ns(bound.timer())
+        print(f"\nharness overhead per call of an empty function: before"
+              f" {before:.0f} ns, after {after:.0f} ns")
+        self.assertLess(after, before)
+
+    def test_calibrated_empty_call(self):
+        measure = profplot.MeasureConfig(repeat=5, number=self.CALLS,
+                                         calibrate=True)
+        bound = profplot._BoundCall(_two_args, kwargs={'a': 1, 'b': 2})
+        residual = measure.measure(bound).median * 1e9
+        plain = profplot.MeasureConfig(repeat=5, number=self.CALLS)
+        uncalibrated = plain.measure(bound).median * 1e9
+        print(f"\nempty call after subtracting the baseline: {residual:.1f}"
+              f" ns, {uncalibrated:.1f} ns before")
+        self.assertLess(residual, uncalibrated)
+
+
+class TestPlotRendering(unittest.TestCase):
+    """Time to draw and save a plot of a few long series, each point drawn
+    versus decimated to the default max_points."""
+    POINTS = 100000
+    LABELS = 4
+
+    def render(self, result, fmt, **kwargs):
+        plotter = profplot.ProfilePlotter("n", "t")
+        start = time.perf_counter()
+        fig, _ = plotter.plot(result=result, **kwargs)
+        out = io.BytesIO()
+        fig.savefig(out, format=fmt)
+        profplot.plt.close(fig)
+        return time.perf_counter() - start, len(out.getvalue())
+
+    def test_decimated_rendering(self):
+        rng = np.random.default_rng(0)
+        x = np.arange(1, self.POINTS + 1)
+        labels = {}
+        for ind in range(self.LABELS):
+            samples = (x * (ind + 1) * 1e-9)[:, None] \
+                * rng.uniform(0.9, 1.1, (self.POINTS, 3))
+            labels[f"l{ind}"] = profplot.LabelResult(
+                x, samples, np.ones(self.POINTS),
+                metadata={"percentiles": [25, 75], "band": [25, 75]})
+        result = profplot.ProfileResult(labels)
+        for fmt in ("png", "svg"):
+            full, full_size = self.render(result, fmt, max_points=None)
+            fast, fast_size = self.render(result, fmt)
+            print(f"\n{fmt} of {self.LABELS} labels of {self.POINTS} points:"
+                  f" every point {full:.2f} s {full_size/1e6:.1f} MB,"
+                  f" decimated {fast:.2f} s {fast_size/1e6:.1f} MB")
+            self.assertLess(fast, full)
+            if fmt == "svg":
+                self.assertLess(fast_size, full_size)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,11 +1,51 @@
 """Testing for func_decorators module."""
 
+import asyncio
+import gc
+import io
+import json
+import math
+import mmap
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import warnings
+import weakref
 import unittest
 import time
+import numpy as np
 import profplot
 from profplot import ProfilePlotter as pp
 
 
+def _sleep(secs):
+    time.sleep(secs)
+
+
+async def _async_sleep(secs):
+    await asyncio.sleep(secs)
+
+
+def _squares(n):
+    return [i*i for i in range(n)]
+
+
+def _sort_squares(n):
+    return sorted(_squares(n), reverse=True)
+
+
+def _sum_to(n):
+    return sum(range(n))
+
+
+def _fail_at(n, bad):
+    if n == bad:
+        raise RuntimeError("out of memory")
+
+
 class TestFuncDecorators(unittest.TestCase):
     def test_ret_rime_decorator(self):
         @ profplot.ret_time_decorator
@@ -19,6 +59,65 @@ class TestFuncDecorators(unittest.TestCase):
         self.assertAlmostEqual(wait_0_1(), 0.1, dec_place_accuracy)
         self.assertAlmostEqual(wait_1(), 0.01, dec_place_accuracy)
 
+    def test_hist_time_decorator(self):
+        @profplot.hist_time_decorator
+        def add(a, b=1):
+            time.sleep(0.002)
+            return a + b
+        self.assertEqual(add(1, b=2), 3)
+        snap = add.histogram.snapshot()
+        self.assertEqual(snap.count, 1)
+        self.assertGreaterEqual(snap.max, 2000000)
+        self.assertEqual(snap.p50, snap.max)
+        name = f"{add.__module__}.{add.__qualname__}"
+        self.assertEqual(profplot.hist_snapshots()[name], snap)
+        # nothing is recorded while switched off
+        profplot.set_hist_timing(False)
+        try:
+            self.assertEqual(add(1), 2)
+        finally:
+            profplot.set_hist_timing(True)
+        self.assertEqual(add.histogram.snapshot().count, 1)
+
+    def test_latency_histogram(self):
+        hist = profplot.LatencyHistogram()
+        self.assertEqual(hist.snapshot(), (0, 0, 0, 0))
+        for ns in range(1, 1001):
+            hist.record(ns * 1000)
+        snap = hist.snapshot()
+        self.assertEqual(snap.count, 1000)
+        self.assertEqual(snap.max, 1000000)
+        # bucket bounds are within 1/16 of the true value
+        self.assertAlmostEqual(snap.p50 / 500000, 1, delta=1/16)
+        self.assertAlmostEqual(snap.p99 / 990000, 1, delta=1/16)
+        hist.record(2**50)
+        self.assertEqual(hist.percentile(100), 2**50)
+        hist.reset()
+        self.assertEqual(hist.snapshot().count, 0)
+        # threads record without losing counts
+        def work():
+            for _ in range(5000):
+                hist.record(123)
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(hist.snapshot(), (20000, 123, 123, 123))
+        # the ended threads' lists are merged and dropped
+        gc.collect()
+        self.assertEqual(len(hist._thread_counts), 1)
+
+    def test_latency_histogram_overflow(self):
+        hist = profplot.LatencyHistogram()
+        top = 2**41 - 1     # in the last bucket, not beyond it
+        hist.record(top)
+        hist.record(top)
+        hist.record(2**50)
+        self.assertEqual(hist.percentile(50), top)
+        self.assertEqual(hist.percentile(100), 2**50)
+
+
 class TestFunctions(unittest.TestCase):
     def test__dup_kwargs_without_keys(self):
         def dummy(n):
@@ -53,6 +152,671 @@ class TestFunctions(unittest.TestCase):
         self.assertEqual(kwargs_cop, kwargs)   # check no mutation
 
 
+    def test_headless_backend(self):
+        env = {k: v for k, v in os.environ.items()
+               if k not in ("DISPLAY", "WAYLAND_DISPLAY", "MPLBACKEND")}
+        code = ("import sys, profplot\n"
+                "assert 'matplotlib' not in sys.modules\n"
+                "profplot.plt.figure()\n"
+                "import matplotlib\n"
+                "print(matplotlib.get_backend())")
+        out = subprocess.run([sys.executable, "-c", code], env=env,
+                             cwd=os.path.dirname(profplot.__file__),
+                             capture_output=True, text=True, check=True)
+        if sys.platform not in ("darwin", "win32"):
+            self.assertEqual(out.stdout.strip().lower(), "agg")
+
+    def test_render_worker_backend(self):
+        # a forked worker keeps the backend the parent already loaded
+        code = ("import matplotlib, profplot\n"
+                "matplotlib.use('svg')\n"
+                "import matplotlib.pyplot\n"
+                "profplot._init_render_worker()\n"
+                "print(matplotlib.get_backend())")
+        out = subprocess.run([sys.executable, "-c", code],
+                             cwd=os.path.dirname(profplot.__file__),
+                             capture_output=True, text=True, check=True)
+        self.assertEqual(out.stdout.strip().lower(), "agg")
+
+
+    def test_fit_complexity(self):
+        x = np.arange(1, 101, dtype=float)
+        rng = np.random.default_rng(0)
+        cases = {"O(1)": 0*x + 2, "O(log n)": 3*np.log(x) + 1,
+                 "O(n)": 2*x + 5, "O(n log n)": x*np.log(x),
+                 "O(n^2)": 0.5*x**2 + 10}
+        for name, y in cases.items():
+            noisy = y * (1 + 0.01*rng.standard_normal(len(x)))
+            fit = profplot.fit_complexity(x, noisy)
+            self.assertEqual(fit.name, name)
+            self.assertEqual(set(fit.residuals), set(cases))
+        fit = profplot.fit_complexity(x, cases["O(n)"])
+        self.assertAlmostEqual(fit.coeffs[0], 2)
+        self.assertAlmostEqual(fit.coeffs[1], 5)
+        self.assertAlmostEqual(fit.r_squared, 1)
+        self.assertAlmostEqual(float(fit.predict(1000)), 2005)
+        # decreasing curves are no faster than constant
+        self.assertEqual(profplot.fit_complexity(x, -x).name, "O(1)")
+        custom = profplot.fit_complexity(x, x**3, {"O(n^3)": lambda x: x**3})
+        self.assertEqual(custom.name, "O(n^3)")
+        with self.assertRaises(ValueError):
+            profplot.fit_complexity([1], [1])
+        with self.assertRaises(ValueError):
+            profplot.fit_complexity([1, 2], [1, 2, 3])
+
+
+class TestMeasureConfig(unittest.TestCase):
+    def test__init__(self):
+        with self.assertRaises(TypeError):
+            profplot.MeasureConfig(repeat=2.0)
+        with self.assertRaises(TypeError):
+            profplot.MeasureConfig(number="1")
+        with self.assertRaises(ValueError):
+            profplot.MeasureConfig(repeat=0)
+        with self.assertRaises(ValueError):
+            profplot.MeasureConfig(warmup=-1)
+        with self.assertRaises(ValueError):
+            profplot.MeasureConfig(number=0)
+        with self.assertRaises(ValueError):
+            profplot.MeasureConfig(percentiles=(50, 101))
+        with self.assertRaises(ValueError):
+            profplot.MeasureConfig(band=(10, 90))
+        with self.assertRaises(ValueError):
+            profplot.MeasureConfig(timeout=0)
+        with self.assertRaises(ValueError):
+            profplot.MeasureConfig(label_timeout=-1)
+        with self.assertRaises(ValueError):
+            profplot.MeasureConfig(gc="sometimes")
+        with self.assertRaises(ValueError):
+            profplot.MeasureConfig(cpus=[])
+        profplot.MeasureConfig(number=None)
+
+    def test_measure(self):
+        calls = []
+        config = profplot.MeasureConfig(repeat=4, warmup=2, number=3)
+        stats = config.measure(lambda: calls.append(1))
+        self.assertEqual(len(calls), 2 + 4*3)
+        self.assertEqual(len(stats.samples), 4)
+        self.assertEqual(stats.number, 3)
+        self.assertLessEqual(stats.min, stats.median)
+        self.assertEqual(set(stats.percentiles), {5, 25, 75, 95})
+        # auto-ranging loops fast functions until a sample is long enough
+        config = profplot.MeasureConfig(number=None, min_time=0.01)
+        stats = config.measure(lambda: None)
+        self.assertGreater(stats.number, 1)
+        self.assertGreaterEqual(stats.samples[0]*stats.number, 0.01)
+
+    def test_measure_environment_controls(self):
+        import gc
+        for policy, enabled in (("off", False), ("collect", False),
+                                ("on", True)):
+            seen = []
+            profplot.MeasureConfig(gc=policy).measure(
+                lambda: seen.append(gc.isenabled()))
+            self.assertEqual(seen, [enabled])
+        self.assertTrue(gc.isenabled())
+        if hasattr(os, "sched_setaffinity"):
+            allowed = os.sched_getaffinity(0)
+            cpu = min(allowed)
+            seen = []
+            profplot.MeasureConfig(cpus=[cpu]).measure(
+                lambda: seen.append(os.sched_getaffinity(0)))
+            self.assertEqual(seen, [{cpu}])
+            self.assertEqual(os.sched_getaffinity(0), allowed)
+
+    def test_bound_call(self):
+        def func(a, b=2, *rest, c, **options):
+            return a, b, rest, c, options
+        bound = profplot._BoundCall(func, (1,), {'c': 3, 'b': 4})
+        self.assertEqual(bound.args, (1, 4))
+        self.assertEqual(bound.kwargs, {'c': 3})
+        self.assertEqual(bound(), (1, 4, (), 3, {}))
+        bound = profplot._BoundCall(func, (1, 2, 5), {'c': 3, 'x y': 6})
+        self.assertEqual(bound.shape, (3, None))
+        self.assertEqual(bound(), (1, 2, (5,), 3, {'x y': 6}))
+        # keywords can't be passed as class=value in the compiled loop
+        bound = profplot._BoundCall(func, (1,), {'c': 3, 'class': 7})
+        self.assertEqual(bound.shape, (1, None))
+        stats = profplot.MeasureConfig(number=2).measure(bound)
+        self.assertEqual(stats.number, 2)
+        self.assertEqual(bound(), (1, 2, (), 3, {'class': 7}))
+        calls = []
+        def record(a, *, b):
+            calls.append((a, b))
+        bound = profplot._BoundCall(record, kwargs={'a': 1, 'b': 2})
+        stats = profplot.MeasureConfig(repeat=2, number=3).measure(
+            bound, setup=lambda: calls.append("setup"))
+        self.assertEqual(stats.number, 3)
+        self.assertEqual(calls, ["setup"] + [(1, 2)]*3 + ["setup"]
+                         + [(1, 2)]*3)
+
+    def test_measure_calibrate(self):
+        plain = profplot.MeasureConfig(repeat=5, number=1000)
+        calibrated = profplot.MeasureConfig(repeat=5, number=1000,
+                                            calibrate=True)
+        empty = lambda: None
+        self.assertGreater(plain.measure(empty).median, 0)
+        # an empty call costs about nothing once its overhead is removed
+        self.assertLess(calibrated.measure(empty).median,
+                        plain.measure(empty).median)
+        self.assertGreaterEqual(calibrated.measure(empty).min, 0)
+
+    def test_shuffle(self):
+        order = []
+        def func(n):
+            order.append(n)
+        measure = profplot.MeasureConfig(shuffle=True, seed=3)
+        series = pp._Profiler(func, {'n': list(range(10))}, 'n',
+                              measure=measure).profile()
+        self.assertEqual(series.x, list(range(10)))
+        self.assertNotEqual(order, list(range(10)))
+        self.assertEqual(sorted(order), list(range(10)))
+        first, order[:] = list(order), []
+        pp._Profiler(func, {'n': list(range(10))}, 'n',
+                     measure=measure).profile()
+        self.assertEqual(order, first)   # seeded, repeatable
+
+    def test_timing_stats_from_samples(self):
+        stats = profplot.TimingStats.from_samples([4, 1, 3, 2], 2, (0, 50, 100))
+        self.assertEqual(stats.samples, (4, 1, 3, 2))
+        self.assertEqual(stats.number, 2)
+        self.assertEqual(stats.min, 1)
+        self.assertEqual(stats.median, 2.5)
+        self.assertEqual(stats.mean, 2.5)
+        self.assertAlmostEqual(stats.stdev, 1.2909944, 6)
+        self.assertEqual(stats.percentiles, {0: 1, 50: 2.5, 100: 4})
+        self.assertEqual(profplot.TimingStats.from_samples([7]).stdev, 0)
+        with self.assertRaises(ValueError):
+            profplot.TimingStats.from_samples([])
+
+
+class TestParallelConfig(unittest.TestCase):
+    def test__init__(self):
+        with self.assertRaises(TypeError):
+            profplot.ParallelConfig(workers=1.5)
+        with self.assertRaises(ValueError):
+            profplot.ParallelConfig(workers=0)
+        with self.assertRaises(ValueError):
+            profplot.ParallelConfig(cpus=[])
+        config = profplot.ParallelConfig(cpus=[3, 1])
+        self.assertEqual(config.cpus, [1, 3])
+        self.assertEqual(config.workers, 2)
+
+    def test__profile_in_pool(self):
+        def local(n):
+            return n
+        profilers = [("sum", pp._Profiler(_sum_to, {'n': [1, 50, 100]}, 'n')),
+                     ("gen", pp._Profiler(_sum_to, {'n': (i for i in [5, 6])},
+                                          'n', lambda x: 2*x)),
+                     ("local", pp._Profiler(local, {'n': [7, 8]}, 'n'))]
+        for per_point in (False, True):
+            if per_point:
+                profilers[1] = ("gen", pp._Profiler(
+                    _sum_to, {'n': (i for i in [5, 6])}, 'n', lambda x: 2*x))
+            config = profplot.ParallelConfig(workers=2, per_point=per_point)
+            with self.assertWarns(RuntimeWarning):
+                results = profplot._profile_in_pool(profilers, config)
+            self.assertEqual(list(results), ["sum", "gen", "local"])
+            self.assertEqual(results["sum"].x, [1, 50, 100])
+            self.assertEqual(len(results["sum"].stats), 3)
+            # generators and closures can't be pickled, they run serially
+            self.assertEqual(results["gen"].x, [10, 12])
+            self.assertEqual(results["local"].x, [7, 8])
+        # splitting into points uses the generator up like a run does
+        with self.assertRaises(ValueError):
+            profplot._profile_in_pool(profilers[1:2], config)
+        # a timed out point still skips the larger ones after it
+        measure = profplot.MeasureConfig(timeout=0.3)
+        results = profplot._profile_in_pool(
+            [("sleep", pp._Profiler(_sleep, {'secs': [0, 60, 0.01]}, 'secs',
+                                    measure=measure))], config)
+        self.assertEqual(results["sleep"].x, [0])
+        self.assertEqual(results["sleep"].timed_out, [60])
+        self.assertEqual(results["sleep"].skipped, [0.01])
+
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "cache.sqlite")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test__init__(self):
+        with self.assertRaises(ValueError):
+            profplot.ResultCache(self.path, max_entries=0)
+        with self.assertRaises(ValueError):
+            profplot.ResultCache(self.path, max_age=0)
+
+    def test_profile_reuses_points(self):
+        calls = []
+        def func(n):
+            calls.append(n)
+        cache = profplot.ResultCache(self.path)
+        profiler = pp._Profiler(func, {'n': [1, 2]}, 'n')
+        first = profiler.profile(cache, "f")
+        self.assertEqual(calls, [1, 2])
+        self.assertEqual(len(cache), 2)
+        # unchanged points come from the cache, new ones are measured
+        profiler = pp._Profiler(func, {'n': [1, 2, 3]}, 'n')
+        again = profiler.profile(cache, "f")
+        self.assertEqual(calls, [1, 2, 3])
+        self.assertEqual(again.stats[:2], first.stats)
+        # other labels, fixed kwargs and settings don't share points
+        profiler.profile(cache, "g")
+        self.assertEqual(calls, [1, 2, 3, 1, 2, 3])
+        pp._Profiler(func, {'n': [1]}, 'n',
+                     measure=profplot.MeasureConfig(repeat=2)).profile(cache, "f")
+        self.assertEqual(calls[6:], [1, 1])
+        # force_rerun measures regardless
+        profiler.profile(cache, "f", force_rerun=True)
+        self.assertEqual(calls[8:], [1, 2, 3])
+
+    def test_changed_function_invalidates(self):
+        def func(n):
+            return n
+        fingerprint = profplot._code_fingerprint(func)
+        def func(n):
+            return n + 1
+        self.assertNotEqual(fingerprint, profplot._code_fingerprint(func))
+        self.assertEqual(profplot._code_fingerprint(func),
+                         profplot._code_fingerprint(func))
+
+    def test_evict(self):
+        stats = (profplot.TimingStats.from_samples([1]), {})
+        cache = profplot.ResultCache(self.path, max_entries=2)
+        for key in "abc":
+            cache.put(key, "l", stats)
+        cache.get("a")
+        cache.evict()
+        self.assertEqual(len(cache), 2)
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        cache = profplot.ResultCache(self.path, max_age=0.01)
+        time.sleep(0.02)
+        self.assertIsNone(cache.get("a"))
+        cache.evict()
+        self.assertEqual(len(cache), 0)
+
+    def test_grid_filled_incrementally(self):
+        calls = []
+        def func(a, b):
+            calls.append((a, b))
+        cache = profplot.ResultCache(self.path)
+        pp._GridProfiler(func, {'a': [1, 2], 'b': [1]}, ['a', 'b']).profile(
+            cache, "g")
+        series = pp._GridProfiler(func, {'a': [1, 2], 'b': [1, 2]},
+                                  ['a', 'b']).profile(cache, "g")
+        self.assertEqual(calls, [(1, 1), (2, 1), (1, 2), (2, 2)])
+        self.assertEqual(len(series), 4)
+
+    def test_plot_with_cache(self):
+        cache = profplot.ResultCache(self.path)
+        plotter = profplot.ProfilePlotter("n", "t", cache=cache)
+        plotter.set_func_profile("a", _sum_to, {'n': [10, 20]}, 'n')
+        plotter.plot(parallel=profplot.ParallelConfig(workers=1))
+        self.assertEqual(len(cache), 2)
+        plotter.plot(force_rerun=True)
+        self.assertEqual(len(cache), 2)
+
+
+class TestProfileJournal(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "sweep.journal")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            profplot.MeasureConfig(errors="ignore")
+        def func(n):
+            raise ValueError("bad n")
+        with self.assertRaises(ValueError):
+            pp._Profiler(func, {'n': [1]}, 'n').profile()
+
+    def test_resume_with_failures(self):
+        calls = []
+        def func(n):
+            calls.append(n)
+            if n == 2:
+                raise ValueError("bad n")
+        measure = profplot.MeasureConfig(errors="record")
+        journal = profplot.ProfileJournal(self.path)
+        series = pp._Profiler(func, {'n': [1, 2, 3]}, 'n',
+                              measure=measure).profile(journal, "f")
+        self.assertEqual(series.x, [1, 3])
+        self.assertEqual(series.failed, [[2, "ValueError: bad n"]])
+        self.assertEqual(len(journal), 3)
+        # a restarted run reads the measured points back and retries
+        # the failed one
+        journal = profplot.ProfileJournal(self.path)
+        again = pp._Profiler(func, {'n': [1, 2, 3, 4]}, 'n',
+                             measure=measure).profile(journal, "f")
+        self.assertEqual(calls, [1, 2, 3, 2, 4])
+        self.assertEqual(again.stats[:2], series.stats)
+        self.assertEqual(again.failed, series.failed)
+        # or keeps the failure with retry_failed off
+        journal = profplot.ProfileJournal(self.path, retry_failed=False)
+        pp._Profiler(func, {'n': [1, 2, 3, 4]}, 'n',
+                     measure=measure).profile(journal, "f")
+        self.assertEqual(calls, [1, 2, 3, 2, 4])
+        # a ResultCache doesn't keep failures
+        cache = profplot.ResultCache(os.path.join(self.tmp.name, "c.sqlite"))
+        pp._Profiler(func, {'n': [2]}, 'n',
+                     measure=measure).profile(cache, "f")
+        self.assertEqual(len(cache), 0)
+
+    def test_cut_short_record(self):
+        journal = profplot.ProfileJournal(self.path)
+        journal.put("a", "l", (profplot.TimingStats.from_samples([1]), {}))
+        with open(self.path, "a") as f:
+            f.write('{"key": "b", "label": "l", "fai')
+        journal = profplot.ProfileJournal(self.path)
+        self.assertEqual(len(journal), 1)
+        self.assertIsNone(journal.get("b"))
+        # the next record isn't lost to the cut short one
+        journal.put("c", "l", (profplot.TimingStats.from_samples([2]), {}))
+        journal = profplot.ProfileJournal(self.path)
+        self.assertEqual(len(journal), 2)
+        self.assertEqual(journal.get("c")[0].median, 2)
+        journal.clear()
+        self.assertEqual(len(journal), 0)
+
+    def test_plot_with_journal(self):
+        journal = profplot.ProfileJournal(self.path)
+        plotter = profplot.ProfilePlotter("n", "t", cache=journal)
+        plotter.set_func_profile("a", _fail_at,
+                                 {'n': [10, 20, 30], 'bad': 20}, 'n',
+                                 measure=profplot.MeasureConfig(
+                                     errors="record", timeout=5))
+        fig, ax = plotter.plot(parallel=profplot.ParallelConfig(
+            workers=1, per_point=True))
+        self.assertIn("a (failed)", [line.get_label()
+                                     for line in ax.get_lines()])
+        result = plotter.run()
+        self.assertEqual(list(result["a"].x), [10, 30])
+        self.assertEqual(result["a"].metadata["failed"],
+                         [[20, "RuntimeError: out of memory"]])
+
+
+class TestProfileResult(unittest.TestCase):
+    def make_result(self):
+        stats = profplot.TimingStats.from_samples
+        series = {"a": profplot.ProfileSeries(
+                      [1, 2], [stats([0.5, 0.1, 0.3], 2, (25, 75)),
+                               stats([0.2], 1, (25, 75))],
+                      [{"peak_bytes": 5}, {"peak_bytes": 7}]),
+                  "b": profplot.ProfileSeries(),
+                  "c,\"d": profplot.ProfileSeries([3.5], [stats([1e-7])])}
+        meta = {"a": {"percentiles": [25, 75], "band": [25, 75]}}
+        return profplot.ProfileResult.from_series(series, meta, {"run": 1})
+
+    def assertResultEqual(self, a, b):
+        self.assertEqual(a.metadata, b.metadata)
+        self.assertEqual(list(a.labels), list(b.labels))
+        for label, res in a:
+            other = b[label]
+            self.assertEqual(res.metadata, other.metadata)
+            np.testing.assert_array_equal(res.x, other.x)
+            np.testing.assert_array_equal(res.samples, other.samples)
+            np.testing.assert_array_equal(res.number, other.number)
+            self.assertEqual(list(res.columns), list(other.columns))
+            for k in res.columns:
+                np.testing.assert_array_equal(res.columns[k], other.columns[k])
+
+    def test_from_series(self):
+        result = self.make_result()
+        self.assertEqual(len(result), 3)
+        res = result["a"]
+        np.testing.assert_array_equal(res.x, [1, 2])
+        np.testing.assert_array_equal(res.samples,
+                                      [[0.5, 0.1, 0.3], [0.2, np.nan, np.nan]])
+        np.testing.assert_array_equal(res.number, [2, 1])
+        np.testing.assert_array_equal(res.y, [0.3, 0.2])
+        np.testing.assert_array_equal(res.columns["min"], [0.1, 0.2])
+        np.testing.assert_array_equal(res.columns["peak_bytes"], [5, 7])
+        np.testing.assert_allclose(res.columns["stdev"], [0.2, 0])
+        np.testing.assert_allclose(res.band(), [[0.2, 0.2], [0.4, 0.2]])
+        self.assertEqual(len(result["b"]), 0)
+        self.assertIsNone(result["b"].band())
+
+    def test_save_load(self):
+        result = self.make_result()
+        with tempfile.TemporaryDirectory() as tmp:
+            for ext in ("csv", "json", "npz"):
+                path = os.path.join(tmp, f"result.{ext}")
+                result.save(path)
+                self.assertResultEqual(result, profplot.ProfileResult.load(path))
+            with self.assertRaises(ValueError):
+                result.save(os.path.join(tmp, "result.txt"))
+
+    def test_run_and_plot_result(self):
+        plotter = profplot.ProfilePlotter("n", "t")
+        plotter.set_func_profile("a", _sum_to, {'n': [10, 20]}, 'n',
+                                 measure=profplot.MeasureConfig(repeat=3))
+        result = plotter.run()
+        self.assertEqual(result.metadata["x_label"], "n")
+        env = result.metadata["environment"]
+        self.assertEqual(env["python_version"], platform.python_version())
+        self.assertIn("cpu_count", env)
+        self.assertEqual(result["a"].samples.shape, (2, 3))
+        # plot a saved result with an empty plotter, nothing is profiled
+        fig, ax = profplot.ProfilePlotter("n", "t").plot(result=result)
+        np.testing.assert_array_equal(ax.get_lines()[0].get_ydata(),
+                                      result["a"].y)
+
+
+class TestBaselines(unittest.TestCase):
+    @staticmethod
+    def result(points):
+        """Build a ProfileResult of label to {x: samples}."""
+        return profplot.ProfileResult.from_series({
+            label: profplot.ProfileSeries(
+                list(xs), [profplot.TimingStats.from_samples(v)
+                           for v in xs.values()])
+            for label, xs in points.items()})
+
+    def test_mann_whitney(self):
+        self.assertAlmostEqual(
+            profplot._mann_whitney_greater([1, 2, 3, 4, 5], [6, 7, 8, 9, 10]),
+            1/252)
+        self.assertAlmostEqual(
+            profplot._mann_whitney_greater([6, 7, 8, 9, 10], [1, 2, 3, 4, 5]),
+            1)
+        self.assertGreater(profplot._mann_whitney_greater([1, 2], [1, 2]), 0.5)
+        self.assertLess(profplot._mann_whitney_greater([1]*20, [2]*20), 1e-6)
+
+    def test_compare_results(self):
+        base = self.result({"a": {1: [1.0, 1.1, 0.9, 1.0, 1.05],
+                                  2: [2.0, 2.1, 1.9, 2.0, 2.05],
+                                  3: [3.0, 3.1, 2.9, 3.0, 3.05],
+                                  4: [1, 1, 1, 1, 1]},
+                            "gone": {1: [1]}})
+        cur = self.result({"a": {1: [1.0, 1.12, 0.92, 1.01, 1.04],   # same
+                                 2: [3.0, 3.1, 2.9, 3.0, 3.05],      # slower
+                                 3: [1.0, 1.1, 0.9, 1.0, 1.05],      # faster
+                                 4: [1.5],       # slower, too few samples
+                                 5: [1]}})
+        report = profplot.compare_results(base, cur, threshold=0.1)
+        status = {(p["label"], p["x"]): p["status"] for p in report.points}
+        self.assertEqual(status, {("a", 1): "ok", ("a", 2): "regression",
+                                  ("a", 3): "improvement", ("a", 4): "ok",
+                                  ("a", 5): "new", ("gone", 1): "missing"})
+        self.assertFalse(report.passed)
+        self.assertEqual([p["x"] for p in report.regressions()], [2])
+        data = json.loads(report.to_json())
+        self.assertFalse(data["passed"])
+        self.assertAlmostEqual(data["points"][1]["ratio"], 1.5)
+        self.assertTrue(profplot.compare_results(base, base).passed)
+        fig, axes = report.plot()
+        self.assertEqual(len(axes), 2)
+        self.assertIn("regression",
+                      [l.get_label() for l in axes[0].get_lines()])
+
+    def test_compare_grid(self):
+        def grid(slow):
+            stats = profplot.TimingStats.from_samples
+            series = profplot.ProfileSeries()
+            for b in [1, 2]:
+                for a in [1, 2, 3]:
+                    t = a * b * (1.5 if (a, b) == slow else 1)
+                    series.append(a, stats([t, t*1.01, t*0.99, t, t]),
+                                  {"b": b})
+            return profplot.ProfileResult.from_series(
+                {"g": series}, {"g": {"grid_keys": ["a", "b"]}})
+        report = profplot.compare_results(grid(None), grid((2, 2)))
+        self.assertEqual(len(report.points), 6)
+        self.assertEqual([(p["x"], p["b"]) for p in report.regressions()],
+                         [(2, 2)])
+
+    def test_compare_lost_points(self):
+        base = self.result({"a": {1: [1.0], 2: [1.0], 3: [1.0]}})
+        cur = self.result({"a": {1: [1.0]}})
+        cur["a"].metadata["failed"] = [[2, "MemoryError"]]
+        cur["a"].metadata["timed_out"] = [3]
+        report = profplot.compare_results(base, cur)
+        self.assertEqual([p["status"] for p in report.points],
+                         ["ok", "failed", "timed_out"])
+        self.assertFalse(report.passed)
+        del base.labels["a"]
+        self.assertTrue(profplot.compare_results(base, cur).passed)
+
+    def test_compare_environments(self):
+        base = self.result({"a": {1: [1.0]}})
+        cur = self.result({"a": {1: [1.0]}})
+        base.metadata["environment"] = {"machine": "x86_64",
+                                        "hostname": "a"}
+        cur.metadata["environment"] = {"machine": "x86_64", "hostname": "b"}
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            profplot.compare_results(base, cur)
+        cur.metadata["environment"]["machine"] = "arm64"
+        with self.assertWarnsRegex(RuntimeWarning, "machine"):
+            profplot.compare_results(base, cur)
+
+    def test_baseline_store(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = profplot.BaselineStore(os.path.join(tmp, "baselines"))
+            self.assertEqual(store.names(), [])
+            result = self.result({"a": {1: [1.0, 2.0]}})
+            store.save("main", result)
+            self.assertEqual(store.names(), ["main"])
+            np.testing.assert_array_equal(store.load("main")["a"].samples,
+                                          result["a"].samples)
+            with self.assertRaises(KeyError):
+                store.load("other")
+            with self.assertRaises(ValueError):
+                store.save("../main", result)
+
+
+class TestCommandLine(unittest.TestCase):
+    SUITES = """
+import profplot
+
+def work(n):
+    return sum(range(n))
+
+@profplot.profile_suite("n", name="cli_sums")
+def sums(plotter):
+    plotter.set_func_profile("sum a", work, {"n": [10, 100, 1000]}, "n")
+    plotter.set_func_profile("sum b", work, {"n": [10, 100]}, "n")
+
+@profplot.profile_suite(name="cli_broken")
+def broken(plotter):
+    raise RuntimeError("boom")
+"""
+    FAILING = """
+def fail_at(n):
+    if n == 100:
+        raise MemoryError
+
+@profplot.profile_suite("n", name="cli_failing")
+def failing(plotter):
+    plotter.set_func_profile("fail", fail_at, {"n": [10, 100]}, "n")
+"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.module = os.path.join(self.tmp.name, "cli_suites.py")
+        with open(self.module, "w") as f:
+            f.write(self.SUITES)
+        self.out = os.path.join(self.tmp.name, "out")
+
+    def tearDown(self):
+        for name in ("cli_sums", "cli_broken", "cli_failing"):
+            profplot._suites.pop(name, None)
+        sys.modules.pop("cli_suites", None)
+        self.tmp.cleanup()
+
+    def main(self, *args):
+        with open(os.devnull, "w") as devnull:
+            stdout, stderr = sys.stdout, sys.stderr
+            sys.stdout = sys.stderr = devnull
+            try:
+                return profplot.main([self.module, "-o", self.out,
+                                      *args])
+            finally:
+                sys.stdout, sys.stderr = stdout, stderr
+
+    def test_run_suite(self):
+        code = self.main("-s", "cli_sums", "-k", "*a", "-r", "3",
+                         "-f", "png", "-f", "svg", "-d", "json")
+        self.assertEqual(code, 0)
+        self.assertEqual(sorted(os.listdir(self.out)),
+                         ["cli_sums.json", "cli_sums.png", "cli_sums.svg"])
+        result = profplot.ProfileResult.load(
+            os.path.join(self.out, "cli_sums.json"))
+        self.assertEqual(list(result.labels), ["sum a"])
+        self.assertEqual(result["sum a"].samples.shape, (3, 3))
+
+    def test_failures_exit_non_zero(self):
+        self.assertEqual(self.main("-s", "cli_*"), 1)
+        self.assertTrue(os.path.exists(os.path.join(self.out,
+                                                    "cli_sums.npz")))
+        self.assertEqual(self.main("-s", "no_such_suite"), 1)
+
+    def test_baseline(self):
+        baselines = os.path.join(self.tmp.name, "baselines")
+        self.assertEqual(self.main("-s", "cli_sums", "--save-baseline",
+                                   "main", "--baseline-dir", baselines), 0)
+        self.assertEqual(profplot.BaselineStore(baselines).names(), ["main"])
+        self.assertEqual(self.main("-s", "cli_sums", "--baseline", "main",
+                                   "--baseline-dir", baselines), 0)
+        self.assertTrue(os.path.exists(
+            os.path.join(self.out, "cli_sums.comparison.json")))
+
+    def test_resume(self):
+        self.assertEqual(self.main("-s", "cli_sums", "--resume"), 0)
+        journal = profplot.ProfileJournal(
+            os.path.join(self.out, "cli_sums.journal"))
+        self.assertEqual(len(journal), 5)
+        self.assertEqual(self.main("-s", "cli_sums", "--resume"), 0)
+        self.assertEqual(len(profplot.ProfileJournal(journal.path)), 5)
+        # failed points are recorded but still fail the run
+        with open(self.module, "a") as f:
+            f.write(self.FAILING)
+        self.assertEqual(self.main("-s", "cli_failing", "--resume"), 1)
+        self.assertTrue(os.path.exists(os.path.join(self.out,
+                                                    "cli_failing.npz")))
+
+    def test_resume_baseline_with_failures(self):
+        # the baseline has no point at the failing x, so it compares clean
+        with open(self.module, "a") as f:
+            f.write(self.FAILING)
+        baselines = os.path.join(self.tmp.name, "baselines")
+        self.assertEqual(self.main("-s", "cli_failing", "--resume",
+                                   "--save-baseline", "main",
+                                   "--baseline-dir", baselines), 1)
+        baseline = profplot.BaselineStore(baselines).load("main")
+        self.assertEqual(list(baseline["fail"].x), [10])
+        self.assertEqual(self.main("-s", "cli_failing", "--resume",
+                                   "--baseline", "main",
+                                   "--baseline-dir", baselines), 1)
+
+
 class TestProfilerClass(unittest.TestCase):
     def test__init__(self):
         # bad input
@@ -153,6 +917,205 @@ class TestProfilerClass(unittest.TestCase):
         exp_stime = sum((sum(i) for i in kwargs[var_key]))
         profiler_test_helper(func3, kwargs, var_key, exp_x_vals, exp_stime, conv_func)
 
+    def test_profile_input_factory(self):
+        class Big(list):
+            pass
+        events = []
+        alive = []
+        def factory(n):
+            # every earlier input is released before the next is built
+            self.assertTrue(all(ref() is None for ref in alive))
+            events.append(("make", n))
+            data = Big(range(n))
+            alive.append(weakref.ref(data))
+            return data
+        def func(data):
+            events.append(("run", len(data)))
+        profiler = pp._Profiler(func, {'data': range(1, 4)}, 'data',
+                                lambda n: 10*n, input_factory=factory)
+        series = profiler.profile()
+        self.assertEqual(series.x, [10, 20, 30])
+        self.assertEqual(events, [("make", 1), ("run", 1), ("make", 2),
+                                  ("run", 2), ("make", 3), ("run", 3)])
+        # ranges of sizes can be profiled again
+        self.assertEqual(profiler.profile().x, [10, 20, 30])
+        # iterators can't, and say so rather than returning nothing
+        profiler = pp._Profiler(func, {'data': iter([[1], [1, 2]])}, 'data')
+        self.assertEqual(len(profiler.profile()), 2)
+        with self.assertRaises(ValueError):
+            profiler.profile()
+
+    def test_profile_memory(self):
+        def func(n):
+            keep = [0] * n
+            return len(keep)
+        measure = profplot.MeasureConfig(memory=True, rss=True)
+        series = pp._Profiler(func, {'n': [10, 100000]}, 'n',
+                              measure=measure).profile()
+        small, big = series.extras
+        self.assertEqual(set(big), {"peak_bytes", "net_bytes",
+                                    "net_block_delta", "rss_delta_bytes"})
+        self.assertGreaterEqual(big["peak_bytes"], 8 * 100000)
+        self.assertLess(small["peak_bytes"], 8 * 100000)
+        self.assertLess(big["net_bytes"], 8 * 100000)   # list is freed
+        self.assertGreaterEqual(big["rss_delta_bytes"], 0)
+        self.assertFalse(profplot.tracemalloc.is_tracing())
+        self.assertEqual(series.extra_columns()["peak_bytes"],
+                         [small["peak_bytes"], big["peak_bytes"]])
+
+    def test_profile_counters(self):
+        def func(n):
+            with mmap.mmap(-1, n) as pages:
+                for ind in range(0, n, mmap.PAGESIZE):
+                    pages[ind] = 1
+        measure = profplot.MeasureConfig(counters=True)
+        series = pp._Profiler(func, {'n': [mmap.PAGESIZE, 2**23]}, 'n',
+                              measure=measure).profile()
+        small, big = series.extras
+        rusage = {"user_time", "system_time", "minor_faults", "major_faults",
+                  "voluntary_switches", "involuntary_switches"}
+        self.assertTrue(rusage <= set(big))
+        # hardware counters only where the kernel exposes them
+        self.assertTrue(set(big) - rusage <= set(profplot._PERF_EVENTS))
+        # fresh pages fault in as they are first written
+        self.assertGreater(big["minor_faults"], small["minor_faults"])
+        self.assertGreaterEqual(big["user_time"] + big["system_time"], 0)
+        if "instructions" in big:
+            self.assertGreater(big["instructions"], small["instructions"])
+        result = profplot.ProfileResult.from_series({"list": series})
+        fig, ax = pp("n", "t").plot(result=result, twin="minor_faults")
+        self.assertEqual(fig.axes[1].get_ylabel(), "Minor page faults")
+
+    def test_profile_repeats(self):
+        def func(a):
+            return a
+        kwargs = {'a': [1, 2, 3]}
+        measure = profplot.MeasureConfig(repeat=5)
+        series = pp._Profiler(func, kwargs, 'a', measure=measure).profile()
+        self.assertIsInstance(series, profplot.ProfileSeries)
+        self.assertEqual(series.x, [1, 2, 3])
+        self.assertEqual(series.y, [s.median for s in series.stats])
+        self.assertTrue(all(len(s.samples) == 5 for s in series.stats))
+        self.assertEqual(kwargs, {'a': [1, 2, 3]})   # check no mutation
+
+    def test_profile_coroutine_function(self):
+        series = pp._Profiler(_async_sleep, {'secs': [0.01, 0.05]},
+                              'secs').profile()
+        # the coroutine is awaited, not just created
+        self.assertGreaterEqual(series.y[0], 0.01)
+        self.assertGreaterEqual(series.y[1], 0.05)
+
+    def test_iter_profile(self):
+        measure = profplot.MeasureConfig(timeout=0.5)
+        profiler = pp._Profiler(_sleep, {'secs': [0, 60, 0]}, 'secs',
+                                measure=measure)
+        events = profiler.iter_profile()
+        kind, x, (stats, extra) = next(events)
+        self.assertEqual((kind, x), ("point", 0))
+        self.assertIsInstance(stats, profplot.TimingStats)
+        self.assertEqual(list(events), [("timed_out", 60, None),
+                                        ("skipped", 0, None)])
+        self.assertEqual(profiler._point_count(), 3)
+
+    def test_profile_cprofile(self):
+        calls = []
+        def func(n):
+            calls.append(n)
+            return _sort_squares(n)
+        measure = profplot.MeasureConfig(repeat=3, cprofile=[20000])
+        series = pp._Profiler(func, {'n': [10, 20000]}, 'n',
+                              measure=measure).profile()
+        # 3 timed calls per point, one more run under cProfile at 20000
+        self.assertEqual(calls, [10]*3 + [20000]*4)
+        self.assertEqual(series.extras[0], {})
+        callees = series.extras[1]
+        self.assertIn("callee:<built-in method builtins.sorted>", callees)
+        self.assertTrue(any(k.endswith("(_squares)") for k in callees))
+        self.assertGreater(sum(callees.values()), 0)
+        with self.assertRaises(ValueError):
+            profplot.MeasureConfig(cprofile_top=0)
+        with self.assertRaises(ValueError):
+            pp._ScalingProfiler(_sleep, {'secs': 0}, [1], 1,
+                                measure=profplot.MeasureConfig(
+                                    cprofile=True)).profile()
+
+    def test_profile_timeout(self):
+        measure = profplot.MeasureConfig(timeout=0.5)
+        series = pp._Profiler(_sleep, {'secs': [0, 0.01, 60, 0.01]},
+                              'secs', measure=measure).profile()
+        self.assertEqual(series.x, [0, 0.01])
+        self.assertEqual(series.timed_out, [60])
+        self.assertEqual(series.skipped, [0.01])
+        # errors raised in the child process still surface
+        def fail(a):
+            raise KeyError(a)
+        with self.assertRaises(KeyError):
+            pp._Profiler(fail, {'a': [1]}, 'a', measure=measure).profile()
+        # a dying child reports its exit code
+        def die(a):
+            os._exit(a)
+        for _ in range(5):
+            with self.assertRaisesRegex(RuntimeError, "exit code 3"):
+                pp._Profiler(die, {'a': [3]}, 'a', measure=measure).profile()
+
+    def test_profile_label_timeout(self):
+        measure = profplot.MeasureConfig(label_timeout=0.3)
+        start = time.perf_counter()
+        series = pp._Profiler(_sleep, {'secs': [0.2, 60, 60]}, 'secs',
+                              measure=measure).profile()
+        self.assertLess(time.perf_counter() - start, 10)
+        self.assertEqual(series.x, [0.2])
+        self.assertEqual(series.timed_out, [60])
+        self.assertEqual(series.skipped, [60])
+
+
+class Test_AdaptiveProfilerClass(unittest.TestCase):
+    def test__init__(self):
+        def func(n):
+            pass
+        factory = lambda x: x
+        def bad(ex, kwargs, x_range, **kw):
+            with self.assertRaises(ex):
+                pp._AdaptiveProfiler(func, kwargs, 'n', x_range, **kw)
+        bad(TypeError, {'n': [1, 2]}, (0, 10))
+        bad(ValueError, {'n': factory}, (10, 0))
+        bad(ValueError, {'n': factory}, (0, 10), log=True)
+        bad(ValueError, {'n': factory}, (0, 10), initial_points=1)
+        bad(ValueError, {'n': factory}, (0, 10), max_points=3)
+        bad(ValueError, {'n': factory}, (0, 10), time_budget=0)
+
+    def test_profile_refines_knee(self):
+        # fake a curve that is flat until 600 and rises steeply after it
+        def func(n):
+            pass
+        profiler = pp._AdaptiveProfiler(func, {'n': lambda x: x}, 'n',
+                                        (0, 1000), max_points=20)
+        profiler._time_point = lambda n: (profplot.TimingStats.from_samples(
+            [1 + max(0, n - 600)]), {})
+        series = profiler.profile()
+        self.assertEqual(len(series), 20)
+        self.assertEqual(series.x, sorted(series.x))
+        self.assertTrue(all(isinstance(x, int) and 0 <= x <= 1000
+                            for x in series.x))
+        near_knee = [x for x in series.x if 500 <= x <= 700]
+        self.assertGreater(len(near_knee), len(series.x) / 3)
+        # a real run stops at the time budget
+        profiler = pp._AdaptiveProfiler(lambda n: time.sleep(0.01),
+                                        {'n': lambda x: x}, 'n', (1, 10**6),
+                                        log=True, max_points=1000,
+                                        time_budget=0.1)
+        series = profiler.profile()
+        self.assertLess(len(series), 20)
+        self.assertEqual(series.x[0], 1)
+        self.assertEqual(series.x[-1], 10**6)
+
+    def test_plot(self):
+        plotter = profplot.ProfilePlotter("n", "t")
+        plotter.set_adaptive_profile("sum", _sum_to, {'n': lambda x: x}, 'n',
+                                     (0, 10000), max_points=8)
+        fig, ax = plotter.plot()
+        self.assertEqual(len(ax.get_lines()[0].get_xdata()), 8)
+
 
 class Test_VariableInitMethodProfilerClass(unittest.TestCase):
     def init_raises(self, ex, loc_class, ikwargs, var_key, mkwargs, conv_func=None):
@@ -285,6 +1248,337 @@ class Test_VariableInitMethodProfilerClass(unittest.TestCase):
         profile_test_helper(list((i/100 for i in range(5))), list((i/100 for i in range(5))), InitAndParam, {"s_time":in_list}, "s_time", {"s_time":0})
         in_list = (i/100 for i in range(5))
         profile_test_helper(list((i for i in range(5))), list((i/100 for i in range(5))), InitAndParam, {"s_time":in_list}, "s_time", {"s_time":0}, conv_func=lambda x:x*100)
+    def test_profile_input_factory(self):
+        class Holder:
+            def __init__(self, data):
+                self.data = data
+            def func(self):
+                return len(self.data)
+        profiler = pp._VariableInitMethodProfiler(
+            Holder, {'data': [3, 5]}, 'data', Holder.func, {},
+            input_factory=lambda n: [0]*n)
+        self.assertEqual(profiler.profile().x, [3, 5])
+
+
+
+class Test_InstanceProfilerClass(unittest.TestCase):
+    class Store:
+        built = 0
+
+        def __init__(self, size):
+            type(self).built += 1
+            self.items = list(range(size))
+
+        def pop(self):
+            return self.items.pop()
+
+        def get(self, index):
+            return self.items[index]
+
+    def test__init__(self):
+        Store = self.Store
+        with self.assertRaises(ValueError):
+            pp._InstanceProfiler(Store, {'size': [1]}, 'size', {})
+        with self.assertRaises(ValueError):
+            pp._InstanceProfiler(Store, {'size': [1]}, 'size',
+                                 {'get': Store.get})
+        with self.assertRaises(TypeError):
+            pp._InstanceProfiler(Store, {'size': [1]}, 'size',
+                                 {'get': (Store.get, [('index', 0)])})
+        with self.assertRaises(TypeError):
+            pp._InstanceProfiler(Store, {'size': [1]}, 'size',
+                                 {'pop': Store.pop}, reset=3)
+
+    def test_profile_shares_instance(self):
+        Store = self.Store
+        Store.built = 0
+        measure = profplot.MeasureConfig(repeat=3, number=2)
+        profiler = pp._InstanceProfiler(
+            Store, {'size': [10, 20]}, 'size',
+            {'pop': Store.pop, 'get': (Store.get, {'index': 0})},
+            measure=measure, reset=lambda store: store.items.append(0),
+            time_init=False)
+        series = profiler.profile()
+        self.assertEqual(set(series), {'pop', 'get'})
+        self.assertEqual(series['pop'].x, [10, 20])
+        self.assertEqual(len(series['get'].stats[0].samples), 3)
+        # one instance per x, shared by both methods
+        self.assertEqual(Store.built, 2)
+
+    def test_profile_times_init(self):
+        Store = self.Store
+        Store.built = 0
+        calls = []
+
+        class Measure(profplot.MeasureConfig):
+            def measure(self, call, setup=None):
+                calls.append(call)
+                return super().measure(call, setup)
+        profiler = pp._InstanceProfiler(
+            Store, {'size': [10, 20]}, 'size', {'get': (Store.get,
+                                                        {'index': 0})},
+            measure=Measure(repeat=3, number=2))
+        series = profiler.profile()
+        self.assertEqual(len(series['__init__'].stats[0].samples), 3)
+        # 3 samples of 2 constructions and the instance methods use
+        self.assertEqual(Store.built, 2 * 7)
+        # construction is timed like the methods, without a wrapper
+        self.assertTrue(all(isinstance(call, profplot._BoundCall)
+                            for call in calls))
+
+    def test_run_separates_init(self):
+        Store = self.Store
+        plotter = pp("size", "Runtime (s)")
+        plotter.set_instance_profile(
+            "store", Store, {'size': [10, 1000]}, 'size', {'pop': Store.pop},
+            reset=lambda store: store.items.append(0))
+        result = plotter.run()
+        self.assertEqual(set(result.labels), {"store.__init__", "store.pop"})
+        self.assertEqual(list(result["store.pop"].x), [10, 1000])
+
+
+class Test_ComparisonProfilerClass(unittest.TestCase):
+    def test__init__(self):
+        funcs = {'squares': _squares, 'sum': _sum_to}
+        with self.assertRaises(ValueError):
+            pp._ComparisonProfiler({}, {'n': [1]}, 'n')
+        with self.assertRaises(ValueError):
+            pp._ComparisonProfiler({'sleep': _sleep, 'sum': _sum_to},
+                                   {'n': [1]}, 'n')
+        with self.assertRaises(ValueError):
+            pp._ComparisonProfiler(funcs, {'n': [1]}, 'n', mutating=['sort'])
+        with self.assertRaises(TypeError):
+            pp._ComparisonProfiler(funcs, [('n', [1])], 'n')
+
+    def test_profile_shares_input(self):
+        calls = []
+        built = []
+
+        def pop_all(data):
+            calls.append('pop')
+            while data:
+                data.pop()
+
+        def total(data):
+            calls.append('total')
+            return sum(data)
+
+        def factory(n):
+            built.append(n)
+            return list(range(n))
+        measure = profplot.MeasureConfig(repeat=3)
+        profiler = pp._ComparisonProfiler(
+            {'pop': pop_all, 'total': total},
+            {'data': (n for n in [10, 20])}, 'data', measure=measure,
+            input_factory=factory, mutating=['pop'])
+        series = profiler.profile()
+        self.assertEqual(set(series), {'pop', 'total'})
+        self.assertEqual(series['total'].x, [10, 20])
+        self.assertEqual(len(series['pop'].stats[0].samples), 3)
+        # one input per x, a generator under var_key consumed once
+        self.assertEqual(built, [10, 20])
+        # samples taken in turns, the first function rotating per round
+        self.assertEqual(calls[:6], ['pop', 'total', 'total', 'pop',
+                                     'pop', 'total'])
+        # pop_all emptied copies only, total still sums the input
+        input_ = list(range(5))
+        make_calls = [profiler._call_factory(name, func, {'data': input_},
+                                             None)
+                      for name, func in profiler._funcs.items()]
+        make_calls[0]()()
+        self.assertEqual(make_calls[1]()(), 10)
+
+    def test_mutating_calls_see_fresh_input(self):
+        seen = []
+
+        def pop_one(data):
+            seen.append(len(data))
+            data.pop()
+
+        def total(data):
+            return sum(data)
+        # auto-ranged, as by default, the others loop many calls a sample
+        measure = profplot.MeasureConfig(repeat=3, warmup=2, number=None,
+                                         min_time=0.001)
+        series = pp._ComparisonProfiler(
+            {'pop': pop_one, 'total': total}, {'data': [100]}, 'data',
+            measure=measure, input_factory=lambda n: list(range(n)),
+            mutating=['pop']).profile()
+        self.assertEqual(series['pop'].stats[0].number, 1)
+        self.assertGreater(series['total'].stats[0].number, 1)
+        self.assertEqual(seen, [100] * (2 + 3))
+
+    def test_run_labels(self):
+        plotter = pp("n", "Runtime (s)")
+        plotter.set_comparison_profile(
+            "build", {'squares': _squares, 'sorted': _sort_squares},
+            {'n': [10, 100]}, 'n')
+        result = plotter.run()
+        self.assertEqual(set(result.labels), {"build.squares",
+                                              "build.sorted"})
+        self.assertEqual(list(result["build.sorted"].x), [10, 100])
+
+
+class Test_ConcurrencyProfilerClass(unittest.TestCase):
+    def test__init__(self):
+        with self.assertRaises(TypeError):
+            pp._ConcurrencyProfiler(_sleep, {'secs': 0}, [1])
+        with self.assertRaises(TypeError):
+            pp._ConcurrencyProfiler(_async_sleep, [('secs', 0)], [1])
+        with self.assertRaises(ValueError):
+            pp._ConcurrencyProfiler(_async_sleep, {'s': 0}, [1])
+        with self.assertRaises(ValueError):
+            pp._ConcurrencyProfiler(_async_sleep, {'secs': 0}, [1, 0])
+
+    def test_profile(self):
+        series = pp._ConcurrencyProfiler(_async_sleep, {'secs': 0.05},
+                                         [1, 20]).profile()
+        self.assertEqual(series.x, [1, 20])
+        # the calls overlap, 20 take about as long as one
+        self.assertLess(series.y[1], 0.05*5)
+        columns = series.extra_columns()
+        self.assertGreater(columns["throughput"][1],
+                           columns["throughput"][0]*4)
+        self.assertGreaterEqual(columns["latency_p50"][1], 0.05)
+        self.assertGreaterEqual(columns["latency_p99"][1],
+                                columns["latency_p50"][1])
+
+    def test_plot_throughput(self):
+        plotter = pp("Concurrent calls", "Runtime (s)")
+        plotter.set_concurrency_profile("sleep", _async_sleep, {'secs': 0},
+                                        [1, 2, 4])
+        fig, ax = plotter.plot(metric="throughput")
+        self.assertEqual(ax.get_ylabel(), "Throughput (calls/s)")
+
+
+class Test_ScalingProfilerClass(unittest.TestCase):
+    def test__init__(self):
+        with self.assertRaises(TypeError):
+            pp._ScalingProfiler(_sleep, [('secs', 0)], [1], 4)
+        with self.assertRaises(TypeError):
+            pp._ScalingProfiler(_sleep, {'secs': 0}, [1], 4.0)
+        with self.assertRaises(ValueError):
+            pp._ScalingProfiler(_sleep, {'secs': 0}, [1], 0)
+        with self.assertRaises(ValueError):
+            pp._ScalingProfiler(_sleep, {'secs': 0}, [0, 1], 4)
+        with self.assertRaises(ValueError):
+            pp._ScalingProfiler(_sleep, {'s': 0}, [1], 4)
+
+    def test_profile_threads(self):
+        series = pp._ScalingProfiler(_sleep, {'secs': 0.02}, [1, 4],
+                                     ops=8).profile()
+        self.assertEqual(series.x, [1, 4])
+        columns = series.extra_columns()
+        self.assertEqual(columns["workers"], [1, 4])
+        self.assertEqual(columns["speedup"][0], 1)
+        # sleeping releases the GIL, 4 threads get through 8 calls ~4x faster
+        self.assertGreater(columns["speedup"][1], 2)
+        self.assertAlmostEqual(columns["efficiency"][1],
+                               columns["speedup"][1]/4)
+        self.assertGreater(columns["throughput"][1], columns["throughput"][0])
+
+    def test_profile_processes(self):
+        profiler = pp._ScalingProfiler(
+            _sleep, {'secs': 0.02}, [2], ops=4,
+            executor=profplot.ProcessPoolExecutor)
+        series = profiler.profile()
+        self.assertEqual(series.extra_columns()["efficiency"], [1])
+        self.assertLess(series.y[0], 0.02*4)
+        # timed points run in a child that may start processes itself
+        series = pp._ScalingProfiler(
+            _sleep, {'secs': 0.01}, [1, 2], ops=4,
+            executor=profplot.ProcessPoolExecutor,
+            measure=profplot.MeasureConfig(timeout=10)).profile()
+        self.assertEqual(series.x, [1, 2])
+
+    def test_plot_speedup(self):
+        plotter = pp("Workers", "Runtime (s)")
+        plotter.set_scaling_profile("sleep", _sleep, {'secs': 0.01}, [1, 2],
+                                    ops=4)
+        fig, ax = plotter.plot(metric="speedup")
+        self.assertEqual([l.get_label() for l in ax.get_lines()],
+                         ["sleep", "sleep ideal"])
+        np.testing.assert_array_equal(ax.get_lines()[1].get_ydata(), [1, 2])
+        self.assertEqual(ax.get_ylabel(), "Speedup")
+
+
+class Test_GridProfilerClass(unittest.TestCase):
+    @staticmethod
+    def func(rows, cols):
+        return [[0]*cols for _ in range(rows)]
+
+    def test__init__(self):
+        kwargs = {'rows': [1], 'cols': [1]}
+        with self.assertRaises(ValueError):
+            pp._GridProfiler(self.func, kwargs, ['rows'])
+        with self.assertRaises(ValueError):
+            pp._GridProfiler(self.func, kwargs, ['rows', 'rows'])
+        with self.assertRaises(ValueError):
+            pp._GridProfiler(self.func, kwargs, ['rows', 'depth'])
+        with self.assertRaises(ValueError):
+            pp._GridProfiler(self.func, kwargs, ['rows', 'cols'],
+                             grid=[(1, 2, 3)])
+        with self.assertRaises(TypeError):
+            pp._GridProfiler(self.func, [('rows', 1)], ['rows', 'cols'])
+
+    def test_profile(self):
+        profiler = pp._GridProfiler(
+            self.func, {'rows': [1, 2, 3], 'cols': range(2)},
+            ['rows', 'cols'], var_conv_funcs={'rows': lambda r: r*10})
+        self.assertEqual(profiler._point_count(), 6)
+        series = profiler.profile()
+        self.assertEqual(series.x, [10, 10, 20, 20, 30, 30])
+        self.assertEqual(series.extra_columns()["cols"], [0, 1]*3)
+        series = pp._GridProfiler(self.func, {'rows': None, 'cols': None},
+                                  ['rows', 'cols'],
+                                  grid=[(1, 5), (4, 2)]).profile()
+        self.assertEqual(series.x, [1, 4])
+        self.assertEqual(series.extra_columns()["cols"], [5, 2])
+
+    def test_timeout_skips_larger_points(self):
+        def func(a, b):
+            time.sleep(60 if a*b >= 4 else 0)
+        series = pp._GridProfiler(
+            func, {'a': [1, 2, 3], 'b': [1, 2]}, ['a', 'b'],
+            measure=profplot.MeasureConfig(timeout=0.5)).profile()
+        self.assertEqual(series.timed_out, [[2, 2]])
+        self.assertEqual(series.skipped, [[3, 2]])
+        self.assertEqual(series.x, [1, 1, 2, 3])
+
+    def test_plot_grid(self):
+        plotter = pp("rows", "Runtime (s)")
+        plotter.set_grid_profile("matrix", self.func,
+                                 {'rows': [1, 10, 100], 'cols': [1, 10]},
+                                 ['rows', 'cols'])
+        result = plotter.run()
+        res = result["matrix"]
+        self.assertEqual(res.metadata["grid_keys"], ["rows", "cols"])
+        xs, ys, values = res.grid()
+        np.testing.assert_array_equal(xs, [1, 10, 100])
+        np.testing.assert_array_equal(ys, [1, 10])
+        self.assertEqual(values.shape, (2, 3))
+        self.assertEqual(values[1, 2], res.y[-1])
+        lines = res.slices(by="rows")
+        self.assertEqual([value for value, _, _ in lines], [1, 10, 100])
+        np.testing.assert_array_equal(lines[0][1], [1, 10])
+        for kind in ("heatmap", "contour"):
+            fig, ax = plotter.plot_grid(result=result, kind=kind)
+            self.assertEqual((ax.get_xlabel(), ax.get_ylabel()),
+                             ("rows", "cols"))
+        fig, ax = plotter.plot_grid(result=result, kind="lines")
+        self.assertEqual(len(ax.get_lines()), 2)
+        with self.assertRaises(ValueError):
+            plotter.plot_grid(result=result, kind="surface")
+        fig, ax = plotter.plot(result=result)
+        self.assertEqual([l.get_label() for l in ax.get_lines()],
+                         ["matrix cols=1", "matrix cols=10"])
+        # grids survive a CSV round trip
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "grid.csv")
+            result.save(path)
+            _, _, loaded = profplot.ProfileResult.load(path)["matrix"].grid()
+        np.testing.assert_allclose(loaded, values)
+
 
 class TestProfilePlotterClass(unittest.TestCase):
     def test__init___(self):
@@ -302,3 +1596,188 @@ class TestProfilePlotterClass(unittest.TestCase):
         with self.assertRaises(ValueError):
             x = profplot.ProfilePlotter("", "")
             x.plot()    # trying to plot with no profilers present
+
+    def test_plot(self):
+        def func(a):
+            return sum(range(a))
+        plotter = profplot.ProfilePlotter("n", "t")
+        plotter.set_func_profile("single", func, {'a': [10, 100]}, 'a')
+        plotter.set_func_profile("repeated", func, {'a': [10, 100]}, 'a',
+                                 measure=profplot.MeasureConfig(repeat=7))
+        fig, ax = plotter.plot()
+        self.assertEqual([l.get_label() for l in ax.get_lines()],
+                         ["single", "repeated"])
+        self.assertEqual(list(ax.get_lines()[1].get_xdata()), [10, 100])
+        # only the repeated profile has a spread band
+        self.assertEqual(len(ax.collections), 1)
+
+    def test_plot_memory(self):
+        def func(n):
+            return [0] * n
+        plotter = profplot.ProfilePlotter("n", "t")
+        plotter.set_func_profile("mem", func, {'n': [10, 10000]}, 'n',
+                                 measure=profplot.MeasureConfig(memory=True))
+        plotter.set_func_profile("time only", func, {'n': [10]}, 'n')
+        result = plotter.run()
+        fig, ax = plotter.plot(result=result, metric="peak_bytes")
+        self.assertEqual([l.get_label() for l in ax.get_lines()], ["mem"])
+        np.testing.assert_array_equal(ax.get_lines()[0].get_ydata(),
+                                      result["mem"].columns["peak_bytes"])
+        fig, ax = plotter.plot(result=result, twin="peak_bytes")
+        self.assertEqual(len(ax.get_lines()), 2)
+        self.assertEqual(len(fig.axes[1].get_lines()), 1)
+        self.assertEqual(fig.axes[1].get_lines()[0].get_color(),
+                         ax.get_lines()[0].get_color())
+
+    def test_plot_timeout(self):
+        plotter = profplot.ProfilePlotter("secs", "t")
+        plotter.set_func_profile("slow", _sleep, {'secs': [0, 60]}, 'secs',
+                                 measure=profplot.MeasureConfig(timeout=0.5))
+        plotter.set_func_profile("fast", _sleep, {'secs': [0, 0.01]},
+                                 'secs')
+        result = plotter.run()
+        self.assertEqual(result["slow"].metadata["timed_out"], [60])
+        self.assertEqual(list(result["fast"].x), [0, 0.01])
+        fig, ax = plotter.plot(result=result)
+        self.assertIn("slow (timed out)",
+                      [l.get_label() for l in ax.get_lines()])
+
+    def test_plot_live(self):
+        plotter = profplot.ProfilePlotter("n", "t")
+        plotter.set_func_profile("sum", _sum_to, {'n': [10, 100, 1000]}, 'n')
+        plotter.set_adaptive_profile("adaptive", _sum_to, {'n': _sum_to}, 'n',
+                                     (10, 1000), max_points=5)
+        stream = io.StringIO()
+        fig, ax = plotter.plot(live=True, refresh=0, progress=stream)
+        self.assertEqual(len(fig.axes), 1)
+        self.assertEqual([l.get_label() for l in ax.get_lines()],
+                         ["sum", "adaptive"])
+        self.assertIn("\r3/8 points", stream.getvalue())
+        self.assertTrue(stream.getvalue().endswith("\n"))
+        with self.assertRaises(ValueError):
+            plotter.plot(live=True, parallel=profplot.ParallelConfig())
+
+    def test_plot_live_shuffled(self):
+        plotter = profplot.ProfilePlotter("n", "t")
+        measure = profplot.MeasureConfig(shuffle=True, seed=1)
+        xs = list(range(10, 110, 10))
+        plotter.set_func_profile("sum", _sum_to, {'n': xs}, 'n',
+                                 measure=measure)
+        live = profplot._LivePlot(*profplot.plt.subplots(), refresh=3600)
+        result = plotter._to_result(plotter._profile_all(live=live))
+        self.assertEqual(list(result["sum"].x), xs)
+        line, = live._ax.get_lines()
+        self.assertEqual(list(line.get_xdata()), xs)
+        fig, ax = plotter.plot(live=True, refresh=3600)
+        self.assertEqual(list(ax.get_lines()[0].get_xdata()), xs)
+
+    def test_live_plot_appends(self):
+        fig, ax = profplot.plt.subplots()
+        live = profplot._LivePlot(fig, ax, total=4, refresh=3600)
+        stats = profplot.TimingStats.from_samples([1.0])
+        events = [("point", 1, (stats, {})), ("point", 2, (stats, {}))]
+        self.assertEqual(list(live.watch("a", iter(events))), events)
+        line, = ax.get_lines()
+        self.assertEqual(list(line.get_xdata()), [1, 2])
+        self.assertTrue(live.progress().startswith("2/4 points"))
+        self.assertIn("ETA", live.progress())
+
+    def test_plot_callees(self):
+        plotter = profplot.ProfilePlotter("n", "t")
+        plotter.set_func_profile(
+            "sort", _sort_squares, {'n': [10, 1000, 100000]}, 'n',
+            measure=profplot.MeasureConfig(cprofile=True, cprofile_top=2))
+        plotter.set_func_profile("plain", _sum_to, {'n': [10]}, 'n')
+        result = plotter.run()
+        xs, shares = result["sort"].callee_shares(top=1)
+        np.testing.assert_array_equal(xs, [10, 1000, 100000])
+        self.assertEqual(len(shares), 2)
+        self.assertEqual(list(shares)[-1], "other")
+        np.testing.assert_allclose(sum(shares.values()), 1)
+        fig, (time_ax, share_ax) = plotter.plot_callees(result=result)
+        self.assertEqual(len(time_ax.get_lines()), 1)
+        self.assertEqual(len(share_ax.collections),
+                         len(result["sort"].callee_shares()[1]))
+        with self.assertRaises(ValueError):
+            plotter.plot_callees("plain", result=result)
+
+    def test_plot_fit(self):
+        x = [1, 2, 3, 4]
+        series = profplot.ProfileSeries(
+            x, [profplot.TimingStats.from_samples([2*i]) for i in x])
+        single = profplot.ProfileSeries([1], series.stats[:1])
+        result = profplot.ProfileResult.from_series({"lin": series,
+                                                     "one": single})
+        self.assertEqual(list(result.fit_complexity()), ["lin"])
+        plotter = profplot.ProfilePlotter("n", "t")
+        fig, ax = plotter.plot(result=result, fit=True, extrapolate=10)
+        labels = [l.get_label() for l in ax.get_lines()]
+        self.assertIn("lin ~ O(n)", labels)
+        marker = ax.get_lines()[-1]
+        self.assertEqual(list(marker.get_xdata()), [10])
+        self.assertAlmostEqual(marker.get_ydata()[0], 20)
+        with self.assertRaises(ValueError):
+            plotter.plot(result=result, fit=True, metric="min")
+
+    def test_plot_parallel(self):
+        plotter = profplot.ProfilePlotter("n", "t")
+        plotter.set_func_profile("a", _sum_to, {'n': [10, 20, 30]}, 'n')
+        plotter.set_func_profile("b", _sum_to, {'n': [40, 50]}, 'n')
+        fig, ax = plotter.plot(parallel=profplot.ParallelConfig(workers=2))
+        self.assertEqual([list(l.get_xdata()) for l in ax.get_lines()],
+                         [[10, 20, 30], [40, 50]])
+
+    def test_decimate(self):
+        y = np.zeros(10000)
+        y[1234] = 5
+        y[4321] = -5
+        y[7000] = np.nan
+        keep = profplot._decimate(y, 100)
+        self.assertLessEqual(len(keep), 100)
+        self.assertIn(1234, keep)
+        self.assertIn(4321, keep)
+        self.assertNotIn(7000, keep)
+        np.testing.assert_array_equal(keep, np.sort(keep))
+        np.testing.assert_array_equal(profplot._decimate(y[:50], 100),
+                                      np.arange(50))
+        self.assertEqual(len(profplot._decimate(y, None)), 10000)
+
+    def test_plot_large_series(self):
+        x = list(range(1, 5001))
+        stats = profplot.TimingStats.from_samples
+        series = profplot.ProfileSeries(
+            x, [stats([i, 2*i], 1, (25, 75)) for i in x])
+        result = profplot.ProfileResult.from_series(
+            {"big": series}, {"big": {"percentiles": [25, 75],
+                                      "band": [25, 75]}})
+        plotter = profplot.ProfilePlotter("n", "t")
+        fig, ax = plotter.plot(result=result, max_points=200, xscale="log",
+                               yscale="log", rasterize=1000)
+        line = ax.get_lines()[0]
+        self.assertLessEqual(len(line.get_xdata()), 200)
+        self.assertEqual(line.get_xdata()[-1], 5000)
+        self.assertTrue(line.get_rasterized())
+        self.assertTrue(ax.collections[0].get_rasterized())
+        self.assertEqual((ax.get_xscale(), ax.get_yscale()), ("log", "log"))
+        fig, ax = plotter.plot(result=result, max_points=None)
+        self.assertEqual(len(ax.get_lines()[0].get_xdata()), 5000)
+        self.assertFalse(ax.get_lines()[0].get_rasterized())
+
+    def test_render_results(self):
+        plotter = profplot.ProfilePlotter("n", "t")
+        plotter.set_func_profile("a", _sum_to, {'n': [10, 20, 30]}, 'n')
+        result = plotter.run()
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = [os.path.join(tmp, f"run{i}.{fmt}")
+                     for i, fmt in enumerate(["json", "npz"])]
+            for path in paths:
+                result.save(path)
+            out = os.path.join(tmp, "figures")
+            written = profplot.render_results(paths, out, ["png", "svg"],
+                                              workers=2, yscale="log")
+            self.assertEqual([os.path.basename(f) for f in written],
+                             ["run0.png", "run0.svg", "run1.png",
+                              "run1.svg"])
+            self.assertTrue(all(os.path.getsize(f) > 0 for f in written))
+            with self.assertRaises(ValueError):
+                profplot.render_results(paths, workers=0)